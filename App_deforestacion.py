@@ -1,12 +1,22 @@
-import streamlit as st
+import io
+
+import streamlit
 import pandas as pd
 
-def cargar_datos():
+import descargas
+import instrumentacion
+import perfilado
+import tablas
+
+# Mide los bytes de las tablas enviadas cuando hay una traza activa
+st = instrumentacion.StreamlitMedido(streamlit)
+
+def seleccionar_fuente():
     """
-    Permite al usuario cargar un archivo CSV desde su computadora o mediante una URL.
+    Muestra en la barra lateral los controles para elegir un archivo CSV o una URL.
 
     Returns:
-        pd.DataFrame or None: Un DataFrame con los datos cargados o None si no se cargó nada.
+        tuple: (archivo_subido, url); cualquiera de los dos puede ser None o vacío.
     """
     st.sidebar.title("Cargar Datos")
     st.sidebar.write("Suba un archivo CSV o ingrese una URL para cargar los datos.")
@@ -24,10 +34,53 @@ def cargar_datos():
         help="Ingrese la URL de un archivo CSV para cargar los datos."
     )
 
+    return archivo_subido, url
+
+
+def descargar_con_avance(url):
+    """
+    Descarga la URL (con reintentos y caché en disco, ver descargas) mostrando el avance.
+
+    Args:
+        url (str): URL del archivo.
+
+    Returns:
+        bytes: Contenido descargado.
+    """
+    barra = st.sidebar.progress(0.0, text="Descargando...")
+
+    def al_avanzar(leidos, total):
+        if total:
+            barra.progress(min(leidos / total, 1.0), text=f"Descargando... {leidos / 1e6:.1f} de {total / 1e6:.1f} MB")
+        else:
+            barra.progress(0.0, text=f"Descargando... {leidos / 1e6:.1f} MB")
+
+    try:
+        return descargas.descargar(url, al_avanzar=al_avanzar, vigencia=descargas.VIGENCIA)
+    finally:
+        barra.empty()
+
+
+@instrumentacion.instrumentar("carga")
+def cargar_datos(archivo_subido=None, url=None):
+    """
+    Permite al usuario cargar un archivo CSV desde su computadora o mediante una URL.
+
+    Args:
+        archivo_subido (UploadedFile, optional): Archivo ya elegido con seleccionar_fuente.
+        url (str, optional): URL ya elegida con seleccionar_fuente.
+
+    Returns:
+        pd.DataFrame or None: Un DataFrame con los datos cargados o None si no se cargó nada.
+    """
+    if archivo_subido is None and url is None:
+        archivo_subido, url = seleccionar_fuente()
+
     # Cargar datos desde el archivo subido
     if archivo_subido is not None:
         try:
             datos = pd.read_csv(archivo_subido)
+            datos.attrs["version"] = archivo_subido.file_id
             st.sidebar.success("Archivo CSV cargado correctamente.")
             return datos
         except Exception as e:
@@ -37,7 +90,9 @@ def cargar_datos():
     # Cargar datos desde la URL
     elif url:
         try:
-            datos = pd.read_csv(url)
+            datos = pd.read_csv(io.BytesIO(descargar_con_avance(url)) if descargas.es_url(url) else url)
+            # ETag de la copia recién validada; identifica los datos en los cachés de las tablas
+            datos.attrs["version"] = descargas.version(url) if descargas.es_url(url) else None
             st.sidebar.success("Datos cargados correctamente desde la URL.")
             return datos
         except Exception as e:
@@ -71,6 +126,68 @@ def mostrar_caracteristicas(datos):
     st.table(pd.DataFrame.from_dict(caracteristicas, orient="index"))
 
 
+@instrumentacion.instrumentar("carga")
+def perfilar_por_bloques(archivo_subido, url):
+    """
+    Describe el CSV leyéndolo por bloques, sin cargarlo completo en memoria,
+    y muestra el avance de la lectura. Las URLs se leen en streaming con
+    descargas.abrir (tiempos de espera y reintentos hasta el primer byte), de
+    modo que la memoria usada no depende del tamaño del archivo.
+
+    Args:
+        archivo_subido (UploadedFile or None): Archivo subido por el usuario.
+        url (str): URL del archivo CSV (se usa si no hay archivo subido).
+
+    Returns:
+        perfilado.PerfilDataset or None: Perfil del archivo o None si hubo un error.
+    """
+    if archivo_subido is not None:
+        archivo_subido.seek(0)
+        return _perfilar(archivo_subido, archivo_subido, archivo_subido.size)
+    if not descargas.es_url(url):
+        return _perfilar(url, None, None)
+    try:
+        flujo, tamano = descargas.abrir(url)
+    except Exception as e:
+        st.sidebar.error(f"Error al descargar el archivo CSV: {e}")
+        return None
+    with flujo:
+        return _perfilar(flujo, flujo, tamano)
+
+
+def _perfilar(fuente, archivo, tamano):
+    barra = st.progress(0.0, text="Leyendo el archivo por bloques...")
+
+    def al_avanzar(perfil):
+        texto = f"{perfil.filas:,} filas leídas"
+        if tamano:
+            # Bytes leídos del archivo (o recibidos por la red) frente al tamaño total
+            barra.progress(min(archivo.tell() / tamano, 1.0), text=texto)
+        else:
+            barra.progress(0.0, text=texto)
+
+    try:
+        perfil = perfilado.perfilar_csv(fuente, al_avanzar=al_avanzar)
+    except Exception as e:
+        barra.empty()
+        st.sidebar.error(f"Error al leer el archivo CSV por bloques: {e}")
+        return None
+    barra.progress(1.0, text=f"{perfil.filas:,} filas leídas")
+    return perfil
+
+
+def mostrar_perfil(perfil):
+    """
+    Muestra las características del dataset calculadas por bloques.
+
+    Args:
+        perfil (perfilado.PerfilDataset): Perfil del archivo.
+    """
+    st.subheader("Características principales del dataset")
+    st.write(f"**Número de filas:** {perfil.filas:,}  \n**Número de columnas:** {len(perfil.columnas)}")
+    st.table(perfil.resumen().astype(str))
+
+
 def main():
     """
     Función principal de la aplicación Streamlit.
@@ -78,19 +195,47 @@ def main():
     st.title("Aplicación de Análisis de Datos")
     st.write("Bienvenido a la aplicación de análisis de datos.")
 
-    # Cargar los datos
-    datos = cargar_datos()
-
-    # Verificar si los datos se cargaron correctamente
-    if datos is not None:
-        # Mostrar características principales del dataset
-        mostrar_caracteristicas(datos)
+    # Modo por bloques para archivos que no caben en memoria
+    por_bloques = st.sidebar.checkbox(
+        "Leer por bloques (archivos grandes)",
+        help="Calcula las características leyendo el archivo por partes, sin cargarlo completo en memoria."
+    )
+    archivo_subido, url = seleccionar_fuente()
+    diagnostico = st.sidebar.checkbox(
+        "Mostrar diagnóstico", key="diagnostico",
+        help="Tiempos por etapa, filas y datos enviados al navegador en esta ejecución."
+    )
 
-        # Mostrar una muestra de los primeros 5 elementos
-        st.subheader("Muestra de los primeros 5 elementos")
-        st.dataframe(datos.head())
-    else:
-        st.warning("Por favor, suba un archivo CSV o ingrese una URL para continuar.")
+    with instrumentacion.traza("por bloques" if por_bloques else "completo", medir_bytes=diagnostico) as traza:
+        if por_bloques and (archivo_subido is not None or url):
+            perfil = perfilar_por_bloques(archivo_subido, url)
+            if perfil is not None:
+                with instrumentacion.etapa("render", filas=len(perfil.columnas)):
+                    mostrar_perfil(perfil)
+                    st.subheader("Muestra de los primeros 5 elementos")
+                    st.dataframe(perfil.muestra)
+        else:
+            # Cargar los datos
+            datos = cargar_datos(archivo_subido, url)
+
+            # Verificar si los datos se cargaron correctamente
+            if datos is not None:
+                # Mostrar características principales del dataset
+                with instrumentacion.etapa("agregacion", filas=len(datos)):
+                    mostrar_caracteristicas(datos)
+
+                # Mostrar una muestra de los primeros 5 elementos
+                st.subheader("Muestra de los primeros 5 elementos")
+                st.dataframe(datos.head())
+
+                # Explorar el dataset completo por páginas
+                with st.expander("Explorar todos los datos"), instrumentacion.etapa("render", filas=len(datos)):
+                    tablas.mostrar_tabla_paginada(datos, "datos", version=datos.attrs.get("version"))
+            else:
+                st.warning("Por favor, suba un archivo CSV o ingrese una URL para continuar.")
+
+    if diagnostico:
+        instrumentacion.mostrar_panel(traza)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,430 @@
+"""
+Banco de pruebas reproducible de las vistas de App_madera.
+
+Ejecuta las vistas sin servidor de Streamlit (las llamadas a `st` se
+sustituyen por StreamlitSimulado) sobre datasets sintéticos con la forma de
+base_datos_madera.csv y mide, para cada vista, tres etapas:
+
+- calculo: agregaciones de la vista con todos los cachés vacíos;
+- render: la vista completa justo después (cálculos ya memorizados);
+- render_caliente: la vista otra vez, como en un segundo rerun de Streamlit.
+
+De cada etapa se informa el tiempo de pared, el pico de memoria (tracemalloc),
+los bytes que se habrían enviado al navegador y el desglose por subetapa de
+instrumentacion. Los resultados se guardan en JSON junto con el commit, para
+comparar entre versiones con --comparar. Con --registro se resume en cambio
+el registro de trazas escrito por las apps en producción.
+
+Uso:
+    python benchmark_madera.py --tamanos 55000 1000000 --geojson colombia.geo.json
+    python benchmark_madera.py --comparar .cache/benchmarks/madera-abc1234.json
+    python benchmark_madera.py --registro trazas.jsonl
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use('Agg')
+
+import numpy as np
+import pandas as pd
+
+import App_madera
+import consultas
+import cubo_madera
+import datos_compartidos
+import datos_madera
+import facetas
+import figuras
+import geometria
+import indice_municipios
+import instrumentacion
+import mapas_interactivos
+import motor_outliers
+import tablas
+import vistas_madera
+from precalentamiento import StreamlitSimulado
+
+TAMANOS = [55_000, 1_000_000, 10_000_000]
+ETAPAS = ['calculo', 'render', 'render_caliente']
+
+# Columnas que se muestrean con la frecuencia observada en el CSV original
+_COLUMNAS_PERIODO = ['AÑO', 'SEMESTRE', 'TRIMESTRE']
+_COLUMNAS_LUGAR = ['DPTO', 'MUNICIPIO']
+
+# Nivel en disco del caché de figuras propio del banco de pruebas (limpiar_caches lo vacía)
+_DIRECTORIO_FIGURAS = os.path.join(tempfile.gettempdir(), f"benchmark-madera-figuras-{os.getpid()}")
+
+
+def generar_madera(filas, semilla=0, fuente=None):
+    """
+    Genera un dataset sintético con la forma y las cardinalidades de la base de madera.
+
+    Los periodos, los pares departamento-municipio, las especies, los tipos de
+    producto y los volúmenes se muestrean con la frecuencia que tienen en el CSV
+    original, de modo que los grupos conservan tamaños relativos realistas.
+
+    Args:
+        filas (int): Número de filas.
+        semilla (int): Semilla del generador aleatorio.
+        fuente (str, optional): CSV original. Por defecto, base_datos_madera.csv junto a este archivo.
+
+    Returns:
+        datos_compartidos.DatosCompartidos: Datos de solo lectura con el esquema de datos_madera,
+        COD_MPIO y df.attrs['version'].
+    """
+    fuente = fuente or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'base_datos_madera.csv')
+    original = datos_madera.leer_csv_madera(fuente)
+    aleatorio = np.random.default_rng(semilla)
+
+    def muestrear(columnas):
+        frecuencias = original.groupby(columnas, observed=True).size().reset_index(name='n')
+        posiciones = aleatorio.choice(len(frecuencias), size=filas, p=frecuencias['n'] / frecuencias['n'].sum())
+        return frecuencias[columnas].iloc[posiciones].reset_index(drop=True)
+
+    df = pd.concat([
+        muestrear(_COLUMNAS_PERIODO),
+        muestrear(_COLUMNAS_LUGAR),
+        muestrear(['ESPECIE']),
+        muestrear(['TIPO PRODUCTO']),
+        muestrear(['FUENTE']),
+    ], axis=1)
+    df['VOLUMEN M3'] = aleatorio.choice(original['VOLUMEN M3'].to_numpy(), size=filas)
+    df = df[list(original.columns)].astype(datos_madera.ESQUEMA_MADERA)
+
+    indice_municipios.asignar_codigos(df)
+    df.attrs['version'] = f"sintetico-{filas}-{semilla}"
+
+    # Mismo formato que reciben las vistas en la aplicación: compartido y de solo lectura
+    ruta = os.path.join(tempfile.gettempdir(), f"benchmark-madera-{os.getpid()}-{filas}-{semilla}.arrow")
+    datos_compartidos.escribir(df, ruta)
+    df = datos_compartidos.abrir(ruta)
+    try:
+        # El mapa de memoria sigue siendo válido tras borrar el archivo (salvo en Windows)
+        os.remove(ruta)
+    except OSError:
+        pass
+    return df
+
+
+def limpiar_caches():
+    """
+    Vacía los cachés de proceso que llenan las vistas (cubos, facetas, outliers y su
+    detector incremental, GeoJSON de los mapas interactivos, figuras y tablas), de
+    modo que la etapa de cálculo de cada caso se mida en frío. Solo se conserva la
+    geometría leída del archivo (ver _precargar_geometria).
+
+    Las figuras en disco se guardan en un directorio temporal propio, para no
+    usar ni borrar las del caché de la aplicación.
+    """
+    cubo_madera._cubos.clear()
+    facetas._indices.clear()
+    motor_outliers._resultados.clear()
+    motor_outliers._detectores.clear()
+    mapas_interactivos._geojson.clear()
+    figuras._figuras.clear()
+    shutil.rmtree(_DIRECTORIO_FIGURAS, ignore_errors=True)
+    figuras.DIRECTORIO_FIGURAS = _DIRECTORIO_FIGURAS
+    tablas._ordenes.clear()
+
+
+def _calculo_evolucion(df):
+    # Mismo índice y serie que analizar_evolucion_temporal con las opciones por defecto
+    indice = facetas.obtener_facetas(df)
+    especie = indice.especies[0]
+    return indice.serie(especie, indice.tipos_producto(especie)[0], 'AÑO')
+
+
+def _calculo_outliers(grupo):
+    def calcular(df):
+        return (motor_outliers.detectar_outliers(df, 'IQR', grupo),
+                motor_outliers.estadisticas_caja_por_grupo(df, grupo=grupo))
+    return calcular
+
+
+def _calculo_top_10_municipios(df):
+    por_municipio = cubo_madera.obtener_cubo(df).enrollar('COD_MPIO')
+    por_municipio = por_municipio[por_municipio['COD_MPIO'] != indice_municipios.SIN_CODIGO]
+    return indice_municipios.con_coordenadas(por_municipio.nlargest(10, 'VOLUMEN M3'))
+
+
+def _calculo_menor_volumen(df):
+    cubo = cubo_madera.obtener_cubo(df)
+    especies = cubo.enrollar('ESPECIE').nsmallest(10, 'VOLUMEN M3')['ESPECIE']
+    return indice_municipios.con_coordenadas(
+        cubo.enrollar(['COD_MPIO', 'ESPECIE'], filtros={'ESPECIE': list(especies)})
+    )
+
+
+_INTERACTIVO = {"Motor de mapas": App_madera.MOTORES_MAPA[1]}
+
+# Nombre -> (cálculo, vista, respuestas de los widgets)
+CASOS = {
+    'calcular_maderas_comunes': (
+        App_madera.calcular_maderas_comunes,
+        App_madera.mostrar_especies_comunes,
+        {},
+    ),
+    'analizar_evolucion_temporal': (_calculo_evolucion, App_madera.analizar_evolucion_temporal, {}),
+    'identificar_outliers': (_calculo_outliers(None), App_madera.identificar_outliers, {}),
+    'identificar_outliers[ESPECIE]': (
+        _calculo_outliers('ESPECIE'), App_madera.identificar_outliers, {"Calcular límites por": 'ESPECIE'},
+    ),
+    'generar_mapa_calor': (
+        lambda df: cubo_madera.obtener_cubo(df).enrollar('DPTO'), App_madera.generar_mapa_calor, {},
+    ),
+    'generar_mapa_calor[plotly]': (
+        lambda df: cubo_madera.obtener_cubo(df).enrollar('DPTO'), App_madera.generar_mapa_calor, _INTERACTIVO,
+    ),
+    'generar_mapa_top_10_municipios': (
+        _calculo_top_10_municipios, App_madera.generar_mapa_top_10_municipios, {},
+    ),
+    'generar_mapa_top_10_municipios[plotly]': (
+        _calculo_top_10_municipios, App_madera.generar_mapa_top_10_municipios, _INTERACTIVO,
+    ),
+    'especies_menor_volumen_distribucion': (
+        _calculo_menor_volumen, App_madera.especies_menor_volumen_distribucion, {},
+    ),
+    'especies_menor_volumen_distribucion[plotly]': (
+        _calculo_menor_volumen, App_madera.especies_menor_volumen_distribucion, _INTERACTIVO,
+    ),
+}
+
+
+def medir(funcion, memoria=True):
+    """
+    Ejecuta una función midiendo el tiempo de pared y, opcionalmente, el pico de memoria.
+
+    Args:
+        funcion (callable): Función sin argumentos.
+        memoria (bool): Si es True, mide el pico de memoria con tracemalloc (añade algo de sobrecosto).
+
+    Returns:
+        dict: segundos, pico_mb (None si no se midió) y error (None si no hubo excepción).
+    """
+    error = None
+    if memoria:
+        tracemalloc.start()
+    inicio = time.perf_counter()
+    try:
+        funcion()
+    except Exception as excepcion:
+        error = f"{type(excepcion).__name__}: {excepcion}"
+    segundos = time.perf_counter() - inicio
+    pico_mb = None
+    if memoria:
+        pico_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return {'segundos': segundos, 'pico_mb': pico_mb, 'error': error}
+
+
+def ejecutar_caso(df, nombre, memoria=True):
+    """
+    Mide las etapas calculo, render y render_caliente de un caso de CASOS.
+
+    Args:
+        df (pd.DataFrame): Dataset sobre el que se ejecuta la vista.
+        nombre (str): Nombre del caso.
+        memoria (bool): Si es True, mide el pico de memoria.
+
+    Returns:
+        list: Un diccionario por etapa con segundos, pico_mb, bytes_enviados, caches, desglose y error.
+    """
+    calculo, vista, respuestas = CASOS[nombre]
+    limpiar_caches()
+    simulado = instrumentacion.StreamlitMedido(StreamlitSimulado(respuestas))
+    App_madera.st = tablas.st = simulado
+    for modulo in vistas_madera.MODULOS:
+        vistas_madera.cargar_modulo(modulo).st = simulado
+
+    resultados = []
+    for etapa, funcion in zip(ETAPAS, [lambda: calculo(df), lambda: vista(df), lambda: vista(df)]):
+        with instrumentacion.traza(nombre, medir_bytes=True, registrar=False) as traza:
+            medicion = medir(funcion, memoria)
+        traza = traza.a_dict()
+        resultados.append({
+            'etapa': etapa,
+            **medicion,
+            'bytes_enviados': traza['bytes_enviados'],
+            'caches': traza['caches'],
+            'desglose': traza['etapas'],
+        })
+    return resultados
+
+
+def _precargar_geometria():
+    # La geometría no depende del dataset: se carga antes de medir para no contar la descarga
+    # (su conversión a GeoJSON sí se mide: limpiar_caches la descarta en cada caso)
+    try:
+        for nivel in geometria.NIVELES:
+            geometria.cargar_departamentos(nivel)
+    except Exception as excepcion:
+        print(f"Aviso: no se pudo cargar la geometría ({excepcion}); los mapas fallarán.", file=sys.stderr)
+
+
+def version_codigo():
+    """
+    Devuelve el commit actual del repositorio (con sufijo -dirty si hay cambios sin guardar).
+
+    Returns:
+        str: Descripción del commit, o 'desconocida' fuera de git.
+    """
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconocida'
+
+
+def ejecutar(tamanos=TAMANOS, casos=None, repeticiones=1, semilla=0, memoria=True):
+    """
+    Ejecuta el banco de pruebas completo.
+
+    Con varias repeticiones se informa el mínimo y la mediana del tiempo y el
+    máximo del pico de memoria de cada etapa.
+
+    Args:
+        tamanos (list): Número de filas de cada dataset sintético.
+        casos (list, optional): Nombres de CASOS a ejecutar. Por defecto, todos.
+        repeticiones (int): Veces que se mide cada caso.
+        semilla (int): Semilla de los datasets sintéticos.
+        memoria (bool): Si es True, mide el pico de memoria.
+
+    Returns:
+        dict: Metadatos de la ejecución y lista de resultados por tamaño, caso y etapa.
+    """
+    casos = casos or list(CASOS)
+    _precargar_geometria()
+    resultados = []
+    for filas in tamanos:
+        df = generar_madera(filas, semilla)
+        for nombre in casos:
+            mediciones = [ejecutar_caso(df, nombre, memoria) for _ in range(repeticiones)]
+            for i, etapa in enumerate(ETAPAS):
+                por_etapa = [medicion[i] for medicion in mediciones]
+                segundos = [m['segundos'] for m in por_etapa]
+                picos = [m['pico_mb'] for m in por_etapa if m['pico_mb'] is not None]
+                resultados.append({
+                    'filas': filas,
+                    'caso': nombre,
+                    'etapa': etapa,
+                    'segundos': min(segundos),
+                    'segundos_mediana': statistics.median(segundos),
+                    'pico_mb': max(picos) if picos else None,
+                    'bytes_enviados': por_etapa[-1]['bytes_enviados'],
+                    'caches': por_etapa[-1]['caches'],
+                    'desglose': por_etapa[-1]['desglose'],
+                    'error': por_etapa[-1]['error'],
+                })
+        del df
+        limpiar_caches()
+
+    return {
+        'commit': version_codigo(),
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'plataforma': platform.platform(),
+        'python': platform.python_version(),
+        'versiones': {'pandas': pd.__version__, 'numpy': np.__version__},
+        'parametros': {'tamanos': list(tamanos), 'repeticiones': repeticiones, 'semilla': semilla,
+                       'memoria': memoria, 'motor': consultas.MOTOR},
+        'resultados': resultados,
+    }
+
+
+def comparar(actual, base):
+    """
+    Compara dos ejecuciones del banco de pruebas.
+
+    Args:
+        actual (dict): Resultado de ejecutar().
+        base (dict): Resultado de referencia (p. ej. leído del JSON de otro commit).
+
+    Returns:
+        pd.DataFrame: Tiempos y picos de ambas ejecuciones y su razón actual / base.
+    """
+    claves = ['filas', 'caso', 'etapa']
+    tabla = pd.DataFrame(actual['resultados']).merge(
+        pd.DataFrame(base['resultados']), on=claves, suffixes=('', '_base')
+    )
+    tabla['razon_segundos'] = tabla['segundos'] / tabla['segundos_base']
+    tabla['razon_pico'] = tabla['pico_mb'] / tabla['pico_mb_base']
+    return tabla[claves + ['segundos_base', 'segundos', 'razon_segundos', 'pico_mb_base', 'pico_mb', 'razon_pico']]
+
+
+def resumir_registro(ruta):
+    """
+    Resume el registro de trazas que escriben las apps (ver instrumentacion.RUTA_REGISTRO).
+
+    Args:
+        ruta (str): Archivo JSON Lines del registro.
+
+    Returns:
+        pd.DataFrame: Por vista y etapa, número de mediciones y tiempos mediano y p95 en milisegundos.
+    """
+    filas = [
+        {'vista': traza['vista'], 'etapa': '(total)', 'segundos': traza['segundos']}
+        for traza in instrumentacion.leer_registro(ruta)
+    ] + [
+        {'vista': traza['vista'], 'etapa': etapa['etapa'], 'segundos': etapa['segundos']}
+        for traza in instrumentacion.leer_registro(ruta) for etapa in traza['etapas']
+    ]
+    tabla = pd.DataFrame(filas, columns=['vista', 'etapa', 'segundos'])
+    agrupado = tabla.groupby(['vista', 'etapa'])['segundos']
+    return pd.DataFrame({
+        'n': agrupado.size(),
+        'mediana_ms': agrupado.median() * 1000,
+        'p95_ms': agrupado.quantile(0.95) * 1000,
+    }).reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banco de pruebas de las vistas de App_madera.")
+    parser.add_argument('--tamanos', type=int, nargs='+', default=TAMANOS, help="Filas de cada dataset sintético.")
+    parser.add_argument('--casos', nargs='+', choices=list(CASOS), help="Casos a ejecutar (por defecto, todos).")
+    parser.add_argument('--repeticiones', type=int, default=1, help="Mediciones por caso.")
+    parser.add_argument('--semilla', type=int, default=0, help="Semilla de los datos sintéticos.")
+    parser.add_argument('--geojson', help="GeoJSON local de los departamentos (en lugar de descargarlo).")
+    parser.add_argument('--sin-memoria', action='store_true', help="No medir la memoria (tiempos sin tracemalloc).")
+    parser.add_argument('--salida', help="Archivo JSON de resultados (por defecto, en el directorio de caché).")
+    parser.add_argument('--comparar', help="JSON de una ejecución anterior con el que comparar.")
+    parser.add_argument('--registro', help="Resumir un registro de trazas de las apps en lugar de ejecutar el banco.")
+    args = parser.parse_args()
+
+    if args.registro:
+        with pd.option_context('display.width', 200, 'display.max_rows', None, 'display.float_format', '{:.1f}'.format):
+            print(resumir_registro(args.registro).to_string(index=False))
+        return
+
+    if args.geojson:
+        geometria.URL_COLOMBIA = args.geojson
+
+    resultado = ejecutar(args.tamanos, args.casos, args.repeticiones, args.semilla, not args.sin_memoria)
+
+    salida = args.salida or os.path.join(datos_madera.DIRECTORIO_CACHE, 'benchmarks', f"madera-{resultado['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, 'w', encoding='utf-8') as archivo:
+        json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+
+    with pd.option_context('display.width', 200, 'display.max_rows', None, 'display.float_format', '{:.3f}'.format):
+        tabla = pd.DataFrame(resultado['resultados']).drop(columns=['segundos_mediana', 'caches', 'desglose'])
+        print(tabla.to_string(index=False))
+        if args.comparar:
+            with open(args.comparar, encoding='utf-8') as archivo:
+                print()
+                print(comparar(resultado, json.load(archivo)).to_string(index=False))
+    print(f"\nResultados guardados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""
+Bocetos (sketches) aproximados y combinables para perfilar datasets grandes.
+
+- BocetoDistintos: HyperLogLog para contar valores distintos.
+- BocetoCuantiles: KLL para estimar cuantiles con error de rango acotado.
+- BocetoFrecuencias: count-min con lista de candidatos para los valores más frecuentes.
+
+Todos se actualizan por bloques (pd.Series) con operaciones vectorizadas y se
+pueden combinar con `combinar`, de modo que los bocetos parciales de distintos
+bloques o procesos se unen en una sola pasada. Cada uno informa su cota de error.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+from pandas.api import types as tipos_pandas
+
+
+def _normalizar(serie):
+    """
+    Lleva los valores no nulos de un bloque a su forma canónica: float64 para los
+    números (también los textos que representan números) y texto para el resto.
+
+    Un mismo valor tiene la misma forma (y el mismo hash) aunque el tipo de la columna
+    cambie entre bloques: p. ej. 5 en un bloque entero, 5.0 en uno decimal y "5"
+    en uno de texto.
+
+    Args:
+        serie (pd.Series): Valores del bloque.
+
+    Returns:
+        pd.Series: float64 si todos los valores son números; si no, object con float y str.
+    """
+    serie = serie.dropna()
+    if tipos_pandas.is_bool_dtype(serie):
+        return serie.astype(str).astype(object)
+    if tipos_pandas.is_numeric_dtype(serie):
+        # + 0.0 convierte -0.0 en 0.0, que de otro modo tendría otro hash
+        return serie.astype('float64') + 0.0
+    # Los textos se convierten una vez por valor distinto, no por fila
+    codigos, unicos = pd.factorize(serie.astype(str))
+    unicos = pd.Series(unicos, dtype=object)
+    # Textos que representan números (bloques donde la columna no resultó numérica)
+    numeros = pd.to_numeric(unicos, errors='coerce') + 0.0
+    es_numero = numeros.notna().to_numpy()
+    if es_numero.all():
+        return pd.Series(numeros.to_numpy(dtype=np.float64)[codigos], index=serie.index)
+    if es_numero.any():
+        unicos[es_numero] = numeros[es_numero].astype(object)
+    return pd.Series(unicos.to_numpy()[codigos], index=serie.index, dtype=object)
+
+
+def _hashes(valores):
+    """
+    Único camino de hash de los valores normalizados, sean un bloque o los candidatos guardados.
+
+    Args:
+        valores (pd.Series or np.ndarray): Valores en forma canónica (ver _normalizar).
+
+    Returns:
+        np.ndarray: Hash uint64 de cada valor; los números se hashean como float64 y los textos como str.
+    """
+    valores = np.asarray(valores)
+    if valores.dtype == np.float64:
+        return pd.util.hash_array(valores)
+    codigos, unicos = pd.factorize(valores)
+    unicos = np.asarray(unicos, dtype=object)
+    es_numero = np.fromiter((isinstance(valor, float) for valor in unicos), dtype=bool, count=len(unicos))
+    hashes = np.empty(len(unicos), dtype=np.uint64)
+    hashes[es_numero] = pd.util.hash_array(unicos[es_numero].astype(np.float64))
+    hashes[~es_numero] = pd.util.hash_array(unicos[~es_numero].astype(str).astype(object))
+    return hashes[codigos]
+
+
+class BocetoDistintos:
+    """
+    HyperLogLog con 2**precision registros.
+
+    Args:
+        precision (int): Bits del hash usados para elegir el registro (4 a 18).
+    """
+
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registros = np.zeros(1 << precision, dtype=np.uint8)
+
+    def actualizar(self, serie):
+        """
+        Incorpora los valores no nulos de un bloque.
+
+        Args:
+            serie (pd.Series): Valores del bloque.
+        """
+        hashes = _hashes(_normalizar(serie))
+        if len(hashes) == 0:
+            return
+        bits_resto = 64 - self.precision
+        indices = (hashes >> np.uint64(bits_resto)).astype(np.int64)
+        resto = (hashes & np.uint64((1 << bits_resto) - 1)).astype(np.float64)
+        # frexp da el exponente exacto: posición del primer bit en 1 del resto
+        _, exponentes = np.frexp(resto)
+        rangos = np.where(resto == 0, bits_resto + 1, bits_resto - exponentes + 1).astype(np.uint8)
+        np.maximum.at(self.registros, indices, rangos)
+
+    def combinar(self, otro):
+        """
+        Une otro boceto con la misma precisión en este.
+
+        Args:
+            otro (BocetoDistintos): Boceto a combinar.
+
+        Returns:
+            BocetoDistintos: Este mismo boceto, actualizado.
+        """
+        if otro.precision != self.precision:
+            raise ValueError("Solo se pueden combinar bocetos HyperLogLog con la misma precisión.")
+        np.maximum(self.registros, otro.registros, out=self.registros)
+        return self
+
+    def estimar(self):
+        """
+        Estima el número de valores distintos.
+
+        Returns:
+            float: Estimación del número de valores distintos.
+        """
+        m = len(self.registros)
+        alfa = 0.7213 / (1 + 1.079 / m)
+        estimacion = alfa * m * m / np.sum(np.ldexp(1.0, -self.registros.astype(np.int64)))
+        vacios = int(np.count_nonzero(self.registros == 0))
+        if estimacion <= 2.5 * m and vacios:
+            # Corrección para cardinalidades pequeñas (conteo lineal)
+            estimacion = m * math.log(m / vacios)
+        return float(estimacion)
+
+    def error_relativo(self):
+        """
+        Devuelve el error estándar relativo de la estimación (1.04 / sqrt(m)).
+
+        Returns:
+            float: Error relativo, p. ej. 0.008 para un 0.8 %.
+        """
+        return 1.04 / math.sqrt(len(self.registros))
+
+
+class BocetoCuantiles:
+    """
+    Boceto KLL de cuantiles: niveles de compactadores con capacidad decreciente.
+
+    Args:
+        k (int): Capacidad del nivel superior; el error de rango es aproximadamente 2.3 / k.
+        semilla (int, optional): Semilla del generador aleatorio de las compactaciones.
+    """
+
+    def __init__(self, k=200, semilla=None):
+        self.k = k
+        self.niveles = [np.empty(0, dtype=np.float64)]
+        self.total = 0
+        self._aleatorio = np.random.default_rng(semilla)
+
+    def _capacidad(self, nivel):
+        profundidad = len(self.niveles) - nivel - 1
+        return max(8, int(math.ceil(self.k * (2 / 3) ** profundidad)))
+
+    def _compactar(self):
+        # Al crear un nivel nuevo bajan las capacidades de los inferiores: repetir hasta que todos quepan
+        nivel = 0
+        while nivel < len(self.niveles):
+            valores = self.niveles[nivel]
+            if len(valores) <= self._capacidad(nivel):
+                nivel += 1
+            else:
+                if nivel + 1 == len(self.niveles):
+                    self.niveles.append(np.empty(0, dtype=np.float64))
+                valores = np.sort(valores)
+                # Si hay un número impar de valores, uno se queda en el nivel
+                conservado = valores[-1:] if len(valores) % 2 else valores[:0]
+                pares = valores[:len(valores) - len(conservado)]
+                promovidos = pares[self._aleatorio.integers(2)::2]
+                self.niveles[nivel] = conservado
+                self.niveles[nivel + 1] = np.concatenate([self.niveles[nivel + 1], promovidos])
+                nivel = 0
+
+    def actualizar(self, serie):
+        """
+        Incorpora los valores numéricos no nulos de un bloque.
+
+        Args:
+            serie (pd.Series): Valores del bloque.
+        """
+        valores = pd.to_numeric(serie, errors='coerce').dropna().to_numpy(dtype=np.float64)
+        if len(valores) == 0:
+            return
+        self.total += len(valores)
+        self.niveles[0] = np.concatenate([self.niveles[0], valores])
+        self._compactar()
+
+    def combinar(self, otro):
+        """
+        Une otro boceto KLL en este.
+
+        Args:
+            otro (BocetoCuantiles): Boceto a combinar.
+
+        Returns:
+            BocetoCuantiles: Este mismo boceto, actualizado.
+        """
+        while len(self.niveles) < len(otro.niveles):
+            self.niveles.append(np.empty(0, dtype=np.float64))
+        for nivel, valores in enumerate(otro.niveles):
+            self.niveles[nivel] = np.concatenate([self.niveles[nivel], valores])
+        self.total += otro.total
+        self._compactar()
+        return self
+
+    def cuantiles(self, probabilidades):
+        """
+        Estima los cuantiles pedidos.
+
+        Args:
+            probabilidades (list): Probabilidades entre 0 y 1, p. ej. [0.25, 0.5, 0.75].
+
+        Returns:
+            list: Valor estimado de cada cuantil (None si el boceto está vacío).
+        """
+        if self.total == 0:
+            return [None for _ in probabilidades]
+        valores = np.concatenate(self.niveles)
+        pesos = np.concatenate([np.full(len(nivel), 2 ** i, dtype=np.float64) for i, nivel in enumerate(self.niveles)])
+        orden = np.argsort(valores, kind='stable')
+        valores, acumulado = valores[orden], np.cumsum(pesos[orden])
+        objetivos = np.asarray(probabilidades, dtype=np.float64) * acumulado[-1]
+        posiciones = np.minimum(np.searchsorted(acumulado, objetivos, side='left'), len(valores) - 1)
+        return [float(valor) for valor in valores[posiciones]]
+
+    def error_rango(self):
+        """
+        Devuelve el error de rango normalizado aproximado (confianza del 99 %).
+
+        Returns:
+            float: Error de rango, p. ej. 0.013 para un 1.3 %.
+        """
+        return 2.296 / self.k ** 0.9723
+
+
+class BocetoFrecuencias:
+    """
+    Count-min sketch con una lista acotada de candidatos a valores más frecuentes.
+
+    Args:
+        ancho (int): Columnas de la tabla; el error es a lo sumo e / ancho del total.
+        profundidad (int): Filas (funciones hash); la cota se cumple con probabilidad 1 - e**-profundidad.
+        candidatos (int): Número de valores candidatos que se conservan.
+    """
+
+    def __init__(self, ancho=2048, profundidad=5, candidatos=50):
+        self.ancho = ancho
+        self.profundidad = profundidad
+        self.max_candidatos = candidatos
+        self.tabla = np.zeros((profundidad, ancho), dtype=np.int64)
+        self.total = 0
+        self.candidatos = set()
+
+    def _columnas(self, valores):
+        # Doble hashing: h1 + i * h2 genera las `profundidad` funciones hash
+        hashes = _hashes(valores)
+        h1 = (hashes & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        h2 = (hashes >> np.uint64(32)).astype(np.int64) | 1
+        return [(h1 + i * h2) % self.ancho for i in range(self.profundidad)]
+
+    def _estimar(self, valores):
+        columnas = self._columnas(valores)
+        return np.min([self.tabla[i, columnas[i]] for i in range(self.profundidad)], axis=0)
+
+    def _podar(self):
+        if len(self.candidatos) <= self.max_candidatos:
+            return
+        valores = np.array(list(self.candidatos), dtype=object)
+        estimaciones = self._estimar(valores)
+        mejores = np.argsort(-estimaciones, kind='stable')[:self.max_candidatos]
+        self.candidatos = set(valores[mejores])
+
+    def actualizar(self, serie):
+        """
+        Incorpora los valores no nulos de un bloque.
+
+        Args:
+            serie (pd.Series): Valores del bloque.
+        """
+        conteos = _normalizar(serie).value_counts()
+        if len(conteos) == 0:
+            return
+        valores = np.asarray(conteos.index, dtype=object)
+        for i, columnas in enumerate(self._columnas(valores)):
+            np.add.at(self.tabla[i], columnas, conteos.to_numpy(dtype=np.int64))
+        self.total += int(conteos.sum())
+        self.candidatos.update(valores[:self.max_candidatos])
+        self._podar()
+
+    def combinar(self, otro):
+        """
+        Une otro boceto con las mismas dimensiones en este.
+
+        Args:
+            otro (BocetoFrecuencias): Boceto a combinar.
+
+        Returns:
+            BocetoFrecuencias: Este mismo boceto, actualizado.
+        """
+        if self.tabla.shape != otro.tabla.shape:
+            raise ValueError("Solo se pueden combinar bocetos count-min con las mismas dimensiones.")
+        self.tabla += otro.tabla
+        self.total += otro.total
+        self.candidatos |= otro.candidatos
+        self._podar()
+        return self
+
+    def mas_frecuentes(self, n=5):
+        """
+        Devuelve los valores más frecuentes con su frecuencia estimada.
+
+        Args:
+            n (int): Número de valores a devolver.
+
+        Returns:
+            list: Pares (valor en forma canónica, ver _normalizar; frecuencia estimada), de mayor a menor.
+        """
+        if not self.candidatos:
+            return []
+        valores = np.array(list(self.candidatos), dtype=object)
+        estimaciones = self._estimar(valores)
+        orden = np.argsort(-estimaciones, kind='stable')[:n]
+        return [(valores[i], int(estimaciones[i])) for i in orden]
+
+    def error_absoluto(self):
+        """
+        Devuelve la sobreestimación máxima de cada frecuencia (e / ancho * total).
+
+        Returns:
+            float: Cota del error, válida con probabilidad 1 - e**-profundidad.
+        """
+        return math.e / self.ancho * self.total
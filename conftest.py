@@ -0,0 +1,4 @@
+"""
+Configuración de pytest: su presencia en la raíz hace que los módulos del
+repositorio se puedan importar desde tests/ (p. ej. `import bocetos`).
+"""
@@ -0,0 +1,354 @@
+"""
+Motor de consultas de filtro y agregación.
+
+Ofrece una API mínima (`filtrar` y `agregar`) que ejecuta la consulta con el
+motor disponible: DuckDB (columnar y multihilo, con los filtros aplicados
+durante el escaneo, sin copias intermedias), Polars o, si ninguno está
+instalado, pandas. Los datos pueden ser un DataFrame en memoria o una lista
+de archivos Parquet (p. ej. el almacén de datos_madera), en cuyo caso los
+filtros se empujan a la lectura y solo se leen las columnas necesarias.
+
+Todos los motores devuelven el mismo resultado que pandas: mismas columnas y
+tipos (las categóricas conservan sus categorías) y filas ordenadas por las
+columnas de agrupación, como `groupby(..., observed=True)`. Desde archivos
+Parquet, las columnas categóricas de los archivos tienen como categorías los
+valores presentes en el resultado, ordenados como los que crea pd.read_csv.
+
+El motor se elige con la variable de entorno APPS_STREAMLIT_MOTOR ('duckdb',
+'polars' o 'pandas'); por defecto, el primero instalado. Con menos de
+FILAS_MINIMAS_MOTOR filas en memoria se usa pandas, que es más rápido para
+tablas pequeñas. Los módulos de DuckDB y Polars solo se importan la primera
+vez que resuelven una consulta.
+"""
+import importlib
+import importlib.util
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pandas.api import types as tipos_pandas
+
+MOTORES = ['duckdb', 'polars', 'pandas']
+
+# Motores instalados (se comprueba sin importarlos: cada uno ocupa decenas de MB)
+_INSTALADOS = [motor for motor in MOTORES if motor == 'pandas' or importlib.util.find_spec(motor) is not None]
+
+# Por debajo de este número de filas preparar la consulta en otro motor cuesta más que resolverla en pandas
+FILAS_MINIMAS_MOTOR = 200_000
+
+FUNCIONES = ['sum', 'size', 'count', 'min', 'max', 'mean']
+
+# Una conexión de DuckDB por hilo (Streamlit ejecuta cada sesión en su propio hilo)
+_local = threading.local()
+
+
+def motores_disponibles():
+    """
+    Devuelve los motores instalados, en orden de preferencia.
+
+    Returns:
+        list: Nombres de MOTORES disponibles (pandas siempre lo está).
+    """
+    return list(_INSTALADOS)
+
+
+def _motor_configurado():
+    motor = os.environ.get('APPS_STREAMLIT_MOTOR', '').lower()
+    disponibles = motores_disponibles()
+    return motor if motor in disponibles else disponibles[0]
+
+
+MOTOR = _motor_configurado()
+
+
+def elegir_motor(datos, motor=None):
+    """
+    Decide qué motor resuelve una consulta.
+
+    Args:
+        datos (pd.DataFrame or list): DataFrame o lista de rutas Parquet.
+        motor (str, optional): Motor pedido; por defecto, MOTOR.
+
+    Returns:
+        str: 'duckdb', 'polars' o 'pandas'.
+    """
+    motor = motor or MOTOR
+    if motor not in motores_disponibles():
+        raise ValueError(f"Motor de consultas no disponible: {motor!r}. Opciones: {motores_disponibles()}")
+    if isinstance(datos, pd.DataFrame) and len(datos) < FILAS_MINIMAS_MOTOR:
+        return 'pandas'
+    return motor
+
+
+def _modulo(motor):
+    # importlib ya guarda los módulos importados en sys.modules
+    return importlib.import_module(motor)
+
+
+def _lista(valor):
+    return isinstance(valor, (list, tuple, set, frozenset))
+
+
+def _columnas_necesarias(por, medidas, filtros, columnas=None):
+    necesarias = list(columnas or []) + list(por or [])
+    necesarias += [columna for columna, _ in (medidas or {}).values()] + list(filtros or {})
+    return list(dict.fromkeys(necesarias))
+
+
+# --- pandas ---
+
+def _mascara_pandas(df, filtros):
+    mascara = pd.Series(True, index=df.index)
+    for columna, valor in filtros.items():
+        if _lista(valor):
+            mascara &= df[columna].isin(list(valor))
+        else:
+            mascara &= df[columna] == valor
+    return mascara
+
+
+def _leer_parquet(rutas, columnas, filtros):
+    # pyarrow aplica los filtros por grupo de filas y solo lee las columnas pedidas. Las columnas
+    # de partición ya están en los archivos: no se deducen de los nombres de directorio (AÑO=…)
+    condiciones = [
+        (columna, 'in', list(valor)) if _lista(valor) else (columna, '==', valor)
+        for columna, valor in (filtros or {}).items()
+    ]
+    return pq.read_table(list(rutas), columns=columnas, filters=condiciones or None,
+                         partitioning=None).to_pandas()
+
+
+def _filtrar_pandas(datos, filtros, columnas):
+    if not isinstance(datos, pd.DataFrame):
+        return _leer_parquet(datos, columnas, filtros)
+    if filtros:
+        datos = datos[_mascara_pandas(datos, filtros)]
+    return datos if columnas is None else datos[columnas]
+
+
+def _agregar_pandas(datos, por, medidas, filtros):
+    vista = _filtrar_pandas(datos, filtros, _columnas_necesarias(por, medidas, None))
+    return vista.groupby(por, observed=True).agg(**medidas).reset_index()
+
+
+# --- DuckDB ---
+
+def _identificador(nombre):
+    return '"' + nombre.replace('"', '""') + '"'
+
+
+def _conexion():
+    conexion = getattr(_local, 'conexion', None)
+    if conexion is None:
+        conexion = _modulo('duckdb').connect()
+        _local.conexion = conexion
+    return conexion
+
+
+def _condiciones_sql(filtros, por=None):
+    # Como groupby de pandas, las filas con clave de agrupación nula no forman grupo
+    condiciones = [f"{_identificador(columna)} IS NOT NULL" for columna in por or []]
+    parametros = []
+    for columna, valor in (filtros or {}).items():
+        if _lista(valor):
+            valores = list(valor)
+            if not valores:
+                condiciones.append('FALSE')
+                continue
+            condiciones.append(f"{_identificador(columna)} IN ({', '.join('?' for _ in valores)})")
+            parametros += valores
+        else:
+            condiciones.append(f"{_identificador(columna)} = ?")
+            parametros.append(valor)
+    return (' WHERE ' + ' AND '.join(condiciones) if condiciones else ''), parametros
+
+
+def _consultar_duckdb(datos, seleccion, filtros, por=None):
+    conexion = _conexion()
+    where, parametros = _condiciones_sql(filtros, por)
+    if isinstance(datos, pd.DataFrame):
+        # La tabla registrada es una vista sobre el DataFrame: no se copia
+        nombre = f"datos_{threading.get_ident()}"
+        conexion.register(nombre, datos)
+        origen = nombre
+    else:
+        nombre = None
+        origen = f"read_parquet([{', '.join('?' for _ in datos)}], hive_partitioning = false)"
+        parametros = list(datos) + parametros
+    sql = f"SELECT {seleccion} FROM {origen}{where}"
+    if por:
+        sql += f" GROUP BY {', '.join(_identificador(c) for c in por)}"
+    try:
+        return conexion.execute(sql, parametros).df()
+    finally:
+        if nombre is not None:
+            conexion.unregister(nombre)
+
+
+def _filtrar_duckdb(datos, filtros, columnas):
+    seleccion = ', '.join(_identificador(c) for c in columnas) if columnas else '*'
+    return _consultar_duckdb(datos, seleccion, filtros)
+
+
+def _agregar_duckdb(datos, por, medidas, filtros):
+    sql = {'sum': 'SUM({})', 'size': 'COUNT(*)', 'count': 'COUNT({})', 'min': 'MIN({})', 'max': 'MAX({})',
+           'mean': 'AVG({})'}
+    claves = ', '.join(_identificador(c) for c in por)
+    agregados = ', '.join(
+        f"{sql[funcion].format(_identificador(columna))} AS {_identificador(nombre)}"
+        for nombre, (columna, funcion) in medidas.items()
+    )
+    return _consultar_duckdb(datos, f"{claves}, {agregados}", filtros, por)
+
+
+# --- Polars ---
+
+def _marco_polars(datos, columnas):
+    pl = _modulo('polars')
+    if isinstance(datos, pd.DataFrame):
+        return pl.from_pandas(datos[columnas] if columnas else datos).lazy()
+    marco = pl.scan_parquet(list(datos), hive_partitioning=False)
+    return marco.select(columnas) if columnas else marco
+
+
+def _expresion_polars(filtros):
+    pl = _modulo('polars')
+    expresion = pl.lit(True)
+    for columna, valor in (filtros or {}).items():
+        valores = list(valor) if _lista(valor) else [valor]
+        # Las categóricas se comparan como texto
+        campo = pl.col(columna).cast(pl.Utf8) if valores and isinstance(valores[0], str) else pl.col(columna)
+        expresion = expresion & campo.is_in(valores)
+    return expresion
+
+
+def _filtrar_polars(datos, filtros, columnas):
+    pl = _modulo('polars')
+    return _marco_polars(datos, _columnas_necesarias(None, None, filtros, columnas) if columnas else None) \
+        .filter(_expresion_polars(filtros)).select(columnas or pl.all()).collect().to_pandas()
+
+
+def _agregar_polars(datos, por, medidas, filtros):
+    pl = _modulo('polars')
+    funciones = {
+        'sum': lambda c: pl.col(c).sum(), 'size': lambda c: pl.len(), 'count': lambda c: pl.col(c).count(),
+        'min': lambda c: pl.col(c).min(), 'max': lambda c: pl.col(c).max(), 'mean': lambda c: pl.col(c).mean(),
+    }
+    return (
+        _marco_polars(datos, _columnas_necesarias(por, medidas, filtros))
+        .filter(_expresion_polars(filtros))
+        .drop_nulls(por)
+        .group_by(por)
+        .agg([funciones[funcion](columna).alias(nombre) for nombre, (columna, funcion) in medidas.items()])
+        .collect()
+        .to_pandas()
+    )
+
+
+# --- API ---
+
+def _mismo_tipo(serie, tipo):
+    # Dos categóricas no ordenadas son "iguales" aunque el orden de sus categorías difiera
+    if isinstance(tipo, pd.CategoricalDtype):
+        return isinstance(serie.dtype, pd.CategoricalDtype) and serie.dtype.ordered == tipo.ordered \
+            and serie.cat.categories.equals(tipo.categories)
+    return serie.dtype == tipo
+
+
+def _convertir(serie, tipo):
+    if isinstance(tipo, pd.CategoricalDtype) and isinstance(serie.dtype, pd.CategoricalDtype):
+        # astype no recodifica si las categorías solo difieren en el orden
+        return serie.cat.set_categories(tipo.categories, ordered=tipo.ordered)
+    return serie.astype(tipo)
+
+
+def _es_entera(datos, columna):
+    if isinstance(datos, pd.DataFrame):
+        return tipos_pandas.is_integer_dtype(datos[columna])
+    return pa.types.is_integer(pq.read_schema(datos[0]).field(columna).type) if len(datos) else False
+
+
+def _categoricas_parquet(resultado, rutas, columnas):
+    # Las categorías de cada archivo dependen de cómo se escribió y cada motor las lee a su
+    # manera (texto, o categorías en orden de aparición): se fijan a los valores presentes
+    if not len(rutas):
+        return resultado
+    tipos = pq.read_schema(rutas[0]).empty_table().to_pandas().dtypes
+    for columna in columnas:
+        tipo = tipos.get(columna)
+        if not isinstance(tipo, pd.CategoricalDtype):
+            continue
+        serie = resultado[columna]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            serie = serie.astype(serie.cat.categories.dtype)
+        categorias = pd.Index(serie.dropna().unique()).sort_values()
+        resultado[columna] = pd.Categorical(serie, categories=categorias, ordered=tipo.ordered)
+    return resultado
+
+
+def _tipos_pandas(resultado, datos, por, medidas):
+    # Mismos tipos y orden de filas que groupby de pandas, sea cual sea el motor
+    if isinstance(datos, pd.DataFrame):
+        for columna in por:
+            if not _mismo_tipo(resultado[columna], datos[columna].dtype):
+                resultado[columna] = _convertir(resultado[columna], datos[columna].dtype)
+    else:
+        resultado = _categoricas_parquet(resultado, datos, por)
+    for nombre, (columna, funcion) in medidas.items():
+        if funcion in ('size', 'count') or (funcion == 'sum' and _es_entera(datos, columna)):
+            resultado[nombre] = resultado[nombre].astype('int64')
+    return resultado.sort_values(por, ignore_index=True)
+
+
+def filtrar(datos, filtros=None, columnas=None, motor=None):
+    """
+    Devuelve las filas que cumplen los filtros.
+
+    Args:
+        datos (pd.DataFrame or list): DataFrame o lista de rutas Parquet.
+        filtros (dict, optional): Columna -> valor o lista de valores admitidos.
+        columnas (list, optional): Columnas a devolver; por defecto, todas.
+        motor (str, optional): Motor a usar; por defecto, elegir_motor.
+
+    Returns:
+        pd.DataFrame: Filas filtradas. Con pandas sobre un DataFrame se conservan su
+        índice y sus tipos; los otros motores devuelven un índice nuevo.
+    """
+    motor = elegir_motor(datos, motor)
+    if motor == 'pandas' and isinstance(datos, pd.DataFrame):
+        return _filtrar_pandas(datos, filtros, columnas)
+    filtradores = {'pandas': _filtrar_pandas, 'duckdb': _filtrar_duckdb, 'polars': _filtrar_polars}
+    resultado = filtradores[motor](datos, filtros, columnas)
+    if not isinstance(datos, pd.DataFrame):
+        return _categoricas_parquet(resultado, datos, resultado.columns)
+    for columna in resultado.columns:
+        if not _mismo_tipo(resultado[columna], datos[columna].dtype):
+            resultado[columna] = _convertir(resultado[columna], datos[columna].dtype)
+    return resultado
+
+
+def agregar(datos, por, medidas, filtros=None, motor=None):
+    """
+    Agrupa las filas que cumplen los filtros y calcula las medidas de cada grupo.
+
+    Equivale a `datos[filtro].groupby(por, observed=True).agg(**medidas).reset_index()`.
+
+    Args:
+        datos (pd.DataFrame or list): DataFrame o lista de rutas Parquet.
+        por (str or list): Columna o columnas de agrupación.
+        medidas (dict): Nombre del resultado -> (columna, función), con función en FUNCIONES.
+        filtros (dict, optional): Columna -> valor o lista de valores admitidos.
+        motor (str, optional): Motor a usar; por defecto, elegir_motor.
+
+    Returns:
+        pd.DataFrame: Una fila por grupo observado, ordenadas por `por`.
+    """
+    por = [por] if isinstance(por, str) else list(por)
+    desconocidas = {funcion for _, funcion in medidas.values()} - set(FUNCIONES)
+    if desconocidas:
+        raise ValueError(f"Funciones de agregación desconocidas: {sorted(desconocidas)}. Opciones: {FUNCIONES}")
+    motor = elegir_motor(datos, motor)
+    agregadores = {'pandas': _agregar_pandas, 'duckdb': _agregar_duckdb, 'polars': _agregar_polars}
+    return _tipos_pandas(agregadores[motor](datos, por, medidas, filtros), datos, por, medidas)
@@ -0,0 +1,233 @@
+"""
+Cubo de agregados de la base de datos de madera.
+
+Agrupa una sola vez, por versión del dataset, el volumen y el número de
+registros sobre todas las dimensiones que usan las vistas de App_madera.
+Las vistas piden enrollados (roll-ups) y rebanadas al cubo en lugar de
+recorrer las filas originales, y cada enrollado queda memorizado.
+
+Como las medidas son sumas, el cubo de un dataset al que se le anexan filas
+se obtiene sumando el cubo de las filas nuevas (ver CuboMadera.anexar y
+actualizar_cubo), sin volver a agrupar el histórico.
+"""
+import threading
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+import consultas
+import instrumentacion
+
+DIMENSIONES = ['AÑO', 'SEMESTRE', 'TRIMESTRE', 'DPTO', 'MUNICIPIO', 'COD_MPIO', 'ESPECIE', 'TIPO PRODUCTO']
+MEDIDAS = ['VOLUMEN M3', 'REGISTROS']
+
+# Medidas del cubo a partir de las filas originales y al volver a sumar filas del cubo
+_MEDIDAS_FILAS = {'VOLUMEN M3': ('VOLUMEN M3', 'sum'), 'REGISTROS': ('VOLUMEN M3', 'size')}
+_MEDIDAS_SUMA = {medida: (medida, 'sum') for medida in MEDIDAS}
+
+# Número de versiones del dataset cuyo cubo se mantiene en memoria
+MAX_CUBOS = 2
+
+# Dimensiones que identifican una partición del dataset (ver datos_madera)
+PARTICION = ['AÑO', 'SEMESTRE']
+
+_cubos = {}
+_candado = threading.Lock()
+
+
+class CuboMadera:
+    """
+    Agregados de volumen y registros sobre DIMENSIONES, con enrollados memorizados.
+
+    Args:
+        datos (pd.DataFrame): Tabla del cubo con las columnas DIMENSIONES y MEDIDAS.
+        version (str): Versión del dataset a partir del cual se construyó.
+    """
+
+    def __init__(self, datos, version):
+        self.datos = datos
+        self.version = version
+        # (dimensiones, filtros) -> (filtros originales, enrollado)
+        self._memo = {}
+        self._candado = threading.Lock()
+
+    def rebanar(self, filtros=None):
+        """
+        Devuelve las filas del cubo que cumplen los filtros.
+
+        Args:
+            filtros (dict, optional): Dimensión -> valor o lista de valores admitidos.
+
+        Returns:
+            pd.DataFrame: Subconjunto del cubo (de solo lectura).
+        """
+        if not filtros:
+            return self.datos
+        return consultas.filtrar(self.datos, filtros)
+
+    def enrollar(self, por, filtros=None):
+        """
+        Suma las medidas del cubo agrupando por las dimensiones indicadas.
+
+        Args:
+            por (str or list): Dimensión o lista de dimensiones a conservar.
+            filtros (dict, optional): Dimensión -> valor o lista de valores admitidos.
+
+        Returns:
+            pd.DataFrame: Una fila por combinación observada, con 'VOLUMEN M3' y 'REGISTROS'.
+        """
+        por = [por] if isinstance(por, str) else list(por)
+        clave = (tuple(por), _clave_filtros(filtros))
+        with self._candado:
+            entrada = self._memo.get(clave)
+        instrumentacion.marcar_cache('enrollado', entrada is not None)
+        if entrada is not None:
+            resultado = entrada[1]
+        else:
+            resultado = _sumar(self.datos, por, filtros)
+            with self._candado:
+                self._memo[clave] = (filtros, resultado)
+        # Copia superficial para que quien llama pueda añadir columnas sin tocar el memo
+        return resultado.copy(deep=False)
+
+
+    def anexar(self, delta, version):
+        """
+        Devuelve el cubo del dataset con filas nuevas, sumando solo su aporte.
+
+        Las filas del cubo de las particiones (AÑO, SEMESTRE) que no aparecen en
+        las filas nuevas se conservan tal cual; solo se vuelven a agrupar las de
+        las particiones tocadas. Los enrollados memorizados se actualizan también
+        sumando el enrollado de las filas nuevas.
+
+        Args:
+            delta (pd.DataFrame): Filas nuevas, con las columnas de DIMENSIONES y 'VOLUMEN M3'.
+            version (str): Versión del dataset con las filas nuevas.
+
+        Returns:
+            CuboMadera: Cubo nuevo (este no se modifica).
+        """
+        cubo_delta = construir_cubo(delta)
+        particiones = pd.MultiIndex.from_frame(cubo_delta[PARTICION].drop_duplicates())
+        tocadas = pd.MultiIndex.from_frame(self.datos[PARTICION]).isin(particiones)
+        datos = concatenar([
+            self.datos[~tocadas],
+            _sumar(concatenar([self.datos[tocadas], cubo_delta]), DIMENSIONES),
+        ])
+
+        nuevo = CuboMadera(datos, version)
+        with self._candado:
+            memo = dict(self._memo)
+        for clave, (filtros, resultado) in memo.items():
+            por = list(clave[0])
+            aporte = _sumar(cubo_delta, por, filtros)
+            nuevo._memo[clave] = (filtros, _sumar(concatenar([resultado, aporte]), por))
+        return nuevo
+
+
+def _sumar(datos, por, filtros=None):
+    return consultas.agregar(datos, por, _MEDIDAS_SUMA, filtros)
+
+
+def concatenar(marcos):
+    """
+    Concatena DataFrames con las mismas columnas conservando las columnas categóricas.
+
+    pd.concat convierte a texto una columna categórica si las categorías difieren
+    entre los marcos; aquí se unen las categorías, ordenadas como las que crea
+    pd.read_csv, para que el resultado sea igual al de leer todo de una vez.
+
+    Args:
+        marcos (list): DataFrames con las mismas columnas.
+
+    Returns:
+        pd.DataFrame: Filas de todos los marcos, con índice nuevo.
+    """
+    columnas = {}
+    for columna in marcos[0].columns:
+        partes = [marco[columna] for marco in marcos]
+        tipos = {parte.dtype for parte in partes}
+        if len(tipos) > 1 and all(isinstance(tipo, pd.CategoricalDtype) for tipo in tipos):
+            columnas[columna] = pd.Series(union_categoricals(partes, sort_categories=True, ignore_order=True), name=columna)
+        else:
+            columnas[columna] = pd.concat(partes, ignore_index=True)
+    return pd.DataFrame(columnas)
+
+
+def _clave_filtros(filtros):
+    if not filtros:
+        return ()
+    clave = []
+    for dimension, valor in sorted(filtros.items()):
+        if isinstance(valor, (list, tuple, set, frozenset)):
+            valor = tuple(sorted(map(str, valor)))
+        clave.append((dimension, valor))
+    return tuple(clave)
+
+
+def construir_cubo(df):
+    """
+    Construye el cubo agregando el volumen y contando registros por todas las DIMENSIONES.
+
+    La agregación la resuelve el motor de consultas (ver consultas.MOTOR).
+
+    Args:
+        df (pd.DataFrame): DataFrame con los datos de madera.
+
+    Returns:
+        pd.DataFrame: Tabla del cubo con las columnas DIMENSIONES y MEDIDAS.
+    """
+    return consultas.agregar(df, DIMENSIONES, _MEDIDAS_FILAS)
+
+
+def obtener_cubo(df):
+    """
+    Devuelve el cubo del DataFrame, construyéndolo solo la primera vez para cada versión
+    (sin df.attrs['version'] se construye cada vez y no se memoriza).
+
+    Args:
+        df (pd.DataFrame): DataFrame con los datos de madera (cargado con datos_madera).
+
+    Returns:
+        CuboMadera: Cubo compartido por todas las vistas.
+    """
+    version = df.attrs.get('version')
+    with _candado:
+        cubo = _cubos.get(version) if version else None
+    instrumentacion.marcar_cache('cubo', cubo is not None)
+    if cubo is None:
+        cubo = CuboMadera(construir_cubo(df), version)
+        if not version:
+            return cubo
+        with _candado:
+            _cubos[version] = cubo
+            while len(_cubos) > MAX_CUBOS:
+                _cubos.pop(next(iter(_cubos)))
+    return cubo
+
+
+def actualizar_cubo(version_anterior, delta, version):
+    """
+    Registra el cubo de una versión nueva del dataset a partir del cubo de la anterior.
+
+    Si el cubo de la versión anterior no está en memoria no se hace nada: se
+    construirá completo la primera vez que se pida con obtener_cubo.
+
+    Args:
+        version_anterior (str): Versión del dataset antes de anexar las filas.
+        delta (pd.DataFrame): Filas anexadas (con COD_MPIO).
+        version (str): Versión del dataset con las filas anexadas.
+
+    Returns:
+        CuboMadera or None: Cubo de la versión nueva, o None si no había cubo anterior.
+    """
+    with _candado:
+        anterior = _cubos.get(version_anterior)
+    if anterior is None:
+        return None
+    cubo = anterior.anexar(delta, version)
+    with _candado:
+        _cubos[version] = cubo
+        while len(_cubos) > MAX_CUBOS:
+            _cubos.pop(next(iter(_cubos)))
+    return cubo
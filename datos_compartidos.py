@@ -0,0 +1,216 @@
+"""
+Dataset compartido e inmutable de la base de madera.
+
+Cada versión de la base se guarda como un archivo Arrow IPC sin comprimir y
+se abre con un mapa de memoria: las columnas del DataFrame (enteros y códigos
+de las categóricas) apuntan directamente a las páginas del archivo, sin
+copias. Todas las sesiones de Streamlit del proceso usan el mismo objeto, y
+los demás procesos que abren el archivo (precalentamiento, otras réplicas del
+servidor) comparten las mismas páginas físicas a través de la caché de
+páginas del sistema, de modo que la memoria no crece con los usuarios.
+
+El DataFrame es de solo lectura: sus arreglos no se pueden escribir y
+DatosCompartidos rechaza las operaciones que lo modificarían en el lugar
+(asignar, insertar o borrar columnas, escribir con loc/iloc/at/iat, los
+métodos con inplace=True, update, los operadores como += y cambiar sus
+df.attrs, que quedan fijos al abrir el archivo). Las vistas trabajan sobre
+selecciones (que, con Copy-on-Write, no copian datos hasta que se modifican)
+o sobre sus propios resultados.
+
+Del archivo solo se guardan los df.attrs de ATRIBUTOS_PERSISTENTES (la
+versión); los que describen una carga concreta (p. ej. el resumen de una
+actualización) los indica quien abre el archivo en esa carga.
+"""
+import copy
+import functools
+import json
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+# Clave de los metadatos del archivo donde se guardan los df.attrs
+_CLAVE_ATRIBUTOS = b"apps_streamlit.attrs"
+
+# df.attrs que se guardan en el archivo (los demás dependen de la carga que los calculó)
+ATRIBUTOS_PERSISTENTES = ("version",)
+
+# Métodos que modifican el DataFrame cuando se llaman con inplace=True
+_METODOS_INPLACE = (
+    "bfill", "clip", "drop", "drop_duplicates", "dropna", "eval", "ffill", "fillna", "interpolate",
+    "mask", "query", "rename", "rename_axis", "replace", "reset_index", "set_index", "sort_index",
+    "sort_values", "where",
+)
+
+# Operadores en el lugar (df += 1, df |= mascara, ...)
+_OPERADORES_INPLACE = (
+    "__iadd__", "__isub__", "__imul__", "__itruediv__", "__ifloordiv__", "__imod__", "__ipow__",
+    "__iand__", "__ior__", "__ixor__",
+)
+
+_MENSAJE_INMUTABLE = (
+    "Los datos de madera son compartidos entre sesiones y no se pueden modificar; "
+    "trabaje sobre una selección o una copia (p. ej. df[columnas] o df.copy())."
+)
+
+
+class _AtributosFijos(dict):
+    """
+    df.attrs de un DatosCompartidos: se leen como un dict, pero no se pueden cambiar.
+    Sus copias (las que pandas pasa a los DataFrames derivados) son dicts normales.
+    """
+
+    def _inmutable(self, *args, **kwargs):
+        raise TypeError(_MENSAJE_INMUTABLE)
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = __ior__ = _inmutable
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(dict(self), memo)
+
+
+class _IndexadorLectura:
+    """
+    loc, iloc, at o iat de un DatosCompartidos: permite seleccionar, no asignar.
+    """
+
+    def __init__(self, indexador):
+        self._indexador = indexador
+
+    def __getitem__(self, clave):
+        return self._indexador[clave]
+
+    def __setitem__(self, clave, valor):
+        raise TypeError(_MENSAJE_INMUTABLE)
+
+    def __call__(self, *args, **kwargs):
+        return _IndexadorLectura(self._indexador(*args, **kwargs))
+
+    def __getattr__(self, nombre):
+        return getattr(self._indexador, nombre)
+
+
+class DatosCompartidos(pd.DataFrame):
+    """
+    DataFrame de solo lectura respaldado por un archivo Arrow mapeado en memoria.
+
+    Las operaciones que derivan otro DataFrame (selecciones, filtros, copias,
+    agrupaciones) devuelven un pd.DataFrame normal; las que modificarían este
+    objeto lanzan TypeError.
+    """
+
+    @property
+    def _constructor(self):
+        return pd.DataFrame
+
+    def _inmutable(self, *args, **kwargs):
+        raise TypeError(_MENSAJE_INMUTABLE)
+
+    __setitem__ = __delitem__ = insert = pop = update = _inmutable
+
+    def __setattr__(self, nombre, valor):
+        # df.columna = ..., df.index = ..., df.attrs = ...; pandas solo fija atributos privados
+        if not nombre.startswith("_"):
+            self._inmutable()
+        super().__setattr__(nombre, valor)
+
+    @property
+    def attrs(self):
+        return self._attrs
+
+    @property
+    def loc(self):
+        return _IndexadorLectura(super().loc)
+
+    @property
+    def iloc(self):
+        return _IndexadorLectura(super().iloc)
+
+    @property
+    def at(self):
+        return _IndexadorLectura(super().at)
+
+    @property
+    def iat(self):
+        return _IndexadorLectura(super().iat)
+
+
+def _sin_inplace(nombre):
+    original = getattr(pd.DataFrame, nombre)
+
+    @functools.wraps(original)
+    def metodo(self, *args, **kwargs):
+        if kwargs.get("inplace"):
+            self._inmutable()
+        return original(self, *args, **kwargs)
+
+    return metodo
+
+
+for _nombre in _METODOS_INPLACE:
+    setattr(DatosCompartidos, _nombre, _sin_inplace(_nombre))
+for _nombre in _OPERADORES_INPLACE:
+    setattr(DatosCompartidos, _nombre, DatosCompartidos._inmutable)
+
+
+def es_compartido(df):
+    """
+    Indica si el DataFrame es el dataset compartido (y de solo lectura).
+
+    Args:
+        df (pd.DataFrame): DataFrame a comprobar.
+
+    Returns:
+        bool: True si es un DatosCompartidos.
+    """
+    return isinstance(df, DatosCompartidos)
+
+
+def escribir(df, ruta):
+    """
+    Guarda el DataFrame como archivo Arrow IPC sin comprimir (para poder mapearlo),
+    junto con sus df.attrs de ATRIBUTOS_PERSISTENTES. La escritura es atómica: un
+    proceso que ya mapeó una versión anterior del archivo la sigue leyendo sin cambios.
+
+    Args:
+        df (pd.DataFrame): Datos a guardar.
+        ruta (str): Ruta del archivo .arrow.
+    """
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    atributos = {clave: valor for clave, valor in df.attrs.items() if clave in ATRIBUTOS_PERSISTENTES}
+    metadatos = {**(tabla.schema.metadata or {}), _CLAVE_ATRIBUTOS: json.dumps(atributos).encode("utf-8")}
+    tabla = tabla.replace_schema_metadata(metadatos)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with pa.OSFile(temporal, "wb") as archivo, ipc.new_file(archivo, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    os.replace(temporal, ruta)
+
+
+def abrir(ruta, atributos=None):
+    """
+    Abre un archivo escrito con `escribir` como DataFrame de solo lectura mapeado en memoria.
+
+    Args:
+        ruta (str): Ruta del archivo .arrow.
+        atributos (dict, optional): df.attrs propios de esta carga, que se suman a los guardados.
+
+    Returns:
+        DatosCompartidos: Datos con los mismos tipos que al guardarlos y df.attrs fijos.
+
+    Raises:
+        OSError: Si el archivo no existe o no se puede leer.
+        ValueError: Si el archivo no es un Arrow IPC válido.
+    """
+    tabla = ipc.open_file(pa.memory_map(ruta, "r")).read_all()
+    # split_blocks: un bloque por columna, cada uno apuntando a su búfer del archivo
+    df = DatosCompartidos(tabla.to_pandas(split_blocks=True))
+    guardados = (tabla.schema.metadata or {}).get(_CLAVE_ATRIBUTOS)
+    fijos = {**(json.loads(guardados) if guardados else {}), **(atributos or {})}
+    object.__setattr__(df, "_attrs", _AtributosFijos(fijos))
+    return df
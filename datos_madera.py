@@ -0,0 +1,504 @@
+"""
+Capa de carga de la base de datos de madera movilizada.
+
+Lee el CSV con un esquema fijo (columnas categóricas y enteros compactos),
+lo guarda en un almacén local en Parquet particionado por (AÑO, SEMESTRE),
+validado contra el ETag/Last-Modified de la fuente (o la fecha de
+modificación si es un archivo local), y mantiene un caché a nivel de proceso
+para que las re-ejecuciones de Streamlit no vuelvan a descargar ni a parsear
+el archivo. Al cargar se añade la columna COD_MPIO con el código DIVIPOLA de
+cada municipio (ver indice_municipios).
+
+Cuando la fuente crece (se publica un semestre nuevo), solo se descargan y
+parsean los bytes añadidos: las filas nuevas se escriben como archivos nuevos
+de sus particiones, y el cubo de agregados y el detector incremental de
+outliers se actualizan por diferencia, de modo que el costo de refrescar
+depende del tamaño de lo nuevo y no del histórico. Con anexar_madera se pueden sumar otros datasets con el mismo
+esquema, partición por partición.
+
+La versión vigente se publica además como un archivo Arrow mapeado en
+memoria (ver datos_compartidos): el DataFrame que reciben las vistas es de
+solo lectura y lo comparten todas las sesiones sin copias.
+
+Estructura del almacén (en DIRECTORIO_CACHE/madera-<hash de la fuente>/):
+    manifiesto.json                      versión, bytes leídos y lista de archivos
+    compartido-<hash de la versión>.arrow  base completa (con COD_MPIO), mapeada en memoria
+    AÑO=2012/SEMESTRE=I/parte-0000.parquet
+    AÑO=2012/SEMESTRE=II/parte-0000.parquet
+    ...
+"""
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+import time
+
+import pandas as pd
+
+import cubo_madera
+import datos_compartidos
+import descargas
+import indice_municipios
+import instrumentacion
+import motor_outliers
+
+URL_MADERA = "https://raw.githubusercontent.com/Darkblack595/Apps_streamlit/refs/heads/main/base_datos_madera.csv"
+
+# Directorio donde se guardan los almacenes locales
+DIRECTORIO_CACHE = os.environ.get(
+    "APPS_STREAMLIT_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+)
+
+# Segundos durante los cuales no se vuelve a consultar la versión de la fuente
+INTERVALO_REVALIDACION = 300
+
+# Bytes finales ya leídos que se vuelven a pedir para comprobar que la fuente solo creció por el final
+BYTES_COLA = 1024
+
+ORDEN_SEMESTRE = ["I", "II"]
+ORDEN_TRIMESTRE = ["I", "II", "III", "IV", "(en blanco)"]
+
+ESQUEMA_MADERA = {
+    "AÑO": "int16",
+    "SEMESTRE": pd.CategoricalDtype(ORDEN_SEMESTRE, ordered=True),
+    "TRIMESTRE": pd.CategoricalDtype(ORDEN_TRIMESTRE, ordered=True),
+    "DPTO": "category",
+    "MUNICIPIO": "category",
+    "ESPECIE": "category",
+    "TIPO PRODUCTO": "category",
+    "FUENTE": "category",
+}
+
+# Caché a nivel de proceso: fuente -> (versión, instante de validación, DataFrame, manifiesto)
+_cache = {}
+_candado = threading.Lock()
+
+
+def _es_url(fuente):
+    return fuente.startswith(("http://", "https://"))
+
+
+def version_fuente(fuente, timeout=5):
+    """
+    Obtiene un identificador de versión de la fuente sin descargarla.
+
+    Para URLs se usa el ETag (o Last-Modified) de una petición HEAD (o el de la
+    copia recién descargada, ver descargas.version); para archivos locales, la
+    fecha de modificación y el tamaño.
+
+    Args:
+        fuente (str): URL o ruta local del archivo CSV.
+        timeout (float): Tiempo máximo de espera de la petición HEAD, en segundos.
+
+    Returns:
+        str or None: Versión de la fuente, o None si no se pudo determinar (p. ej. sin conexión).
+    """
+    if not _es_url(fuente):
+        try:
+            info = os.stat(fuente)
+        except OSError:
+            return None
+        return f"{info.st_mtime_ns}-{info.st_size}"
+
+    return descargas.version(fuente, timeout=timeout)
+
+
+def _directorio_almacen(fuente):
+    clave = hashlib.sha1(fuente.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(DIRECTORIO_CACHE, f"madera-{clave}")
+
+
+def _leer_bytes(fuente, inicio=0, timeout=60):
+    """
+    Lee el contenido de la fuente a partir del byte `inicio`.
+
+    Para URLs se pide solo el rango final (ver descargas.descargar_rango) o, si
+    `inicio` es 0, el archivo completo a través del caché de descargas.
+
+    Args:
+        fuente (str): URL o ruta local del archivo.
+        inicio (int): Posición del primer byte a leer.
+        timeout (float): Tiempo máximo de espera de la descarga, en segundos.
+
+    Returns:
+        bytes: Contenido desde `inicio` hasta el final.
+    """
+    if not _es_url(fuente):
+        with open(fuente, "rb") as archivo:
+            archivo.seek(inicio)
+            return archivo.read()
+
+    if inicio:
+        return descargas.descargar_rango(fuente, inicio, timeout=(5, timeout))
+    # La descarga completa pasa por el caché de descargas (un 304 no vuelve a traer el archivo)
+    return descargas.descargar(fuente, vigencia=descargas.VIGENCIA, timeout=(5, timeout))
+
+
+def _escribir_json(ruta, datos):
+    with open(ruta + ".tmp", "w", encoding="utf-8") as archivo:
+        json.dump(datos, archivo, ensure_ascii=False)
+    os.replace(ruta + ".tmp", ruta)
+
+
+def _escribir_particiones(fuente, manifiesto, df):
+    """
+    Escribe las filas de df (ordenadas por partición) como archivos nuevos del
+    almacén, uno por partición, y los añade al manifiesto. Los archivos existentes
+    no se modifican, y el manifiesto se escribe al final: si algo falla, el almacén
+    en disco sigue describiendo su estado anterior.
+    """
+    if manifiesto["version"] is None:
+        # Sin versión de la fuente no se puede validar el almacén en la próxima carga
+        return
+    directorio = _directorio_almacen(fuente)
+    try:
+        for (anio, semestre), parte in df.groupby(cubo_madera.PARTICION, observed=True, sort=False):
+            previos = sum(1 for a in manifiesto["archivos"] if a["anio"] == int(anio) and a["semestre"] == str(semestre))
+            ruta = os.path.join(f"AÑO={anio}", f"SEMESTRE={semestre}", f"parte-{previos:04d}.parquet")
+            os.makedirs(os.path.join(directorio, os.path.dirname(ruta)), exist_ok=True)
+            parte.to_parquet(os.path.join(directorio, ruta + ".tmp"), index=False)
+            os.replace(os.path.join(directorio, ruta + ".tmp"), os.path.join(directorio, ruta))
+            manifiesto["archivos"].append(
+                {"ruta": ruta, "anio": int(anio), "semestre": str(semestre), "filas": len(parte)}
+            )
+        _escribir_json(os.path.join(directorio, "manifiesto.json"), manifiesto)
+    except OSError:
+        # Sin permisos de escritura: se sigue funcionando solo con el caché en memoria
+        pass
+
+
+def _ruta_compartida(fuente, version_datos):
+    clave = hashlib.sha1(version_datos.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(_directorio_almacen(fuente), f"compartido-{clave}.arrow")
+
+
+def _compartir(fuente, df, manifiesto):
+    """
+    Publica el DataFrame como dataset compartido de su versión y lo devuelve
+    mapeado en memoria, borrando los archivos de versiones anteriores (si alguno
+    no se puede borrar, se deja). Si no se puede publicar (versión de la fuente
+    desconocida o sin permisos de escritura), se devuelve el mismo DataFrame.
+    """
+    if datos_compartidos.es_compartido(df) or manifiesto["version"] is None:
+        return df
+    ruta = _ruta_compartida(fuente, manifiesto["version_datos"])
+    try:
+        datos_compartidos.escribir(df, ruta)
+        # Los df.attrs de esta carga (p. ej. 'actualizacion') no se guardan en el archivo
+        compartido = datos_compartidos.abrir(ruta, atributos=df.attrs)
+    except (OSError, ValueError):
+        return df
+    # Los procesos que aún tienen mapeada una versión anterior la siguen leyendo; un archivo
+    # viejo que no se pueda borrar no impide usar el recién escrito
+    try:
+        anteriores = [
+            entrada.path for entrada in os.scandir(os.path.dirname(ruta))
+            if entrada.name.startswith("compartido-") and entrada.path != ruta
+        ]
+    except OSError:
+        anteriores = []
+    for anterior in anteriores:
+        try:
+            os.remove(anterior)
+        except OSError:
+            pass
+    return compartido
+
+
+def _leer_almacen(fuente):
+    directorio = _directorio_almacen(fuente)
+    try:
+        with open(os.path.join(directorio, "manifiesto.json"), encoding="utf-8") as archivo:
+            manifiesto = json.load(archivo)
+    except (OSError, ValueError):
+        return None, None
+    try:
+        # Dataset compartido de la versión del almacén: sin leer Parquet ni asignar códigos
+        df = datos_compartidos.abrir(
+            _ruta_compartida(fuente, manifiesto["version_datos"]),
+            atributos={"version": manifiesto["version_datos"]}
+        )
+    except (OSError, ValueError, KeyError):
+        df = None
+    if df is None:
+        try:
+            partes = [pd.read_parquet(os.path.join(directorio, a["ruta"])) for a in manifiesto["archivos"]]
+            df = cubo_madera.concatenar(partes).astype(ESQUEMA_MADERA)
+        except (OSError, ValueError, KeyError, IndexError):
+            return None, None
+        indice_municipios.asignar_codigos(df)
+        df.attrs["version"] = manifiesto["version_datos"]
+    return manifiesto, df
+
+
+def tiene_almacen(fuente=URL_MADERA):
+    """
+    Indica si la fuente ya tiene almacén local; en ese caso una carga solo consulta
+    la versión de la fuente y, si creció, descarga las filas nuevas (no el CSV completo).
+
+    Args:
+        fuente (str): Fuente de los datos.
+
+    Returns:
+        bool: True si existe el manifiesto del almacén.
+    """
+    return os.path.exists(os.path.join(_directorio_almacen(fuente), "manifiesto.json"))
+
+
+def cargar_almacen(fuente=URL_MADERA):
+    """
+    Lee la base de madera solo del almacén local, sin consultar la fuente ni escribir
+    en el almacén. Lo usan los procesos auxiliares (ver precalentamiento), que no
+    deben actualizar el almacén a la vez que el servidor.
+
+    Args:
+        fuente (str): Fuente cuyo almacén se lee.
+
+    Returns:
+        pd.DataFrame or None: Datos con COD_MPIO y df.attrs['version'], o None si no hay almacén.
+    """
+    return _leer_almacen(fuente)[1]
+
+
+def particiones(manifiesto):
+    """
+    Devuelve las particiones (AÑO, SEMESTRE) presentes en el almacén.
+
+    Args:
+        manifiesto (dict): Manifiesto del almacén.
+
+    Returns:
+        list: Pares (año, semestre) ordenados.
+    """
+    return sorted({(a["anio"], a["semestre"]) for a in manifiesto["archivos"]})
+
+
+def archivos_almacen(fuente=URL_MADERA, anios=None):
+    """
+    Devuelve las rutas de los archivos Parquet del almacén, para consultarlos
+    directamente con consultas.filtrar o consultas.agregar sin cargar el DataFrame.
+
+    Los archivos no incluyen la columna COD_MPIO, que se calcula al cargar.
+
+    Args:
+        fuente (str): Fuente cuyo almacén se consulta.
+        anios (list, optional): Años a incluir; las particiones de otros años ni se abren.
+
+    Returns:
+        list: Rutas absolutas (vacía si aún no hay almacén).
+    """
+    with _candado:
+        en_memoria = _cache.get(fuente)
+    if en_memoria:
+        manifiesto = en_memoria[3]
+    else:
+        try:
+            with open(os.path.join(_directorio_almacen(fuente), "manifiesto.json"), encoding="utf-8") as archivo:
+                manifiesto = json.load(archivo)
+        except (OSError, ValueError):
+            return []
+    directorio = _directorio_almacen(fuente)
+    return [
+        os.path.join(directorio, a["ruta"])
+        for a in manifiesto["archivos"]
+        if anios is None or a["anio"] in set(anios)
+    ]
+
+
+def _cargar_completo(fuente, version):
+    contenido = _leer_bytes(fuente)
+    # El almacén agrupa las filas por partición (orden estable dentro de cada una)
+    df = leer_csv_madera(io.BytesIO(contenido)).sort_values(cubo_madera.PARTICION, kind="stable", ignore_index=True)
+    manifiesto = {
+        "fuente": fuente,
+        "version": version,
+        "version_datos": version,
+        "bytes": len(contenido),
+        "cola": contenido[-BYTES_COLA:].hex(),
+        "encabezado": contenido.split(b"\n", 1)[0].decode("utf-8") + "\n",
+        "anexos": [],
+        "archivos": [],
+    }
+    if version is not None:
+        shutil.rmtree(_directorio_almacen(fuente), ignore_errors=True)
+        _escribir_particiones(fuente, manifiesto, df)
+    indice_municipios.asignar_codigos(df)
+    df.attrs["version"] = manifiesto["version_datos"]
+    return df, manifiesto
+
+
+def _anexar(fuente, df, manifiesto, delta, modo):
+    """
+    Añade filas nuevas al almacén, al DataFrame en memoria y al cubo.
+
+    Returns:
+        tuple: (DataFrame con las filas anexadas, manifiesto actualizado).
+    """
+    delta = delta.sort_values(cubo_madera.PARTICION, kind="stable", ignore_index=True)
+    existentes = set(particiones(manifiesto))
+    _escribir_particiones(fuente, manifiesto, delta)
+    if len(delta) == 0:
+        return df, manifiesto
+
+    indice_municipios.asignar_codigos(delta)
+    nuevo = cubo_madera.concatenar([df, delta])
+    nuevo.attrs["version"] = manifiesto["version_datos"]
+    tocadas = delta[cubo_madera.PARTICION].drop_duplicates().itertuples(index=False)
+    nuevo.attrs["actualizacion"] = {
+        "modo": modo,
+        "filas": len(delta),
+        "particiones": [
+            f"{anio}-{semestre}" + ("" if (int(anio), str(semestre)) in existentes else " (nueva)")
+            for anio, semestre in tocadas
+        ],
+    }
+    # El cubo y el detector de outliers de la versión anterior se actualizan solo con las filas nuevas
+    cubo_madera.actualizar_cubo(df.attrs.get("version"), delta, nuevo.attrs["version"])
+    motor_outliers.actualizar_detector(df.attrs.get("version"), delta, nuevo.attrs["version"])
+    return nuevo, manifiesto
+
+
+def _refrescar(fuente, df, manifiesto, version):
+    """
+    Incorpora las filas añadidas al final de la fuente desde la última lectura.
+
+    Se releen solo los últimos BYTES_COLA bytes ya conocidos y lo que sigue; si no
+    coinciden con los guardados, la fuente no creció por el final (se editó o se
+    reemplazó) y se devuelve (None, None) para forzar una recarga completa.
+    """
+    cola = bytes.fromhex(manifiesto["cola"])
+    inicio = manifiesto["bytes"] - len(cola)
+    try:
+        datos = _leer_bytes(fuente, inicio)
+        if not datos.startswith(cola):
+            return None, None
+        nuevos = datos[len(cola):]
+        if nuevos.strip():
+            delta = leer_csv_madera(io.BytesIO(manifiesto["encabezado"].encode("utf-8") + nuevos))
+        else:
+            delta = df.iloc[:0].drop(columns="COD_MPIO")
+    except (OSError, ValueError):
+        return None, None
+
+    manifiesto = {
+        **manifiesto,
+        "version": version,
+        "version_datos": version if len(delta) else manifiesto["version_datos"],
+        "bytes": inicio + len(datos),
+        "cola": (cola + nuevos)[-BYTES_COLA:].hex(),
+        "archivos": list(manifiesto["archivos"]),
+    }
+    return _anexar(fuente, df, manifiesto, delta, "incremental")
+
+
+def leer_csv_madera(fuente):
+    """
+    Lee el CSV de madera aplicando el esquema fijo de tipos.
+
+    Args:
+        fuente (str or file-like): URL, ruta local u objeto de archivo con el CSV.
+
+    Returns:
+        pd.DataFrame: DataFrame con columnas categóricas y enteros compactos.
+    """
+    return pd.read_csv(fuente, dtype=ESQUEMA_MADERA)
+
+
+def cargar_madera(fuente=URL_MADERA, forzar=False):
+    """
+    Carga la base de datos de madera usando el caché de proceso y el almacén local.
+
+    El orden de búsqueda es: caché en memoria (si se validó hace menos de
+    INTERVALO_REVALIDACION segundos) y almacén particionado local. Si la versión de
+    la fuente cambió, se leen solo los bytes añadidos al final y se anexan como
+    filas nuevas (actualizando el cubo por diferencia); si la fuente no creció por
+    el final, o no hay almacén, se lee el CSV completo. Si la versión de la fuente
+    no se puede consultar (sin conexión), se usa el almacén existente.
+
+    Args:
+        fuente (str): URL o ruta local del archivo CSV.
+        forzar (bool): Si es True, ignora los cachés y vuelve a leer el CSV completo.
+
+    Returns:
+        pd.DataFrame: DataFrame con los datos y la columna COD_MPIO, compartido y de solo
+        lectura (ver datos_compartidos); la versión queda en df.attrs['version'] (None si
+        la de la fuente no se pudo determinar: así los cachés por versión no la confunden
+        con otros datos) y, tras una actualización incremental, su resumen en
+        df.attrs['actualizacion'].
+    """
+    with _candado:
+        ahora = time.monotonic()
+        en_memoria = _cache.get(fuente)
+        if not forzar and en_memoria and ahora - en_memoria[1] < INTERVALO_REVALIDACION:
+            instrumentacion.marcar_cache("datos", True)
+            return en_memoria[2]
+
+        version = version_fuente(fuente)
+        if not forzar and en_memoria and (version is None or version == en_memoria[0]):
+            _cache[fuente] = (en_memoria[0], ahora, en_memoria[2], en_memoria[3])
+            instrumentacion.marcar_cache("datos", True)
+            return en_memoria[2]
+
+        instrumentacion.marcar_cache("datos", False)
+        df = manifiesto = None
+        if en_memoria and not forzar:
+            manifiesto, df = en_memoria[3], en_memoria[2]
+        elif not forzar:
+            manifiesto, df = _leer_almacen(fuente)
+            instrumentacion.marcar_cache("almacen", df is not None)
+
+        if df is not None and version is not None and version != manifiesto["version"]:
+            # Sin versión anterior no hay cola conocida ni almacén al que anexar: se recarga completo
+            df, manifiesto = _refrescar(fuente, df, manifiesto, version) if manifiesto["version"] else (None, None)
+        if df is None:
+            df, manifiesto = _cargar_completo(fuente, version)
+
+        df = _compartir(fuente, df, manifiesto)
+        _cache[fuente] = (manifiesto["version"], ahora, df, manifiesto)
+        return df
+
+
+def anexar_madera(nuevos, fuente=URL_MADERA):
+    """
+    Anexa a la base de madera otro dataset con el mismo esquema (p. ej. el archivo
+    de un semestre publicado por separado), conservando solo sus particiones
+    (AÑO, SEMESTRE) que aún no están en el almacén.
+
+    Los anexos se conservan mientras la fuente principal solo crezca por el final;
+    una recarga completa de la fuente los descarta.
+
+    Args:
+        nuevos (str, file-like or pd.DataFrame): CSV o DataFrame con las columnas de la base de madera.
+        fuente (str): Fuente principal a la que se anexan las filas.
+
+    Returns:
+        pd.DataFrame: Base de madera con las filas anexadas (o la misma si no había particiones nuevas).
+    """
+    df = cargar_madera(fuente)
+    if not isinstance(nuevos, pd.DataFrame):
+        nuevos = leer_csv_madera(nuevos)
+    columnas = [columna for columna in df.columns if columna != "COD_MPIO"]
+    nuevos = nuevos[columnas].astype(ESQUEMA_MADERA)
+
+    with _candado:
+        version, _, df, manifiesto = _cache[fuente]
+        claves = pd.MultiIndex.from_arrays([nuevos["AÑO"].astype(int), nuevos["SEMESTRE"].astype(str)])
+        delta = nuevos[~claves.isin(particiones(manifiesto))]
+        if len(delta) == 0:
+            return df
+
+        huella = hashlib.sha1(pd.util.hash_pandas_object(delta, index=False).to_numpy().tobytes()).hexdigest()[:12]
+        manifiesto = {
+            **manifiesto,
+            # Sin versión de la fuente tampoco la hay de los datos anexados
+            "version_datos": None if manifiesto["version_datos"] is None else f"{manifiesto['version_datos']}+{huella}",
+            "anexos": manifiesto["anexos"] + [huella],
+            "archivos": list(manifiesto["archivos"]),
+        }
+        df, manifiesto = _anexar(fuente, df, manifiesto, delta, "anexo")
+        df = _compartir(fuente, df, manifiesto)
+        _cache[fuente] = (version, time.monotonic(), df, manifiesto)
+        return df
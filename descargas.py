@@ -0,0 +1,451 @@
+"""
+Capa de descarga de las fuentes remotas (CSV de madera, DIVIPOLA, GeoJSON y
+las URLs que se ingresan en App_deforestacion).
+
+Todas las peticiones pasan por una sesión HTTP compartida, con un grupo de
+conexiones persistentes por host, tiempos máximos de espera y un número
+acotado de reintentos con espera exponencial. Cada respuesta se guarda en
+DIRECTORIO_DESCARGAS junto con su ETag y su Last-Modified, de modo que las
+descargas siguientes son peticiones condicionales (If-None-Match /
+If-Modified-Since) y un 304 sirve la copia local; si la fuente no responde,
+también se usa la copia local. Con abrir se lee una URL en streaming y sin
+caché, para archivos que no caben en memoria. Con descargar_todas se
+descargan varias fuentes a la vez (asyncio sobre el grupo de conexiones).
+
+Estructura del caché (en DIRECTORIO_DESCARGAS/):
+    <hash de la URL>.datos     contenido de la última respuesta
+    <hash de la URL>.json      URL, ETag, Last-Modified e instante de validación
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import instrumentacion
+
+# Caché en disco de las respuestas (dentro del directorio de caché de datos_madera)
+DIRECTORIO_DESCARGAS = os.path.join(
+    os.environ.get(
+        "APPS_STREAMLIT_CACHE",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+    ),
+    "descargas",
+)
+
+# Tamaño máximo del caché en disco; se borran primero las descargas más antiguas
+MAX_BYTES_DISCO = 512 * 1024 * 1024
+
+# Tiempos máximos de espera (conexión, lectura entre bloques), en segundos
+TIMEOUT = (5, 60)
+
+# Reintentos tras un error de conexión, un corte de la descarga o una respuesta 429/5xx
+REINTENTOS = 3
+ESPERA_REINTENTO = 0.5
+ESTADOS_REINTENTO = {429, 500, 502, 503, 504}
+
+# Conexiones por host del grupo y descargas simultáneas de descargar_todas
+CONEXIONES = 8
+
+# Segundos durante los cuales una copia recién validada se usa sin volver a consultar la fuente
+VIGENCIA = 60
+
+TAMANO_BLOQUE = 64 * 1024
+
+_sesion = None
+_candado = threading.Lock()
+# URL -> candado, para que dos sesiones de Streamlit no descarguen a la vez la misma fuente
+_candados_url = {}
+# URLs ya pedidas a precargar en este proceso
+_precargadas = set()
+
+
+def es_url(fuente):
+    """
+    Indica si la fuente es una URL HTTP(S) (y no una ruta local).
+
+    Args:
+        fuente (str): URL o ruta.
+
+    Returns:
+        bool: True si empieza por http:// o https://.
+    """
+    return isinstance(fuente, str) and fuente.startswith(("http://", "https://"))
+
+
+def sesion():
+    """
+    Devuelve la sesión HTTP compartida por el proceso, creándola la primera vez.
+
+    Returns:
+        requests.Session: Sesión con un grupo de hasta CONEXIONES conexiones persistentes por host.
+    """
+    global _sesion
+    with _candado:
+        if _sesion is None:
+            nueva = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=CONEXIONES, pool_maxsize=CONEXIONES)
+            nueva.mount("http://", adaptador)
+            nueva.mount("https://", adaptador)
+            _sesion = nueva
+        return _sesion
+
+
+def _candado_url(url):
+    with _candado:
+        return _candados_url.setdefault(url, threading.Lock())
+
+
+def _ruta(url, extension):
+    clave = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(DIRECTORIO_DESCARGAS, f"{clave}.{extension}")
+
+
+def _leer_metadatos(url):
+    try:
+        with open(_ruta(url, "json"), encoding="utf-8") as archivo:
+            metadatos = json.load(archivo)
+    except (OSError, ValueError):
+        return None
+    return metadatos if metadatos.get("url") == url else None
+
+
+def _leer_contenido(url):
+    try:
+        with open(_ruta(url, "datos"), "rb") as archivo:
+            return archivo.read()
+    except OSError:
+        return None
+
+
+def _escribir_atomico(ruta, datos):
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporal, "wb") as archivo:
+        archivo.write(datos)
+    os.replace(temporal, ruta)
+
+
+def _guardar(url, metadatos, contenido=None):
+    try:
+        os.makedirs(DIRECTORIO_DESCARGAS, exist_ok=True)
+        if contenido is not None:
+            _escribir_atomico(_ruta(url, "datos"), contenido)
+        _escribir_atomico(_ruta(url, "json"), json.dumps(metadatos).encode("utf-8"))
+        if contenido is not None:
+            _podar()
+    except OSError:
+        # Sin permisos de escritura: la descarga se usa igual, solo que sin caché
+        pass
+
+
+def _podar():
+    archivos = [
+        entrada for entrada in os.scandir(DIRECTORIO_DESCARGAS)
+        if entrada.name.endswith(".datos")
+    ]
+    total = sum(entrada.stat().st_size for entrada in archivos)
+    archivos.sort(key=lambda entrada: entrada.stat().st_mtime)
+    for entrada in archivos:
+        if total <= MAX_BYTES_DISCO:
+            break
+        total -= entrada.stat().st_size
+        for ruta in (entrada.path, entrada.path[:-len("datos")] + "json"):
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+
+
+def _version(metadatos):
+    return metadatos.get("etag") or metadatos.get("last_modified")
+
+
+def _vigente(metadatos, vigencia):
+    return vigencia > 0 and time.time() - metadatos.get("validado", 0) < vigencia
+
+
+def _pedir(metodo, url, cabeceras=None, timeout=TIMEOUT, reintentos=REINTENTOS, leer=None):
+    """
+    Hace una petición con la sesión compartida, reintentando los errores transitorios.
+
+    Args:
+        metodo (str): 'GET' o 'HEAD'.
+        url (str): URL pedida.
+        cabeceras (dict, optional): Cabeceras de la petición.
+        timeout (float or tuple): Tiempo máximo de espera (conexión, lectura).
+        reintentos (int): Reintentos tras el primer intento fallido.
+        leer (callable, optional): Recibe la respuesta (en streaming) y devuelve su contenido;
+            un corte durante la lectura también se reintenta.
+
+    Returns:
+        tuple: (respuesta, contenido); contenido es None si no se pasó `leer`.
+
+    Raises:
+        requests.RequestException: Si todos los intentos fallan o la respuesta es un error HTTP.
+    """
+    for intento in range(reintentos + 1):
+        try:
+            with sesion().request(metodo, url, headers=cabeceras, timeout=timeout, stream=leer is not None) as respuesta:
+                respuesta.raise_for_status()
+                contenido = leer(respuesta) if leer is not None and respuesta.status_code != 304 else None
+                return respuesta, contenido
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+            if intento == reintentos:
+                raise
+        except requests.HTTPError as error:
+            if error.response.status_code not in ESTADOS_REINTENTO or intento == reintentos:
+                raise
+        time.sleep(ESPERA_REINTENTO * 2 ** intento)
+
+
+def _leer_con_avance(al_avanzar):
+    def leer(respuesta):
+        total = respuesta.headers.get("Content-Length")
+        total = int(total) if total and total.isdigit() else None
+        bloques = []
+        for bloque in respuesta.iter_content(TAMANO_BLOQUE):
+            bloques.append(bloque)
+            if al_avanzar is not None:
+                # Bytes recibidos por la red (comprimidos, como Content-Length) frente al total
+                al_avanzar(respuesta.raw.tell(), total)
+        return b"".join(bloques)
+    return leer
+
+
+def descargar(url, al_avanzar=None, vigencia=0, timeout=TIMEOUT, reintentos=REINTENTOS):
+    """
+    Descarga una URL usando el caché en disco.
+
+    Si hay una copia local validada hace menos de `vigencia` segundos se devuelve sin
+    consultar la fuente; si no, se hace una petición condicional y un 304 devuelve la
+    copia local. Si la fuente no responde y hay copia local, se usa esa copia.
+
+    Args:
+        url (str): URL del recurso.
+        al_avanzar (callable, optional): Se llama con (bytes recibidos, bytes totales o None)
+            tras cada bloque descargado.
+        vigencia (float): Segundos durante los cuales una copia validada no se revalida.
+        timeout (float or tuple): Tiempo máximo de espera (conexión, lectura), en segundos.
+        reintentos (int): Reintentos ante errores transitorios.
+
+    Returns:
+        bytes: Contenido del recurso.
+
+    Raises:
+        requests.RequestException: Si la descarga falla y no hay copia local.
+    """
+    with _candado_url(url):
+        metadatos = _leer_metadatos(url)
+        contenido = _leer_contenido(url) if metadatos else None
+        if contenido is not None and _vigente(metadatos, vigencia):
+            instrumentacion.marcar_cache("descarga", True)
+            return contenido
+
+        cabeceras = {}
+        if contenido is not None:
+            if metadatos.get("etag"):
+                cabeceras["If-None-Match"] = metadatos["etag"]
+            if metadatos.get("last_modified"):
+                cabeceras["If-Modified-Since"] = metadatos["last_modified"]
+        try:
+            respuesta, nuevo = _pedir("GET", url, cabeceras, timeout, reintentos, _leer_con_avance(al_avanzar))
+        except requests.RequestException:
+            if contenido is None:
+                raise
+            # Sin conexión: la copia local es mejor que nada
+            instrumentacion.marcar_cache("descarga", True)
+            return contenido
+
+        if respuesta.status_code == 304:
+            instrumentacion.marcar_cache("descarga", True)
+            _guardar(url, {**metadatos, "validado": time.time()})
+            return contenido
+
+        instrumentacion.marcar_cache("descarga", False)
+        _guardar(url, {
+            "url": url,
+            "etag": respuesta.headers.get("ETag"),
+            "last_modified": respuesta.headers.get("Last-Modified"),
+            "validado": time.time(),
+            "bytes": len(nuevo),
+        }, nuevo)
+        return nuevo
+
+
+def descargar_rango(url, inicio, timeout=TIMEOUT, reintentos=REINTENTOS):
+    """
+    Descarga el contenido de la URL a partir del byte `inicio` (sin pasar por el caché).
+
+    Se pide solo el rango final (cabecera Range, sin compresión para que las
+    posiciones coincidan con las del archivo); si el servidor no admite rangos se
+    descarga completo y se recorta.
+
+    Args:
+        url (str): URL del recurso.
+        inicio (int): Posición del primer byte a leer.
+        timeout (float or tuple): Tiempo máximo de espera (conexión, lectura), en segundos.
+        reintentos (int): Reintentos ante errores transitorios.
+
+    Returns:
+        bytes: Contenido desde `inicio` hasta el final.
+    """
+    cabeceras = {"Accept-Encoding": "identity"}
+    if inicio:
+        cabeceras["Range"] = f"bytes={inicio}-"
+    respuesta, contenido = _pedir("GET", url, cabeceras, timeout, reintentos, _leer_con_avance(None))
+    return contenido if respuesta.status_code == 206 else contenido[inicio:]
+
+
+def abrir(url, timeout=TIMEOUT, reintentos=REINTENTOS):
+    """
+    Abre la URL como un archivo de lectura en streaming, sin pasar por el caché ni
+    acumular el contenido en memoria (para archivos que no caben en ella).
+
+    Los reintentos cubren la fase anterior al primer byte (conexión y estado de la
+    respuesta); un corte durante la lectura se propaga a quien lee.
+
+    Args:
+        url (str): URL del recurso.
+        timeout (float or tuple): Tiempo máximo de espera (conexión, lectura), en segundos.
+        reintentos (int): Reintentos ante errores transitorios.
+
+    Returns:
+        tuple: (archivo, total). El archivo entrega el contenido ya descomprimido y su
+        tell() devuelve los bytes recibidos por la red, comparables con total
+        (Content-Length, o None si el servidor no lo envía). Quien lo abre debe cerrarlo.
+
+    Raises:
+        requests.RequestException: Si todos los intentos fallan o la respuesta es un error HTTP.
+    """
+    for intento in range(reintentos + 1):
+        respuesta = None
+        try:
+            respuesta = sesion().get(url, timeout=timeout, stream=True)
+            respuesta.raise_for_status()
+            break
+        except (requests.ConnectionError, requests.Timeout):
+            if intento == reintentos:
+                raise
+        except requests.HTTPError as error:
+            respuesta.close()
+            if error.response.status_code not in ESTADOS_REINTENTO or intento == reintentos:
+                raise
+        time.sleep(ESPERA_REINTENTO * 2 ** intento)
+    total = respuesta.headers.get("Content-Length")
+    respuesta.raw.decode_content = True
+    return respuesta.raw, int(total) if total and total.isdigit() else None
+
+
+def version(url, vigencia=VIGENCIA, timeout=5, reintentos=1):
+    """
+    Obtiene el ETag (o Last-Modified) de la URL sin descargarla.
+
+    Si la copia en caché se validó hace menos de `vigencia` segundos se usa su
+    versión; si no, se hace una petición HEAD.
+
+    Args:
+        url (str): URL del recurso.
+        vigencia (float): Segundos durante los cuales la versión en caché no se revalida.
+        timeout (float or tuple): Tiempo máximo de espera, en segundos.
+        reintentos (int): Reintentos ante errores transitorios.
+
+    Returns:
+        str or None: Versión del recurso, o None si no se pudo determinar (p. ej. sin conexión).
+    """
+    metadatos = _leer_metadatos(url)
+    if metadatos and _vigente(metadatos, vigencia):
+        return _version(metadatos)
+    try:
+        respuesta, _ = _pedir("HEAD", url, timeout=timeout, reintentos=reintentos)
+    except requests.RequestException:
+        return None
+    return respuesta.headers.get("ETag") or respuesta.headers.get("Last-Modified")
+
+
+def en_cache(url):
+    """
+    Indica si hay una copia local de la URL.
+
+    Args:
+        url (str): URL del recurso.
+
+    Returns:
+        bool: True si el caché en disco tiene su contenido.
+    """
+    return _leer_metadatos(url) is not None and os.path.exists(_ruta(url, "datos"))
+
+
+async def descargar_async(url, al_avanzar=None, vigencia=0, semaforo=None):
+    """
+    Versión asíncrona de descargar: la petición bloqueante se ejecuta en un hilo y
+    usa el mismo grupo de conexiones.
+
+    Args:
+        url (str): URL del recurso.
+        al_avanzar (callable, optional): Se llama con (bytes recibidos, bytes totales o None).
+        vigencia (float): Segundos durante los cuales una copia validada no se revalida.
+        semaforo (asyncio.Semaphore, optional): Limita las descargas simultáneas.
+
+    Returns:
+        bytes: Contenido del recurso.
+    """
+    if semaforo is None:
+        return await asyncio.to_thread(descargar, url, al_avanzar, vigencia)
+    async with semaforo:
+        return await asyncio.to_thread(descargar, url, al_avanzar, vigencia)
+
+
+def descargar_todas(urls, al_avanzar=None, vigencia=0, solo_faltantes=False):
+    """
+    Descarga varias URLs a la vez (hasta CONEXIONES simultáneas).
+
+    Un fallo en una URL no interrumpe las demás: su resultado es la excepción.
+
+    Args:
+        urls (list): URLs a descargar (las repetidas se descargan una vez).
+        al_avanzar (callable, optional): Se llama con (url, bytes recibidos, bytes totales o None).
+        vigencia (float): Segundos durante los cuales una copia validada no se revalida.
+        solo_faltantes (bool): Si es True, solo se descargan las URLs sin copia local.
+
+    Returns:
+        dict: URL -> contenido (bytes) o excepción.
+    """
+    urls = [url for url in dict.fromkeys(urls) if not (solo_faltantes and en_cache(url))]
+    if not urls:
+        return {}
+
+    async def todas():
+        semaforo = asyncio.Semaphore(CONEXIONES)
+        return await asyncio.gather(*(
+            descargar_async(
+                url,
+                None if al_avanzar is None else (lambda leidos, total, url=url: al_avanzar(url, leidos, total)),
+                vigencia,
+                semaforo,
+            )
+            for url in urls
+        ), return_exceptions=True)
+
+    return dict(zip(urls, asyncio.run(todas())))
+
+
+def precargar(urls):
+    """
+    Descarga a la vez las URLs que aún no tienen copia local, una sola vez por
+    proceso (las re-ejecuciones de Streamlit no vuelven a intentarlo, aunque
+    la fuente no responda).
+
+    Args:
+        urls (list): URLs que la aplicación va a necesitar.
+
+    Returns:
+        dict: Resultado de descargar_todas para las URLs que se descargaron.
+    """
+    with _candado:
+        nuevas = [url for url in urls if url not in _precargadas]
+        _precargadas.update(nuevas)
+    return descargar_todas(nuevas, solo_faltantes=True)
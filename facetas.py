@@ -0,0 +1,135 @@
+"""
+Índice de facetas para los selectores dependientes de la evolución temporal.
+
+Para cada versión del dataset precalcula, a partir del cubo, las especies, los
+tipos de producto disponibles para cada especie y su rango de años, y la serie
+de volumen de cada par (especie, tipo de producto) por año, semestre y
+trimestre. Los selectores encadenados y el gráfico de línea se sirven desde
+diccionarios, sin agrupar en cada re-ejecución.
+"""
+import threading
+
+import numpy as np
+
+import cubo_madera
+import instrumentacion
+
+# Período -> columnas de agrupación de la serie
+PERIODOS = {
+    'AÑO': ['AÑO'],
+    'SEMESTRE': ['AÑO', 'SEMESTRE'],
+    'TRIMESTRE': ['AÑO', 'TRIMESTRE'],
+}
+
+# Período -> columna del eje x en la serie
+EJES = {'AÑO': 'AÑO', 'SEMESTRE': 'PERIODO', 'TRIMESTRE': 'PERIODO'}
+
+# Número de versiones del dataset cuyo índice se mantiene en memoria
+MAX_INDICES = 2
+
+_indices = {}
+_candado = threading.Lock()
+
+
+class IndiceFacetas:
+    """
+    Especies, tipos de producto por especie, rango de años y series de volumen
+    por (especie, tipo de producto, período).
+
+    Args:
+        cubo (cubo_madera.CuboMadera): Cubo del dataset.
+    """
+
+    def __init__(self, cubo):
+        self.version = cubo.version
+        pares = ['ESPECIE', 'TIPO PRODUCTO']
+        base = cubo.enrollar(pares + ['AÑO', 'SEMESTRE', 'TRIMESTRE'])
+
+        # Mismo orden que los enrollados del cubo (el de las categorías)
+        self._tipos = {}
+        for especie, tipo in base[pares].drop_duplicates().itertuples(index=False):
+            self._tipos.setdefault(especie, []).append(tipo)
+        self.especies = list(self._tipos)
+        anios = base.groupby('ESPECIE', observed=True)['AÑO'].agg(['min', 'max'])
+        self._anios = {especie: (int(minimo), int(maximo)) for especie, minimo, maximo in anios.itertuples()}
+
+        # Período -> (serie de todos los pares ordenada por par, par -> (fila inicial, fila final))
+        self._series = {}
+        for periodo, columnas in PERIODOS.items():
+            serie = base.groupby(pares + columnas, observed=True)[cubo_madera.MEDIDAS].sum().reset_index()
+            if EJES[periodo] == 'PERIODO':
+                serie['PERIODO'] = serie['AÑO'].astype(str) + ' - ' + serie[columnas[1]].astype(str)
+            cambios = np.flatnonzero(serie[pares].ne(serie[pares].shift()).any(axis=1).to_numpy())
+            limites = np.append(cambios, len(serie))
+            claves = serie[pares].iloc[cambios].itertuples(index=False)
+            rangos = {tuple(clave): (int(inicio), int(fin)) for clave, inicio, fin in zip(claves, limites[:-1], limites[1:])}
+            self._series[periodo] = (serie.drop(columns=pares), rangos)
+
+    def tipos_producto(self, especie):
+        """
+        Devuelve los tipos de producto con datos para la especie.
+
+        Args:
+            especie (str): Especie.
+
+        Returns:
+            list: Tipos de producto (vacía si la especie no tiene datos).
+        """
+        return self._tipos.get(especie, [])
+
+    def rango_anios(self, especie):
+        """
+        Devuelve el primer y el último año con datos de la especie.
+
+        Args:
+            especie (str): Especie.
+
+        Returns:
+            tuple or None: (año inicial, año final), o None si la especie no tiene datos.
+        """
+        return self._anios.get(especie)
+
+    def serie(self, especie, tipo_producto, periodo='AÑO'):
+        """
+        Devuelve la serie de volumen y registros del par por período.
+
+        Args:
+            especie (str): Especie.
+            tipo_producto (str): Tipo de producto.
+            periodo (str): 'AÑO', 'SEMESTRE' o 'TRIMESTRE'.
+
+        Returns:
+            pd.DataFrame or None: Columnas de PERIODOS[periodo] (y 'PERIODO' si no es anual),
+            'VOLUMEN M3' y 'REGISTROS'; None si el par no tiene datos.
+        """
+        if periodo not in PERIODOS:
+            raise ValueError(f"Período desconocido: {periodo!r}. Opciones: {list(PERIODOS)}")
+        serie, rangos = self._series[periodo]
+        rango = rangos.get((especie, tipo_producto))
+        return None if rango is None else serie.iloc[rango[0]:rango[1]].reset_index(drop=True)
+
+
+def obtener_facetas(df):
+    """
+    Devuelve el índice de facetas del DataFrame, construyéndolo solo la primera vez para cada versión
+    (sin df.attrs['version'] no se memoriza).
+
+    Args:
+        df (pd.DataFrame): DataFrame con los datos de madera (cargado con datos_madera).
+
+    Returns:
+        IndiceFacetas: Índice compartido por todas las sesiones.
+    """
+    cubo = cubo_madera.obtener_cubo(df)
+    with _candado:
+        indice = _indices.get(cubo.version) if cubo.version else None
+    instrumentacion.marcar_cache('facetas', indice is not None)
+    if indice is None:
+        indice = IndiceFacetas(cubo)
+        if not cubo.version:
+            return indice
+        with _candado:
+            _indices[cubo.version] = indice
+            while len(_indices) > MAX_INDICES:
+                _indices.pop(next(iter(_indices)))
+    return indice
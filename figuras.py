@@ -0,0 +1,246 @@
+"""
+Utilidades de renderizado para los mapas de matplotlib.
+
+Incluye la selección de etiquetas sin colisiones (limitada a un número
+máximo), el dibujo de todas las etiquetas en una sola pasada y un caché de
+imágenes renderizadas (PNG o SVG) y de figuras de Plotly (JSON) indexado por
+un hash de los parámetros de la vista, de modo que repetir una vista devuelve
+los bytes ya generados.
+
+El caché tiene dos niveles: memoria del proceso y archivos en
+DIRECTORIO_FIGURAS, compartidos entre procesos. Así las figuras que
+precalentamiento renderiza en otros procesos las sirve el servidor sin volver
+a dibujarlas. matplotlib y plotly solo se importan al construir una figura.
+"""
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import instrumentacion
+from datos_madera import DIRECTORIO_CACHE
+
+# Máximo de imágenes renderizadas que se conservan en memoria y en disco
+MAX_FIGURAS = 64
+MAX_FIGURAS_DISCO = 1024
+
+# Nivel en disco del caché de figuras
+DIRECTORIO_FIGURAS = os.path.join(DIRECTORIO_CACHE, 'figuras')
+
+# Máximo de etiquetas por mapa y separación mínima entre ellas (en grados)
+MAX_ETIQUETAS = 25
+SEPARACION_ETIQUETAS = 0.4
+PROPORCION_ETIQUETAS = 3.0
+
+_figuras = OrderedDict()
+_candado = threading.Lock()
+# pyplot no es seguro entre hilos: se serializa la construcción de figuras
+_candado_render = threading.Lock()
+
+
+def clave_figura(*partes):
+    """
+    Calcula la clave de caché de una figura a partir de sus parámetros.
+
+    Args:
+        *partes: Valores que determinan la figura (nombre de la vista, versión de datos, filtros...).
+
+    Returns:
+        str: Hash hexadecimal de los parámetros.
+    """
+    return hashlib.sha1(repr(partes).encode('utf-8')).hexdigest()
+
+
+def seleccionar_etiquetas(x, y, prioridad, max_etiquetas=MAX_ETIQUETAS, separacion=SEPARACION_ETIQUETAS):
+    """
+    Elige qué puntos se etiquetan evitando que los textos se superpongan.
+
+    Recorre los puntos de mayor a menor prioridad y descarta los que caen en una
+    celda de la rejilla (de alto `separacion`) o en una vecina ya ocupada.
+
+    Args:
+        x (array-like): Coordenadas x de los puntos.
+        y (array-like): Coordenadas y de los puntos.
+        prioridad (array-like): Valor por el que se prefieren las etiquetas (p. ej. volumen).
+        max_etiquetas (int): Número máximo de etiquetas a conservar.
+        separacion (float): Distancia mínima aproximada entre etiquetas, en unidades de los datos.
+
+    Returns:
+        np.ndarray: Posiciones de los puntos que se deben etiquetar.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    orden = np.argsort(-np.asarray(prioridad, dtype=float), kind='stable')
+    # Las etiquetas son más anchas que altas: la rejilla es más ancha en x
+    celdas_x = np.floor(x / (separacion * PROPORCION_ETIQUETAS)).astype(np.int64)
+    celdas_y = np.floor(y / separacion).astype(np.int64)
+
+    ocupadas = set()
+    elegidas = []
+    for posicion in orden:
+        cx, cy = celdas_x[posicion], celdas_y[posicion]
+        if any((cx + dx, cy + dy) in ocupadas for dx in (-1, 0, 1) for dy in (-1, 0, 1)):
+            continue
+        ocupadas.add((cx, cy))
+        elegidas.append(posicion)
+        if len(elegidas) >= max_etiquetas:
+            break
+    return np.array(elegidas, dtype=np.int64)
+
+
+def dibujar_etiquetas(ax, x, y, textos, prioridad=None, max_etiquetas=MAX_ETIQUETAS,
+                      separacion=SEPARACION_ETIQUETAS, **estilo):
+    """
+    Dibuja en el eje las etiquetas seleccionadas por seleccionar_etiquetas.
+
+    Args:
+        ax (matplotlib.axes.Axes): Eje donde se dibujan las etiquetas.
+        x (array-like): Coordenadas x de los puntos.
+        y (array-like): Coordenadas y de los puntos.
+        textos (array-like): Texto de cada punto.
+        prioridad (array-like, optional): Prioridad de cada punto; por defecto, el orden de entrada.
+        max_etiquetas (int): Número máximo de etiquetas.
+        separacion (float): Distancia mínima aproximada entre etiquetas.
+        **estilo: Argumentos adicionales para ax.text (fontsize, bbox, ...).
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    textos = np.asarray(textos, dtype=object)
+    if prioridad is None:
+        prioridad = -np.arange(len(x))
+    estilo = {'fontsize': 6, 'ha': 'center', 'va': 'center', 'color': 'black', **estilo}
+    for posicion in seleccionar_etiquetas(x, y, prioridad, max_etiquetas, separacion):
+        ax.text(x[posicion], y[posicion], textos[posicion], **estilo)
+
+
+def figura_a_bytes(fig, formato='png', dpi=150):
+    """
+    Renderiza una figura de matplotlib y la cierra.
+
+    Args:
+        fig (matplotlib.figure.Figure): Figura a renderizar.
+        formato (str): 'png' o 'svg'.
+        dpi (int): Resolución para formatos rasterizados.
+
+    Returns:
+        bytes: Imagen renderizada.
+    """
+    import matplotlib.pyplot as plt
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=formato, dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def _ruta_disco(clave, formato):
+    return os.path.join(DIRECTORIO_FIGURAS, f"{clave}.{formato}")
+
+
+def _leer_disco(clave, formato):
+    try:
+        with open(_ruta_disco(clave, formato), 'rb') as archivo:
+            return archivo.read()
+    except OSError:
+        return None
+
+
+def _escribir_disco(clave, formato, datos):
+    ruta = _ruta_disco(clave, formato)
+    try:
+        os.makedirs(DIRECTORIO_FIGURAS, exist_ok=True)
+        # Escritura atómica: otro proceso puede estar leyendo o escribiendo la misma figura
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, 'wb') as archivo:
+            archivo.write(datos)
+        os.replace(temporal, ruta)
+        archivos = [entrada for entrada in os.scandir(DIRECTORIO_FIGURAS) if not entrada.name.endswith('.tmp')]
+        if len(archivos) > MAX_FIGURAS_DISCO:
+            archivos.sort(key=lambda entrada: entrada.stat().st_mtime)
+            for entrada in archivos[:len(archivos) - MAX_FIGURAS_DISCO]:
+                os.remove(entrada.path)
+    except OSError:
+        # Sin permisos de escritura (u otro proceso borró el archivo): basta con el nivel en memoria
+        pass
+
+
+def _memorizada(clave, formato, construir):
+    clave_memoria = (clave, formato)
+    with _candado:
+        datos = _figuras.get(clave_memoria)
+        if datos is not None:
+            _figuras.move_to_end(clave_memoria)
+    if datos is None:
+        datos = _leer_disco(clave, formato)
+        instrumentacion.marcar_cache('figura_disco', datos is not None)
+        if datos is None:
+            datos = construir()
+            _escribir_disco(clave, formato, datos)
+        with _candado:
+            _figuras[clave_memoria] = datos
+            while len(_figuras) > MAX_FIGURAS:
+                _figuras.popitem(last=False)
+        instrumentacion.marcar_cache('figura', False)
+    else:
+        instrumentacion.marcar_cache('figura', True)
+    return datos
+
+
+def figura_memorizada(clave, construir, formato='png'):
+    """
+    Devuelve la imagen de una figura, construyéndola solo si no está en el caché
+    (en memoria o en disco).
+
+    Args:
+        clave (str or None): Clave de la figura (ver clave_figura); con None la figura
+            se construye sin memorizar (p. ej. datos sin versión).
+        construir (callable): Función sin argumentos que devuelve la figura de matplotlib.
+        formato (str): 'png' o 'svg'.
+
+    Returns:
+        bytes: Imagen renderizada.
+    """
+    def renderizar():
+        with _candado_render:
+            return figura_a_bytes(construir(), formato)
+
+    if clave is None:
+        return renderizar()
+    return _memorizada(clave, formato, renderizar)
+
+
+def json_plotly_memorizado(clave, construir):
+    """
+    Devuelve el JSON de una figura de Plotly, construyéndolo solo si no está en el
+    caché (en memoria o en disco).
+
+    Args:
+        clave (str): Clave de la figura (ver clave_figura).
+        construir (callable): Función sin argumentos que devuelve el JSON de la figura (bytes).
+
+    Returns:
+        bytes: JSON de la figura.
+    """
+    return _memorizada(clave, 'json', construir)
+
+
+def figura_plotly_memorizada(clave, construir):
+    """
+    Devuelve una figura de Plotly a partir de su JSON memorizado (en memoria o en
+    disco), construyéndola solo si no está en el caché. Reconstruir la figura desde
+    el JSON es varias veces más rápido que volver a crearla con plotly.express.
+
+    Args:
+        clave (str): Clave de la figura (ver clave_figura).
+        construir (callable): Función sin argumentos que devuelve la figura de Plotly.
+
+    Returns:
+        plotly.graph_objects.Figure: Figura nueva (quien llama puede modificarla).
+    """
+    import plotly.io as pio
+
+    datos = json_plotly_memorizado(clave, lambda: construir().to_json().encode('utf-8'))
+    return pio.from_json(datos.decode('utf-8'))
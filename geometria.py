@@ -0,0 +1,122 @@
+"""
+Almacén local de la geometría de los departamentos de Colombia.
+
+El GeoJSON remoto se lee una sola vez: se guarda como GeoParquet en el
+directorio de caché junto con variantes simplificadas para distintos niveles
+de detalle, y cada variante queda en memoria para el resto del proceso. El
+GeoJSON se descarga a través del caché de descargas, y geopandas solo se
+importa al leer o simplificar la geometría.
+"""
+import hashlib
+import io
+import os
+import threading
+
+import descargas
+import instrumentacion
+from datos_madera import DIRECTORIO_CACHE
+
+URL_COLOMBIA = 'https://raw.githubusercontent.com/Ritz38/Analisis_maderas/refs/heads/main/Colombia.geo.json'
+
+# Tolerancia de simplificación (en grados) de cada nivel de detalle
+NIVELES = {
+    'completa': 0.0,
+    'media': 0.01,
+    'baja': 0.05,
+}
+NIVEL_POR_DEFECTO = 'media'
+
+_geometrias = {}
+_candado = threading.Lock()
+
+
+def simplificar(gdf, tolerancia):
+    """
+    Simplifica los polígonos conservando la topología y los bordes compartidos.
+
+    Usa shapely.coverage_simplify cuando está disponible (shapely >= 2.1), que
+    simplifica cada borde común una sola vez y evita huecos o solapes entre
+    departamentos; si no, simplifica cada polígono por separado con preserve_topology.
+
+    Args:
+        gdf (gpd.GeoDataFrame): Polígonos de los departamentos.
+        tolerancia (float): Distancia máxima de simplificación en unidades del CRS.
+
+    Returns:
+        gpd.GeoDataFrame: Copia con la geometría simplificada.
+    """
+    import geopandas as gpd
+    import shapely
+
+    if tolerancia <= 0:
+        return gdf
+    simplificado = gdf.copy()
+    try:
+        geometrias = shapely.coverage_simplify(gdf.geometry.values, tolerancia)
+        simplificado = simplificado.set_geometry(gpd.GeoSeries(geometrias, index=gdf.index, crs=gdf.crs))
+    except Exception:
+        # shapely antiguo o polígonos que no forman una cobertura válida
+        simplificado['geometry'] = gdf.geometry.simplify(tolerancia, preserve_topology=True)
+    return simplificado
+
+
+def _ruta_nivel(fuente, nivel):
+    clave = hashlib.sha1(fuente.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(DIRECTORIO_CACHE, f'colombia-{clave}-{nivel}.parquet')
+
+
+def _guardar_niveles(fuente, completa):
+    variantes = {nivel: simplificar(completa, tolerancia) for nivel, tolerancia in NIVELES.items()}
+    try:
+        os.makedirs(DIRECTORIO_CACHE, exist_ok=True)
+        for nivel, gdf in variantes.items():
+            ruta = _ruta_nivel(fuente, nivel)
+            gdf.to_parquet(ruta + '.tmp')
+            os.replace(ruta + '.tmp', ruta)
+    except (OSError, ImportError):
+        # Sin permisos de escritura o sin pyarrow: las variantes quedan solo en memoria
+        pass
+    return variantes
+
+
+def cargar_departamentos(nivel=NIVEL_POR_DEFECTO, fuente=None):
+    """
+    Devuelve los polígonos de los departamentos con el nivel de detalle indicado.
+
+    Busca primero en memoria, luego en el GeoParquet local y, solo si no existe,
+    lee el GeoJSON de la fuente y genera todas las variantes simplificadas.
+
+    Args:
+        nivel (str): Nivel de detalle, una de las claves de NIVELES.
+        fuente (str, optional): URL o ruta local del GeoJSON de Colombia. Por defecto, URL_COLOMBIA.
+
+    Returns:
+        gpd.GeoDataFrame: Polígonos de los departamentos (compartido, no debe modificarse).
+    """
+    import geopandas as gpd
+
+    fuente = fuente or URL_COLOMBIA
+    if nivel not in NIVELES:
+        raise ValueError(f"Nivel de detalle desconocido: {nivel!r}. Opciones: {list(NIVELES)}")
+
+    with _candado:
+        gdf = _geometrias.get((fuente, nivel))
+        instrumentacion.marcar_cache('geometria', gdf is not None)
+        if gdf is not None:
+            return gdf
+
+        ruta = _ruta_nivel(fuente, nivel)
+        if os.path.exists(ruta):
+            try:
+                gdf = gpd.read_parquet(ruta)
+            except (OSError, ValueError, ImportError):
+                gdf = None
+        if gdf is None:
+            contenido = io.BytesIO(descargas.descargar(fuente)) if descargas.es_url(fuente) else fuente
+            variantes = _guardar_niveles(fuente, gpd.read_file(contenido))
+            for nombre, variante in variantes.items():
+                _geometrias[(fuente, nombre)] = variante
+            return variantes[nivel]
+
+        _geometrias[(fuente, nivel)] = gdf
+        return gdf
@@ -0,0 +1,136 @@
+"""
+Cargas útiles de los gráficos de Plotly.
+
+Antes de construir una figura, los datos se reducen a lo que el navegador
+necesita dibujar: las categorías principales más un grupo "Otros" en los
+gráficos de barras (tablas.top_n_con_otros), las estadísticas de caja en
+lugar de las filas (ver motor_outliers) y una muestra LTTB de las series
+largas (reducir_serie).
+
+Las figuras se guardan serializadas en el caché de figuras, indexadas por sus
+parámetros y la versión del dataset, y su JSON no supera MAX_BYTES_FIGURA: si
+lo hace, la figura se vuelve a construir con un límite de categorías o puntos
+cada vez menor. Una figura sin límite, o que sigue siendo demasiado grande con
+LIMITE_MINIMO, se envía igual y queda registrada como advertencia.
+"""
+import logging
+import os
+
+import numpy as np
+
+import figuras
+
+# Tamaño máximo del JSON de una figura, en bytes
+MAX_BYTES_FIGURA = int(os.environ.get("APPS_STREAMLIT_MAX_BYTES_FIGURA", "300000"))
+
+# Barras y puntos por serie que se dibujan como máximo
+MAX_CATEGORIAS = 25
+MAX_PUNTOS_SERIE = 500
+
+# Límite por debajo del cual no se sigue reduciendo una figura demasiado grande
+LIMITE_MINIMO = 3
+
+_registro = logging.getLogger(__name__)
+
+
+def lttb(x, y, max_puntos):
+    """
+    Elige los puntos de una serie con Largest-Triangle-Three-Buckets: conserva el
+    primero y el último y, de cada tramo, el que forma el triángulo de mayor área
+    con el punto elegido antes y el promedio del tramo siguiente, de modo que la
+    forma de la serie (picos incluidos) se mantiene con pocos puntos.
+
+    Args:
+        x (array-like): Coordenadas x, crecientes.
+        y (array-like): Valores de la serie.
+        max_puntos (int): Puntos que se conservan (al menos 3).
+
+    Returns:
+        np.ndarray: Posiciones de los puntos elegidos, crecientes.
+    """
+    n = len(x)
+    if max_puntos >= n or max_puntos < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Los puntos intermedios se reparten en max_puntos - 2 tramos
+    limites = np.linspace(1, n - 1, max_puntos - 1).astype(np.int64)
+    elegidos = np.empty(max_puntos, dtype=np.int64)
+    elegidos[0], elegidos[-1] = 0, n - 1
+    anterior = 0
+    for i in range(max_puntos - 2):
+        inicio, fin = limites[i], limites[i + 1]
+        siguiente_fin = limites[i + 2] if i + 2 < len(limites) else n
+        x_medio = x[fin:siguiente_fin].mean()
+        y_medio = y[fin:siguiente_fin].mean()
+        areas = np.abs(
+            (x[anterior] - x_medio) * (y[inicio:fin] - y[anterior])
+            - (x[anterior] - x[inicio:fin]) * (y_medio - y[anterior])
+        )
+        anterior = inicio + int(np.argmax(areas))
+        elegidos[i + 1] = anterior
+    return elegidos
+
+
+def reducir_serie(df, y, max_puntos=MAX_PUNTOS_SERIE):
+    """
+    Reduce una serie ordenada a lo sumo a max_puntos filas con LTTB (usando la
+    posición de cada fila como eje x, para admitir períodos de texto).
+
+    Args:
+        df (pd.DataFrame): Serie, una fila por punto en orden.
+        y (str): Columna de valores.
+        max_puntos (int): Filas que se conservan.
+
+    Returns:
+        pd.DataFrame: La misma serie si ya era corta; si no, las filas elegidas.
+    """
+    if len(df) <= max_puntos:
+        return df
+    return df.iloc[lttb(np.arange(len(df)), df[y].to_numpy(), max_puntos)].reset_index(drop=True)
+
+
+def _serializar_acotada(construir, limite, max_bytes, partes):
+    datos = construir(limite).to_json().encode("utf-8")
+    while limite is not None and len(datos) > max_bytes and limite > LIMITE_MINIMO:
+        limite = max(limite // 2, LIMITE_MINIMO)
+        datos = construir(limite).to_json().encode("utf-8")
+    if len(datos) > max_bytes:
+        _registro.warning(
+            "La figura %s ocupa %d bytes y supera el máximo de %d (%s).",
+            partes, len(datos), max_bytes,
+            "no tiene límite para reducirla" if limite is None else f"ya se redujo al límite {limite}"
+        )
+    return datos
+
+
+def figura(version, construir, *partes, limite=None, max_bytes=None):
+    """
+    Devuelve una figura de Plotly memorizada como JSON y acotada en tamaño.
+
+    La figura se construye con `construir(limite)`; si su JSON supera max_bytes, se
+    vuelve a construir con la mitad del límite (categorías, puntos, outliers...)
+    hasta que cabe o el límite llega a LIMITE_MINIMO. Si no cabe (o no hay límite
+    con el que reducirla), se devuelve igual y se registra una advertencia.
+
+    Args:
+        version (str or None): Versión del dataset; sin versión la figura no se memoriza.
+        construir (callable): Recibe el límite (o None) y devuelve la figura de Plotly.
+        *partes: Parámetros que, junto con la versión, identifican la figura.
+        limite (int, optional): Límite inicial que recibe `construir`; sin límite la
+            figura no se puede reducir.
+        max_bytes (int, optional): Tamaño máximo del JSON. Por defecto, MAX_BYTES_FIGURA.
+
+    Returns:
+        plotly.graph_objects.Figure: Figura nueva (quien llama puede modificarla).
+    """
+    import plotly.io as pio
+
+    max_bytes = max_bytes or MAX_BYTES_FIGURA
+    if version is None:
+        datos = _serializar_acotada(construir, limite, max_bytes, partes)
+    else:
+        clave = figuras.clave_figura('grafico', *partes, version, limite, max_bytes)
+        datos = figuras.json_plotly_memorizado(clave, lambda: _serializar_acotada(construir, limite, max_bytes, partes))
+    return pio.from_json(datos.decode("utf-8"))
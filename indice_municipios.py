@@ -0,0 +1,299 @@
+"""
+Índice de municipios basado en los códigos DIVIPOLA.
+
+Normaliza los nombres de departamento y municipio (mayúsculas, sin tildes ni
+signos de puntuación), resuelve variantes conocidas mediante tablas de alias y
+asigna a cada fila de madera el código COD_MPIO del municipio. Las vistas de
+mapas obtienen coordenadas y nombres con búsquedas por código en arreglos, sin
+volver a unir DataFrames por nombre.
+"""
+import io
+import os
+import re
+import threading
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+import descargas
+import instrumentacion
+
+URL_DIVIPOLA = "https://github.com/Darkblack595/Apps_streamlit/raw/main/DIVIPOLA-_C_digos_municipios_geolocalizados_20250217.csv"
+RUTA_DIVIPOLA = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "DIVIPOLA-_C_digos_municipios_geolocalizados_20250217.csv"
+)
+
+# Código asignado a las filas cuyo municipio no se encuentra en DIVIPOLA
+SIN_CODIGO = -1
+
+# Nombres de departamento normalizados -> nombre normalizado en DIVIPOLA
+ALIAS_DEPARTAMENTOS = {
+    "BOGOTA": "BOGOTA D C",
+    "SANTAFE DE BOGOTA D C": "BOGOTA D C",
+    "GUAJIRA": "LA GUAJIRA",
+    "VALLE": "VALLE DEL CAUCA",
+    "SAN ANDRES": "ARCHIPIELAGO DE SAN ANDRES PROVIDENCIA Y SANTA CATALINA",
+    "SAN ANDRES Y PROVIDENCIA": "ARCHIPIELAGO DE SAN ANDRES PROVIDENCIA Y SANTA CATALINA",
+    "ARCHIPIELAGO DE SAN ANDRES": "ARCHIPIELAGO DE SAN ANDRES PROVIDENCIA Y SANTA CATALINA",
+}
+
+# (departamento, municipio) normalizados en la base de madera -> (departamento, municipio) en DIVIPOLA
+ALIAS_MUNICIPIOS = {
+    ("ANTIOQUIA", "BOLIVAR"): ("ANTIOQUIA", "CIUDAD BOLIVAR"),
+    ("ANTIOQUIA", "CARMEN DE VIBORAL"): ("ANTIOQUIA", "EL CARMEN DE VIBORAL"),
+    ("ANTIOQUIA", "DON MATIAS"): ("ANTIOQUIA", "DONMATIAS"),
+    ("ANTIOQUIA", "SAN PEDRO"): ("ANTIOQUIA", "SAN PEDRO DE LOS MILAGROS"),
+    ("ANTIOQUIA", "SAN VICENTE"): ("ANTIOQUIA", "SAN VICENTE FERRER"),
+    ("ANTIOQUIA", "SANTUARIO"): ("ANTIOQUIA", "EL SANTUARIO"),
+    ("BOLIVAR", "RIOVIEJO"): ("BOLIVAR", "RIO VIEJO"),
+    ("BOYACA", "GUICAN"): ("BOYACA", "GUICAN DE LA SIERRA"),
+    ("CAUCA", "BELALCAZAR"): ("CAUCA", "PAEZ"),
+    ("CAUCA", "PAISPAMBA SOTARA"): ("CAUCA", "SOTARA PAISPAMBA"),
+    ("CAUCA", "PIENDAMO"): ("CAUCA", "PIENDAMO TUNIA"),
+    ("CHOCO", "EL CARMEN DEL DARIEN"): ("CHOCO", "CARMEN DEL DARIEN"),
+    ("CUNDINAMARCA", "BOGOTA"): ("BOGOTA D C", "BOGOTA D C"),
+    ("CUNDINAMARCA", "USME"): ("BOGOTA D C", "BOGOTA D C"),
+    ("CUNDINAMARCA", "UBATE"): ("CUNDINAMARCA", "VILLA DE SAN DIEGO DE UBATE"),
+    ("HUILA", "SALADO BLANCO"): ("HUILA", "SALADOBLANCO"),
+    ("NARINO", "EL TABLON"): ("NARINO", "EL TABLON DE GOMEZ"),
+    ("NARINO", "TUMACO"): ("NARINO", "SAN ANDRES DE TUMACO"),
+    ("NORTE DE SANTANDER", "CUCUTA"): ("NORTE DE SANTANDER", "SAN JOSE DE CUCUTA"),
+    ("SANTANDER", "EL CARMEN"): ("SANTANDER", "EL CARMEN DE CHUCURI"),
+    ("SUCRE", "SINCE"): ("SUCRE", "SAN LUIS DE SINCE"),
+    ("SUCRE", "TOLU"): ("SUCRE", "SANTIAGO DE TOLU"),
+    ("SUCRE", "TOLU VIEJO"): ("SUCRE", "SAN JOSE DE TOLUVIEJO"),
+    ("TOLIMA", "MARIQUITA"): ("TOLIMA", "SAN SEBASTIAN DE MARIQUITA"),
+    ("VALLE DEL CAUCA", "BUGA"): ("VALLE DEL CAUCA", "GUADALAJARA DE BUGA"),
+}
+
+_PARENTESIS = re.compile(r"^(.*?)\s*\((.*)\)\s*$")
+
+_indices = {}
+_candado = threading.Lock()
+
+
+def normalizar_nombre(texto):
+    """
+    Normaliza un nombre geográfico: mayúsculas, sin tildes y sin signos de puntuación.
+
+    Args:
+        texto (str): Nombre a normalizar.
+
+    Returns:
+        str: Nombre normalizado, p. ej. 'Bogotá, D.C.' -> 'BOGOTA D C'.
+    """
+    texto = unicodedata.normalize("NFKD", str(texto))
+    texto = "".join(caracter for caracter in texto if not unicodedata.combining(caracter))
+    return re.sub(r"[^A-Z0-9()]+", " ", texto.upper()).strip()
+
+
+def normalizar_departamento(texto):
+    """
+    Normaliza un nombre de departamento y aplica la tabla de alias.
+
+    Args:
+        texto (str): Nombre del departamento.
+
+    Returns:
+        str: Nombre normalizado tal como aparece en DIVIPOLA.
+    """
+    nombre = normalizar_nombre(texto).replace("(", "").replace(")", "").strip()
+    return ALIAS_DEPARTAMENTOS.get(nombre, nombre)
+
+
+def _sin_parentesis(texto):
+    return re.sub(r"\s+", " ", texto.replace("(", " ").replace(")", " ")).strip()
+
+
+class IndiceMunicipios:
+    """
+    Índice de municipios de DIVIPOLA con búsqueda por nombre normalizado y por código.
+
+    Args:
+        divipola (pd.DataFrame): Tabla DIVIPOLA con COD_MPIO, NOM_DPTO, NOM_MPIO, LATITUD y LONGITUD.
+    """
+
+    def __init__(self, divipola):
+        divipola = divipola.reset_index(drop=True)
+        self.cod_mpio = divipola["COD_MPIO"].to_numpy(dtype=np.int32)
+        self.latitud = divipola["LATITUD"].to_numpy(dtype=np.float64)
+        self.longitud = divipola["LONGITUD"].to_numpy(dtype=np.float64)
+        self.municipio = divipola["NOM_MPIO"].str.title().to_numpy(dtype=object)
+        self.departamento = divipola["NOM_DPTO"].to_numpy(dtype=object)
+
+        self._posicion_por_clave = {
+            (normalizar_departamento(dpto), _sin_parentesis(normalizar_nombre(mpio))): posicion
+            for posicion, (dpto, mpio) in enumerate(zip(divipola["NOM_DPTO"], divipola["NOM_MPIO"]))
+        }
+        # Arreglo denso código -> posición para búsquedas O(1) por código
+        self._posicion_por_codigo = np.full(int(self.cod_mpio.max()) + 1, -1, dtype=np.int32)
+        self._posicion_por_codigo[self.cod_mpio] = np.arange(len(self.cod_mpio), dtype=np.int32)
+
+    def buscar(self, departamento, municipio):
+        """
+        Busca el código DIVIPOLA de un municipio a partir de sus nombres.
+
+        Prueba, en orden, la tabla de alias, el nombre completo, el nombre sin el
+        texto entre paréntesis y el texto entre paréntesis (p. ej. 'Coconuco (Purace)').
+
+        Args:
+            departamento (str): Nombre del departamento.
+            municipio (str): Nombre del municipio.
+
+        Returns:
+            int: Código COD_MPIO, o SIN_CODIGO si no se encontró.
+        """
+        dpto = normalizar_departamento(departamento)
+        mpio = normalizar_nombre(municipio)
+        candidatos = [ALIAS_MUNICIPIOS.get((dpto, _sin_parentesis(mpio))), (dpto, _sin_parentesis(mpio))]
+        partes = _PARENTESIS.match(mpio)
+        if partes:
+            candidatos += [(dpto, partes.group(1).strip()), (dpto, _sin_parentesis(partes.group(2)))]
+        for candidato in candidatos:
+            posicion = self._posicion_por_clave.get(candidato)
+            if posicion is not None:
+                return int(self.cod_mpio[posicion])
+        return SIN_CODIGO
+
+    def codigos(self, departamentos, municipios):
+        """
+        Asigna el código DIVIPOLA a cada par (departamento, municipio).
+
+        La búsqueda por nombre se hace una sola vez por par distinto y se
+        propaga a todas las filas.
+
+        Args:
+            departamentos (pd.Series): Nombres de departamento.
+            municipios (pd.Series): Nombres de municipio.
+
+        Returns:
+            np.ndarray: Códigos COD_MPIO (int32), SIN_CODIGO donde no hubo coincidencia.
+        """
+        pares = pd.DataFrame({"d": departamentos.to_numpy(), "m": municipios.to_numpy()})
+        codigos_pares, unicos = pd.MultiIndex.from_frame(pares).factorize()
+        codigos_unicos = np.array([self.buscar(d, m) for d, m in unicos], dtype=np.int32)
+        return codigos_unicos[codigos_pares]
+
+    def posiciones(self, codigos):
+        """
+        Convierte códigos COD_MPIO en posiciones dentro de los arreglos del índice.
+
+        Args:
+            codigos (array-like): Códigos COD_MPIO.
+
+        Returns:
+            np.ndarray: Posiciones (int32), -1 para códigos desconocidos.
+        """
+        codigos = np.asarray(codigos, dtype=np.int64)
+        validos = (codigos >= 0) & (codigos < len(self._posicion_por_codigo))
+        posiciones = np.full(len(codigos), -1, dtype=np.int32)
+        posiciones[validos] = self._posicion_por_codigo[codigos[validos]]
+        return posiciones
+
+    def coordenadas(self, codigos):
+        """
+        Devuelve latitud, longitud y nombre de los municipios con los códigos dados.
+
+        Args:
+            codigos (array-like): Códigos COD_MPIO.
+
+        Returns:
+            pd.DataFrame: Columnas MUNICIPIO, NOM_DPTO, LATITUD y LONGITUD (NaN si el código no existe).
+        """
+        posiciones = self.posiciones(codigos)
+        validas = posiciones >= 0
+        tomar = np.where(validas, posiciones, 0)
+        return pd.DataFrame({
+            "MUNICIPIO": np.where(validas, self.municipio[tomar], None),
+            "NOM_DPTO": np.where(validas, self.departamento[tomar], None),
+            "LATITUD": np.where(validas, self.latitud[tomar], np.nan),
+            "LONGITUD": np.where(validas, self.longitud[tomar], np.nan),
+        })
+
+
+def cargar_divipola(fuente=None):
+    """
+    Carga la tabla DIVIPOLA, usando la copia incluida en el repositorio si existe.
+    Las URLs se leen a través del caché de descargas.
+
+    Args:
+        fuente (str, optional): URL o ruta del CSV. Por defecto, RUTA_DIVIPOLA o URL_DIVIPOLA.
+
+    Returns:
+        pd.DataFrame: Tabla DIVIPOLA.
+    """
+    if fuente is None:
+        fuente = RUTA_DIVIPOLA if os.path.exists(RUTA_DIVIPOLA) else URL_DIVIPOLA
+    if descargas.es_url(fuente):
+        return pd.read_csv(io.BytesIO(descargas.descargar(fuente, vigencia=descargas.VIGENCIA)))
+    return pd.read_csv(fuente)
+
+
+def obtener_indice(fuente=None):
+    """
+    Devuelve el índice de municipios, construyéndolo una sola vez por proceso.
+
+    Args:
+        fuente (str, optional): URL o ruta del CSV DIVIPOLA.
+
+    Returns:
+        IndiceMunicipios: Índice compartido.
+    """
+    with _candado:
+        indice = _indices.get(fuente)
+        instrumentacion.marcar_cache('indice_municipios', indice is not None)
+        if indice is None:
+            indice = IndiceMunicipios(cargar_divipola(fuente))
+            _indices[fuente] = indice
+        return indice
+
+
+def asignar_codigos(df):
+    """
+    Añade a la base de madera la columna COD_MPIO con el código DIVIPOLA de cada fila.
+
+    Args:
+        df (pd.DataFrame): DataFrame con las columnas DPTO y MUNICIPIO.
+
+    Returns:
+        pd.DataFrame: El mismo DataFrame con la columna COD_MPIO (int32).
+    """
+    df["COD_MPIO"] = obtener_indice().codigos(df["DPTO"], df["MUNICIPIO"])
+    return df
+
+
+def con_coordenadas(df):
+    """
+    Añade el nombre DIVIPOLA y las coordenadas del municipio según la columna COD_MPIO.
+
+    Las filas sin código (SIN_CODIGO) se descartan.
+
+    Args:
+        df (pd.DataFrame): DataFrame con la columna COD_MPIO.
+
+    Returns:
+        pd.DataFrame: Copia con las columnas MUNICIPIO, NOM_DPTO, LATITUD y LONGITUD.
+    """
+    df = df[df["COD_MPIO"] != SIN_CODIGO].reset_index(drop=True)
+    coordenadas = obtener_indice().coordenadas(df["COD_MPIO"].to_numpy())
+    return pd.concat([df.drop(columns=coordenadas.columns, errors="ignore"), coordenadas], axis=1)
+
+
+def resumen_coincidencias(cubo):
+    """
+    Cuenta las filas de madera cuyo municipio no tiene código DIVIPOLA.
+
+    Args:
+        cubo (cubo_madera.CuboMadera): Cubo de la base de madera.
+
+    Returns:
+        dict: 'filas_sin_coincidencia' (int) y 'municipios_sin_coincidencia' (pd.DataFrame con DPTO,
+        MUNICIPIO y REGISTROS).
+    """
+    sin_codigo = cubo.enrollar(["DPTO", "MUNICIPIO"], filtros={"COD_MPIO": SIN_CODIGO})
+    return {
+        "filas_sin_coincidencia": int(sin_codigo["REGISTROS"].sum()),
+        "municipios_sin_coincidencia": sin_codigo[["DPTO", "MUNICIPIO", "REGISTROS"]],
+    }
@@ -0,0 +1,309 @@
+"""
+Instrumentación de las etapas de cada vista (carga, agregación, unión y render).
+
+Cada ejecución de una vista abre una traza con `traza(vista)`; dentro de ella,
+`etapa(nombre)` (o el decorador `instrumentar`) mide el tiempo de cada etapa,
+y los módulos de datos informan aciertos y fallos de sus cachés con
+`marcar_cache`. Los elementos enviados al navegador se miden envolviendo el
+módulo streamlit con StreamlitMedido. Fuera de una traza todas las funciones
+son prácticamente gratuitas.
+
+Las trazas alimentan el panel de diagnóstico de la barra lateral
+(`mostrar_panel`) y, si la variable de entorno APPS_STREAMLIT_REGISTRO indica
+un archivo, se añaden a él como una línea JSON por ejecución, que
+benchmark_madera puede resumir.
+"""
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+
+import pyarrow as pa
+
+# Archivo JSON Lines donde se guardan las trazas (vacío: no se guardan)
+RUTA_REGISTRO = os.environ.get("APPS_STREAMLIT_REGISTRO", "")
+
+_traza_actual = contextvars.ContextVar("traza_actual", default=None)
+_etapa_actual = contextvars.ContextVar("etapa_actual", default=None)
+_candado_registro = threading.Lock()
+
+
+class RegistroEtapa:
+    """
+    Medición de una etapa: tiempo, filas, cachés consultados y bytes enviados.
+
+    Args:
+        nombre (str): Nombre de la etapa (p. ej. 'carga', 'agregacion', 'union', 'render').
+        nivel (int): Profundidad de anidamiento dentro de la traza.
+    """
+
+    def __init__(self, nombre, nivel=0):
+        self.nombre = nombre
+        self.nivel = nivel
+        self.segundos = None
+        self.filas = None
+        self.caches = {}
+        self.bytes_enviados = 0
+
+    def a_dict(self):
+        """
+        Devuelve la medición como diccionario serializable.
+
+        Returns:
+            dict: etapa, nivel, segundos, filas, caches y bytes_enviados.
+        """
+        return {
+            "etapa": self.nombre,
+            "nivel": self.nivel,
+            "segundos": self.segundos,
+            "filas": self.filas,
+            "caches": dict(self.caches),
+            "bytes_enviados": self.bytes_enviados,
+        }
+
+
+class Traza:
+    """
+    Etapas medidas durante una ejecución de una vista.
+
+    Args:
+        vista (str): Nombre de la vista.
+        medir_bytes (bool): Si es True, StreamlitMedido serializa los elementos enviados para medirlos.
+    """
+
+    def __init__(self, vista, medir_bytes=False):
+        self.vista = vista
+        self.medir_bytes = medir_bytes
+        self.fecha = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.segundos = None
+        self.etapas = []
+        self.caches = {}
+        self.bytes_enviados = 0
+
+    def a_dict(self):
+        """
+        Devuelve la traza como diccionario serializable (una línea del registro).
+
+        Returns:
+            dict: fecha, vista, segundos, bytes_enviados, caches (aciertos y fallos) y etapas.
+        """
+        return {
+            "fecha": self.fecha,
+            "vista": self.vista,
+            "segundos": self.segundos,
+            "bytes_enviados": self.bytes_enviados,
+            "caches": {nombre: dict(conteo) for nombre, conteo in self.caches.items()},
+            "etapas": [registro.a_dict() for registro in self.etapas],
+        }
+
+
+@contextlib.contextmanager
+def traza(vista, medir_bytes=False, registrar=True):
+    """
+    Abre la traza de una ejecución de una vista.
+
+    Args:
+        vista (str): Nombre de la vista.
+        medir_bytes (bool): Si es True, se miden los bytes de los elementos enviados al navegador.
+        registrar (bool): Si es True y RUTA_REGISTRO está definida, la traza se añade al registro.
+
+    Yields:
+        Traza: Traza en curso; queda completa al salir del bloque.
+    """
+    actual = Traza(vista, medir_bytes or bool(RUTA_REGISTRO))
+    token = _traza_actual.set(actual)
+    inicio = time.perf_counter()
+    try:
+        yield actual
+    finally:
+        actual.segundos = time.perf_counter() - inicio
+        _traza_actual.reset(token)
+        if registrar and RUTA_REGISTRO:
+            _escribir_registro(actual)
+
+
+@contextlib.contextmanager
+def etapa(nombre, filas=None):
+    """
+    Mide una etapa dentro de la traza en curso.
+
+    Args:
+        nombre (str): Nombre de la etapa.
+        filas (int, optional): Filas procesadas (también se puede asignar a `.filas` dentro del bloque).
+
+    Yields:
+        RegistroEtapa: Medición de la etapa.
+    """
+    actual = _traza_actual.get()
+    padre = _etapa_actual.get()
+    registro = RegistroEtapa(nombre, 0 if padre is None else padre.nivel + 1)
+    registro.filas = filas
+    if actual is None:
+        yield registro
+        return
+
+    actual.etapas.append(registro)
+    token = _etapa_actual.set(registro)
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    finally:
+        registro.segundos = time.perf_counter() - inicio
+        _etapa_actual.reset(token)
+
+
+def instrumentar(nombre):
+    """
+    Decorador que mide cada llamada a la función como una etapa.
+
+    Si el resultado es tabular (DataFrame, Series o arreglo), su longitud se usa como número de filas.
+
+    Args:
+        nombre (str): Nombre de la etapa.
+
+    Returns:
+        callable: Decorador.
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with etapa(nombre) as registro:
+                resultado = funcion(*args, **kwargs)
+                if registro.filas is None and hasattr(resultado, "shape"):
+                    registro.filas = len(resultado)
+                return resultado
+        return envoltura
+    return decorador
+
+
+def marcar_cache(nombre, acierto):
+    """
+    Informa a la traza en curso de una consulta a un caché.
+
+    Args:
+        nombre (str): Nombre del caché (p. ej. 'cubo', 'figura').
+        acierto (bool): True si el valor estaba en el caché.
+    """
+    actual = _traza_actual.get()
+    if actual is None:
+        return
+    resultado = "aciertos" if acierto else "fallos"
+    conteo = actual.caches.setdefault(nombre, {"aciertos": 0, "fallos": 0})
+    conteo[resultado] += 1
+    registro = _etapa_actual.get()
+    if registro is not None:
+        registro.caches[nombre] = "acierto" if acierto else "fallo"
+
+
+def registrar_bytes(n):
+    """
+    Suma bytes enviados al navegador a la traza y a la etapa en curso.
+
+    Args:
+        n (int): Número de bytes.
+    """
+    actual = _traza_actual.get()
+    if actual is None:
+        return
+    actual.bytes_enviados += n
+    registro = _etapa_actual.get()
+    if registro is not None:
+        registro.bytes_enviados += n
+
+
+def _medir_bytes():
+    actual = _traza_actual.get()
+    return actual is not None and actual.medir_bytes
+
+
+class StreamlitMedido:
+    """
+    Envoltura del módulo streamlit que mide el tamaño de los gráficos, imágenes
+    y tablas enviados al navegador. El resto de llamadas pasan sin cambios.
+
+    Args:
+        modulo: Módulo streamlit (u objeto equivalente).
+    """
+
+    def __init__(self, modulo):
+        self._modulo = modulo
+
+    def __getattr__(self, nombre):
+        return getattr(self._modulo, nombre)
+
+    def plotly_chart(self, fig, *args, **kwargs):
+        if _medir_bytes():
+            registrar_bytes(len(fig.to_json()))
+        return self._modulo.plotly_chart(fig, *args, **kwargs)
+
+    def image(self, imagen, *args, **kwargs):
+        if _medir_bytes() and isinstance(imagen, bytes):
+            registrar_bytes(len(imagen))
+        return self._modulo.image(imagen, *args, **kwargs)
+
+    def dataframe(self, df, *args, **kwargs):
+        if _medir_bytes():
+            try:
+                registrar_bytes(pa.Table.from_pandas(df).nbytes)
+            except (pa.ArrowException, TypeError, ValueError):
+                # Columnas mixtas que Arrow no convierte: Streamlit las envía como texto
+                registrar_bytes(df.memory_usage(deep=True).sum())
+        return self._modulo.dataframe(df, *args, **kwargs)
+
+
+def _escribir_registro(actual):
+    try:
+        linea = json.dumps(actual.a_dict(), ensure_ascii=False, default=str)
+        with _candado_registro, open(RUTA_REGISTRO, "a", encoding="utf-8") as archivo:
+            archivo.write(linea + "\n")
+    except OSError:
+        # El registro es opcional: un error de escritura no debe romper la vista
+        pass
+
+
+def leer_registro(ruta=None):
+    """
+    Lee las trazas guardadas en el registro.
+
+    Args:
+        ruta (str, optional): Archivo JSON Lines. Por defecto, RUTA_REGISTRO.
+
+    Returns:
+        list: Una traza (dict, ver Traza.a_dict) por línea.
+    """
+    with open(ruta or RUTA_REGISTRO, encoding="utf-8") as archivo:
+        return [json.loads(linea) for linea in archivo if linea.strip()]
+
+
+def mostrar_panel(actual):
+    """
+    Muestra en la barra lateral el diagnóstico de la última ejecución.
+
+    Args:
+        actual (Traza): Traza completa de la ejecución.
+    """
+    # Solo la interfaz necesita streamlit; los módulos de datos importan este archivo sin él
+    import streamlit as st
+
+    with st.sidebar.expander("Diagnóstico", expanded=True):
+        st.write(f"**Vista:** {actual.vista}  \n**Tiempo total:** {actual.segundos * 1000:,.0f} ms")
+        if actual.medir_bytes:
+            st.write(f"**Enviado al navegador:** {actual.bytes_enviados / 1024:,.1f} KB")
+        st.dataframe([
+            {
+                "Etapa": "  " * registro.nivel + registro.nombre,
+                "ms": round(registro.segundos * 1000, 1) if registro.segundos is not None else None,
+                "Filas": registro.filas,
+                "Cachés": ", ".join(f"{nombre}: {estado}" for nombre, estado in registro.caches.items()),
+                "KB": round(registro.bytes_enviados / 1024, 1),
+            }
+            for registro in actual.etapas
+        ], hide_index=True)
+        if actual.caches:
+            st.caption("Cachés: " + ", ".join(
+                f"{nombre} {conteo['aciertos']}/{conteo['aciertos'] + conteo['fallos']}"
+                for nombre, conteo in actual.caches.items()
+            ) + " aciertos")
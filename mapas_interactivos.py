@@ -0,0 +1,134 @@
+"""
+Mapas interactivos (WebGL) con Plotly como alternativa a los mapas de matplotlib.
+
+Los mapas se dibujan en el navegador con MapLibre a partir de los mismos
+datos agregados que usan las vistas estáticas. La geometría de los
+departamentos se convierte a GeoJSON una sola vez, a partir de la variante
+simplificada de geometria, y se reutiliza en todas las figuras. El estilo
+'white-bg' no descarga teselas, por lo que los mapas funcionan sin conexión.
+"""
+import json
+import threading
+
+import plotly.express as px
+
+import geometria
+import indice_municipios
+
+# Nivel de detalle de la geometría enviada al navegador
+NIVEL_INTERACTIVO = 'baja'
+
+# Estilo de mapa sin teselas externas
+ESTILO_MAPA = 'white-bg'
+CENTRO_COLOMBIA = {'lat': 4.6, 'lon': -74.1}
+ZOOM_COLOMBIA = 4
+
+_geojson = {}
+_candado = threading.Lock()
+
+# plotly >= 5.24 usa MapLibre (choropleth_map); versiones anteriores, Mapbox
+_choropleth = getattr(px, 'choropleth_map', None) or px.choropleth_mapbox
+_scatter = getattr(px, 'scatter_map', None) or px.scatter_mapbox
+_prefijo_layout = 'map' if hasattr(px, 'choropleth_map') else 'mapbox'
+
+
+def geojson_departamentos(nivel=NIVEL_INTERACTIVO):
+    """
+    Devuelve el GeoJSON de los departamentos, identificado por nombre normalizado.
+
+    Args:
+        nivel (str): Nivel de detalle de geometria.NIVELES.
+
+    Returns:
+        dict: FeatureCollection cuyo 'id' de cada feature es el nombre normalizado del departamento.
+    """
+    with _candado:
+        geojson = _geojson.get(nivel)
+        if geojson is None:
+            colombia = geometria.cargar_departamentos(nivel)
+            colombia = colombia.assign(
+                id=colombia['NOMBRE_DPT'].map(indice_municipios.normalizar_departamento)
+            )[['id', 'geometry']]
+            # Redondear coordenadas reduce el tamaño del JSON enviado al navegador
+            geojson = json.loads(colombia.set_index('id').to_json(drop_id=False, to_wgs84=True))
+            for feature in geojson['features']:
+                feature['geometry'] = _redondear(feature['geometry'])
+            _geojson[nivel] = geojson
+        return geojson
+
+
+def _redondear(geometria_json, decimales=4):
+    def redondear(coordenadas):
+        if isinstance(coordenadas[0], (int, float)):
+            return [round(valor, decimales) for valor in coordenadas]
+        return [redondear(parte) for parte in coordenadas]
+    return {**geometria_json, 'coordinates': redondear(geometria_json['coordinates'])}
+
+
+def _configurar(fig, titulo, contornos=False):
+    capas = []
+    if contornos:
+        # Contorno de los departamentos como capa base de los mapas de puntos
+        capas.append({'source': geojson_departamentos(), 'type': 'line', 'color': 'gray', 'line': {'width': 0.8}})
+    fig.update_layout(
+        title=titulo,
+        margin={'l': 0, 'r': 0, 't': 40, 'b': 0},
+        **{
+            _prefijo_layout: {
+                'style': ESTILO_MAPA,
+                'center': CENTRO_COLOMBIA,
+                'zoom': ZOOM_COLOMBIA,
+                'layers': capas,
+            },
+            # Conserva zoom y desplazamiento cuando solo cambian los datos
+            'uirevision': titulo,
+        }
+    )
+    return fig
+
+
+def figura_mapa_calor(vol_por_dpto):
+    """
+    Construye el mapa coroplético de volumen por departamento.
+
+    Args:
+        vol_por_dpto (pd.DataFrame): Columnas DPTO, DPTO_NORM (nombre normalizado) y VOLUMEN M3.
+
+    Returns:
+        plotly.graph_objects.Figure: Mapa interactivo.
+    """
+    fig = _choropleth(
+        vol_por_dpto,
+        geojson=geojson_departamentos(),
+        locations='DPTO_NORM',
+        color='VOLUMEN M3',
+        color_continuous_scale='YlGnBu',
+        hover_name='DPTO',
+        opacity=0.8,
+    )
+    return _configurar(fig, "Distribución de volúmenes de madera por departamento")
+
+
+def figura_mapa_puntos(df_puntos, titulo, color=None):
+    """
+    Construye un mapa de puntos de municipios sobre los contornos de los departamentos.
+
+    Args:
+        df_puntos (pd.DataFrame): Columnas MUNICIPIO, LATITUD, LONGITUD y VOLUMEN M3 (y la de `color`).
+        titulo (str): Título del mapa.
+        color (str, optional): Columna usada para colorear los puntos (p. ej. 'ESPECIE').
+
+    Returns:
+        plotly.graph_objects.Figure: Mapa interactivo.
+    """
+    fig = _scatter(
+        df_puntos,
+        lat='LATITUD',
+        lon='LONGITUD',
+        color=color,
+        hover_name='MUNICIPIO',
+        hover_data={'VOLUMEN M3': True, 'LATITUD': False, 'LONGITUD': False},
+        color_discrete_sequence=px.colors.qualitative.T10 if color else ['red'],
+    )
+    fig.update_traces(marker={'size': 12})
+    return _configurar(fig, titulo, contornos=True)
@@ -0,0 +1,336 @@
+"""
+Motor de detección de outliers para los volúmenes de madera.
+
+Ofrece dos criterios, ambos globales o por grupo (p. ej. por ESPECIE o DPTO):
+rango intercuartílico (IQR) y puntaje z robusto basado en la mediana y la
+desviación absoluta mediana (MAD). Incluye un detector incremental que
+actualiza los límites con un boceto de cuantiles a medida que llegan filas
+(datos_madera le pasa las filas anexadas en cada refresco por la cola), y
+utilidades para dibujar diagramas de caja a partir de estadísticas
+precalculadas y una muestra acotada de outliers, de modo que el tamaño de la
+figura no depende del número de filas.
+"""
+import copy
+import threading
+
+import numpy as np
+
+import bocetos
+import instrumentacion
+
+FACTOR_IQR = 1.5
+# Umbral habitual del puntaje z robusto (Iglewicz y Hoaglin)
+UMBRAL_MAD = 3.5
+# Constante que hace la MAD comparable a la desviación estándar en datos normales
+CONSTANTE_MAD = 0.6745
+
+# Máximo de outliers dibujados por caja y de cajas por figura
+MAX_PUNTOS_CAJA = 200
+MAX_CAJAS = 15
+
+METODOS = ['IQR', 'MAD']
+
+# Máscaras de outliers memorizadas (versión, método, grupo)
+MAX_RESULTADOS = 8
+
+# Detectores incrementales por versión del dataset, actualizados al anexar filas
+MAX_DETECTORES = 4
+
+_resultados = {}
+_detectores = {}
+_candado = threading.Lock()
+
+
+def _agrupar(df, columna, grupo):
+    if grupo is None:
+        return df[columna].groupby(np.zeros(len(df), dtype=np.int8))
+    return df.groupby(grupo, observed=True)[columna]
+
+
+def limites_iqr(df, columna='VOLUMEN M3', grupo=None, factor=FACTOR_IQR):
+    """
+    Calcula los cuartiles y los límites IQR, globales o por grupo.
+
+    Args:
+        df (pd.DataFrame): Datos.
+        columna (str): Columna numérica a analizar.
+        grupo (str, optional): Columna por la que se calculan límites separados.
+        factor (float): Múltiplo del IQR que define los límites.
+
+    Returns:
+        pd.DataFrame: Q1, Q3, LIMITE_INFERIOR y LIMITE_SUPERIOR por grupo.
+    """
+    cuartiles = _agrupar(df, columna, grupo).quantile([0.25, 0.75]).unstack()
+    cuartiles.columns = ['Q1', 'Q3']
+    iqr = cuartiles['Q3'] - cuartiles['Q1']
+    cuartiles['LIMITE_INFERIOR'] = cuartiles['Q1'] - factor * iqr
+    cuartiles['LIMITE_SUPERIOR'] = cuartiles['Q3'] + factor * iqr
+    return cuartiles
+
+
+def puntajes_mad(df, columna='VOLUMEN M3', grupo=None):
+    """
+    Calcula el puntaje z robusto 0.6745 * (x - mediana) / MAD, global o por grupo.
+
+    Args:
+        df (pd.DataFrame): Datos.
+        columna (str): Columna numérica a analizar.
+        grupo (str, optional): Columna por la que se calculan medianas y MAD separadas.
+
+    Returns:
+        pd.Series: Puntaje de cada fila (NaN si la MAD del grupo es cero).
+    """
+    agrupado = _agrupar(df, columna, grupo)
+    mediana = agrupado.transform('median')
+    mad = (df[columna] - mediana).abs().groupby(
+        np.zeros(len(df), dtype=np.int8) if grupo is None else df[grupo], observed=True
+    ).transform('median')
+    return CONSTANTE_MAD * (df[columna] - mediana) / mad.replace(0, np.nan)
+
+
+def detectar_outliers(df, metodo='IQR', grupo=None, columna='VOLUMEN M3'):
+    """
+    Marca las filas atípicas según el método elegido. El resultado se memoriza por
+    versión del dataset, método y grupo; sin versión no se memoriza.
+
+    Args:
+        df (pd.DataFrame): Datos (cargados con datos_madera).
+        metodo (str): 'IQR' o 'MAD'.
+        grupo (str, optional): Columna por la que se calculan límites separados.
+        columna (str): Columna numérica a analizar.
+
+    Returns:
+        np.ndarray: Máscara booleana de outliers, alineada con las filas de df.
+    """
+    if metodo not in METODOS:
+        raise ValueError(f"Método de outliers desconocido: {metodo!r}. Opciones: {METODOS}")
+    version = df.attrs.get('version')
+    clave = (version, len(df), metodo, grupo, columna)
+    with _candado:
+        mascara = _resultados.get(clave) if version else None
+    instrumentacion.marcar_cache('outliers', mascara is not None)
+    if mascara is not None:
+        return mascara
+
+    if metodo == 'IQR':
+        limites = limites_iqr(df, columna, grupo)
+        claves = np.zeros(len(df), dtype=np.int8) if grupo is None else df[grupo]
+        inferior = limites['LIMITE_INFERIOR'].reindex(claves).to_numpy()
+        superior = limites['LIMITE_SUPERIOR'].reindex(claves).to_numpy()
+        valores = df[columna].to_numpy()
+        mascara = (valores < inferior) | (valores > superior)
+    else:
+        mascara = (puntajes_mad(df, columna, grupo).abs() > UMBRAL_MAD).to_numpy()
+
+    if not version:
+        return mascara
+    with _candado:
+        _resultados[clave] = mascara
+        while len(_resultados) > MAX_RESULTADOS:
+            _resultados.pop(next(iter(_resultados)))
+    return mascara
+
+
+class DetectorIncremental:
+    """
+    Detector IQR cuyos límites se actualizan a medida que llegan nuevas filas,
+    usando un boceto de cuantiles en lugar de guardar todos los valores.
+
+    Args:
+        factor (float): Múltiplo del IQR que define los límites.
+        k (int): Parámetro de precisión del boceto KLL.
+    """
+
+    def __init__(self, factor=FACTOR_IQR, k=400):
+        self.factor = factor
+        self.boceto = bocetos.BocetoCuantiles(k=k, semilla=0)
+
+    def actualizar(self, valores):
+        """
+        Incorpora un bloque de valores nuevos.
+
+        Args:
+            valores (pd.Series): Valores del bloque.
+        """
+        self.boceto.actualizar(valores)
+
+    def limites(self):
+        """
+        Devuelve los límites vigentes.
+
+        Returns:
+            tuple: (límite inferior, límite superior), o (None, None) si aún no hay datos.
+        """
+        q1, q3 = self.boceto.cuantiles([0.25, 0.75])
+        if q1 is None:
+            return None, None
+        iqr = q3 - q1
+        return q1 - self.factor * iqr, q3 + self.factor * iqr
+
+    def clasificar(self, valores):
+        """
+        Marca como outliers los valores fuera de los límites vigentes.
+
+        Args:
+            valores (pd.Series): Valores a clasificar.
+
+        Returns:
+            np.ndarray: Máscara booleana de outliers.
+        """
+        inferior, superior = self.limites()
+        valores = np.asarray(valores, dtype=np.float64)
+        if inferior is None:
+            return np.zeros(len(valores), dtype=bool)
+        return (valores < inferior) | (valores > superior)
+
+
+def _registrar_detector(clave, detector):
+    with _candado:
+        _detectores[clave] = detector
+        while len(_detectores) > MAX_DETECTORES:
+            _detectores.pop(next(iter(_detectores)))
+
+
+def detector_incremental(df, columna='VOLUMEN M3'):
+    """
+    Devuelve el detector incremental de la versión del dataset. Si no está en
+    memoria se construye con toda la columna; después lo mantiene actualizar_detector
+    con las filas anexadas, sin volver a recorrer el dataset.
+
+    Args:
+        df (pd.DataFrame): Datos (cargados con datos_madera).
+        columna (str): Columna numérica a analizar.
+
+    Returns:
+        DetectorIncremental: Detector con los límites IQR aproximados de la versión.
+    """
+    version = df.attrs.get('version')
+    with _candado:
+        detector = _detectores.get((version, columna)) if version else None
+    instrumentacion.marcar_cache('detector', detector is not None)
+    if detector is not None:
+        return detector
+    detector = DetectorIncremental()
+    detector.actualizar(df[columna])
+    if version:
+        _registrar_detector((version, columna), detector)
+    return detector
+
+
+def actualizar_detector(version_anterior, delta, version, columna='VOLUMEN M3'):
+    """
+    Registra el detector de una versión nueva del dataset a partir del de la anterior,
+    incorporando solo las filas anexadas.
+
+    Si el detector de la versión anterior no está en memoria no se hace nada: se
+    construirá completo la primera vez que se pida con detector_incremental.
+
+    Args:
+        version_anterior (str): Versión del dataset antes de anexar las filas.
+        delta (pd.DataFrame): Filas anexadas.
+        version (str): Versión del dataset con las filas anexadas.
+        columna (str): Columna numérica analizada.
+
+    Returns:
+        DetectorIncremental or None: Detector de la versión nueva, o None si no había detector anterior.
+    """
+    with _candado:
+        anterior = _detectores.get((version_anterior, columna))
+    if anterior is None:
+        return None
+    # Se copia para que el detector de la versión anterior conserve sus límites
+    detector = copy.deepcopy(anterior)
+    detector.actualizar(delta[columna])
+    _registrar_detector((version, columna), detector)
+    return detector
+
+
+def estadisticas_caja(valores, factor=FACTOR_IQR, max_puntos=MAX_PUNTOS_CAJA):
+    """
+    Calcula las estadísticas de un diagrama de caja y una muestra acotada de outliers.
+
+    Args:
+        valores (array-like): Valores numéricos.
+        factor (float): Múltiplo del IQR que define los bigotes.
+        max_puntos (int): Máximo de outliers conservados (se prefieren los más extremos).
+
+    Returns:
+        dict: q1, mediana, q3, bigote_inferior, bigote_superior, n, n_outliers y outliers (muestra).
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    valores = valores[~np.isnan(valores)]
+    q1, mediana, q3 = np.quantile(valores, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    dentro = valores[(valores >= q1 - factor * iqr) & (valores <= q3 + factor * iqr)]
+    atipicos = valores[(valores < q1 - factor * iqr) | (valores > q3 + factor * iqr)]
+    if len(atipicos) > max_puntos:
+        distancia = np.maximum(q1 - atipicos, atipicos - q3)
+        atipicos = atipicos[np.argpartition(-distancia, max_puntos - 1)[:max_puntos]]
+    return {
+        'q1': float(q1),
+        'mediana': float(mediana),
+        'q3': float(q3),
+        'bigote_inferior': float(dentro.min()) if len(dentro) else float(q1),
+        'bigote_superior': float(dentro.max()) if len(dentro) else float(q3),
+        'n': int(len(valores)),
+        'n_outliers': int(np.count_nonzero((valores < q1 - factor * iqr) | (valores > q3 + factor * iqr))),
+        'outliers': atipicos,
+    }
+
+
+def estadisticas_caja_por_grupo(df, columna='VOLUMEN M3', grupo=None, max_cajas=MAX_CAJAS, max_puntos=MAX_PUNTOS_CAJA):
+    """
+    Calcula las estadísticas de caja globales o de los grupos con más filas.
+
+    Args:
+        df (pd.DataFrame): Datos.
+        columna (str): Columna numérica.
+        grupo (str, optional): Columna de agrupación.
+        max_cajas (int): Máximo de grupos incluidos.
+        max_puntos (int): Máximo de outliers conservados por caja.
+
+    Returns:
+        dict: Nombre de la caja -> estadísticas (ver estadisticas_caja).
+    """
+    if grupo is None:
+        return {columna: estadisticas_caja(df[columna], max_puntos=max_puntos)}
+    principales = df[grupo].value_counts().head(max_cajas).index
+    return {
+        str(nombre): estadisticas_caja(valores, max_puntos=max_puntos)
+        for nombre, valores in df[df[grupo].isin(principales)].groupby(grupo, observed=True)[columna]
+    }
+
+
+def figura_caja(estadisticas, titulo):
+    """
+    Construye un diagrama de caja de Plotly con estadísticas precalculadas.
+
+    Args:
+        estadisticas (dict): Nombre de la caja -> estadísticas (ver estadisticas_caja).
+        titulo (str): Título de la figura.
+
+    Returns:
+        plotly.graph_objects.Figure: Figura de tamaño constante respecto al número de filas.
+    """
+    # Plotly se importa solo al dibujar: datos_madera importa este módulo en cada carga
+    import plotly.graph_objects as go
+
+    nombres = list(estadisticas)
+    fig = go.Figure(go.Box(
+        x=nombres,
+        q1=[estadisticas[nombre]['q1'] for nombre in nombres],
+        median=[estadisticas[nombre]['mediana'] for nombre in nombres],
+        q3=[estadisticas[nombre]['q3'] for nombre in nombres],
+        lowerfence=[estadisticas[nombre]['bigote_inferior'] for nombre in nombres],
+        upperfence=[estadisticas[nombre]['bigote_superior'] for nombre in nombres],
+        name='Distribución',
+        boxpoints=False,
+    ))
+    x_atipicos = [nombre for nombre in nombres for _ in estadisticas[nombre]['outliers']]
+    y_atipicos = np.concatenate([estadisticas[nombre]['outliers'] for nombre in nombres])
+    fig.add_trace(go.Scatter(
+        x=x_atipicos, y=y_atipicos, mode='markers', name='Outliers (muestra)',
+        marker={'size': 4, 'opacity': 0.6},
+    ))
+    fig.update_layout(title=titulo, showlegend=False)
+    return fig
@@ -0,0 +1,247 @@
+"""
+Perfilado incremental de archivos CSV leídos por bloques.
+
+Permite describir archivos más grandes que la memoria: cada bloque leído
+actualiza los acumuladores por columna (filas, nulos, tipo inferido, mínimo,
+máximo y los bocetos de valores distintos, cuartiles y valores más frecuentes
+de bocetos.py) y luego se descarta, de modo que la memoria usada no depende
+del tamaño del archivo. Los perfiles parciales (de bloques o de procesos
+distintos) se unen con `combinar`.
+"""
+import pandas as pd
+from pandas.api import types as tipos_pandas
+
+import bocetos
+
+# Filas leídas por bloque
+TAMANO_BLOQUE = 100_000
+
+# Valores más frecuentes que se muestran por columna
+TOP_VALORES = 3
+
+# Jerarquía de tipos: al combinar bloques se conserva el más general
+_ORDEN_TIPOS = ['vacío', 'booleano', 'entero', 'decimal', 'fecha', 'texto']
+
+
+def _tipo_columna(serie):
+    if serie.isna().all():
+        return 'vacío'
+    if tipos_pandas.is_bool_dtype(serie):
+        return 'booleano'
+    if tipos_pandas.is_integer_dtype(serie):
+        return 'entero'
+    if tipos_pandas.is_float_dtype(serie):
+        # Columnas enteras con nulos llegan como float
+        no_nulos = serie.dropna()
+        return 'entero' if (no_nulos == no_nulos.round()).all() else 'decimal'
+    if tipos_pandas.is_datetime64_any_dtype(serie):
+        return 'fecha'
+    return 'texto'
+
+
+def _combinar_tipos(tipo_a, tipo_b):
+    if 'texto' in (tipo_a, tipo_b):
+        return 'texto'
+    if {tipo_a, tipo_b} == {'fecha', 'entero'} or {tipo_a, tipo_b} == {'fecha', 'decimal'}:
+        return 'texto'
+    return max(tipo_a, tipo_b, key=_ORDEN_TIPOS.index)
+
+
+def _minimo(a, b):
+    if a is None or b is None:
+        return b if a is None else a
+    try:
+        return min(a, b)
+    except TypeError:
+        # Tipos incomparables (p. ej. fechas y números): la columna terminará como texto
+        return a
+
+
+def _maximo(a, b):
+    if a is None or b is None:
+        return b if a is None else a
+    try:
+        return max(a, b)
+    except TypeError:
+        return a
+
+
+class PerfilColumna:
+    """
+    Acumuladores de una columna: conteos, tipo, extremos y bocetos aproximados.
+    """
+
+    def __init__(self):
+        self.filas = 0
+        self.nulos = 0
+        self.tipo = 'vacío'
+        self.minimo = None
+        self.maximo = None
+        self.distintos = bocetos.BocetoDistintos()
+        self.cuantiles = bocetos.BocetoCuantiles()
+        self.frecuencias = bocetos.BocetoFrecuencias()
+
+    def actualizar(self, serie):
+        """
+        Incorpora un bloque de valores de la columna.
+
+        Args:
+            serie (pd.Series): Valores de la columna en el bloque.
+        """
+        self.filas += len(serie)
+        self.nulos += int(serie.isna().sum())
+        self.tipo = _combinar_tipos(self.tipo, _tipo_columna(serie))
+
+        no_nulos = serie.dropna()
+        if len(no_nulos) and (tipos_pandas.is_numeric_dtype(no_nulos) or tipos_pandas.is_datetime64_any_dtype(no_nulos)):
+            self.minimo = _minimo(self.minimo, no_nulos.min())
+            self.maximo = _maximo(self.maximo, no_nulos.max())
+        if tipos_pandas.is_numeric_dtype(no_nulos) and not tipos_pandas.is_bool_dtype(no_nulos):
+            self.cuantiles.actualizar(no_nulos)
+
+        self.distintos.actualizar(no_nulos)
+        self.frecuencias.actualizar(no_nulos)
+
+    def combinar(self, otro):
+        """
+        Une en este perfil el perfil de la misma columna calculado sobre otras filas.
+
+        Args:
+            otro (PerfilColumna): Perfil parcial a combinar.
+
+        Returns:
+            PerfilColumna: Este mismo perfil, actualizado.
+        """
+        self.filas += otro.filas
+        self.nulos += otro.nulos
+        self.tipo = _combinar_tipos(self.tipo, otro.tipo)
+        self.minimo = _minimo(self.minimo, otro.minimo)
+        self.maximo = _maximo(self.maximo, otro.maximo)
+        self.distintos.combinar(otro.distintos)
+        self.cuantiles.combinar(otro.cuantiles)
+        self.frecuencias.combinar(otro.frecuencias)
+        return self
+
+    def resumen(self):
+        """
+        Devuelve los indicadores acumulados de la columna.
+
+        Returns:
+            dict: Tipo, nulos, mínimo, máximo, cuartiles, valores distintos y más frecuentes,
+            con las cotas de error de los valores aproximados.
+        """
+        # Los extremos solo tienen sentido si toda la columna resultó numérica o de fechas
+        con_extremos = self.tipo in ('booleano', 'entero', 'decimal', 'fecha')
+        con_cuartiles = self.tipo in ('entero', 'decimal') and self.cuantiles.total > 0
+        q1, mediana, q3 = self.cuantiles.cuantiles([0.25, 0.5, 0.75]) if con_cuartiles else (None, None, None)
+        frecuentes = ", ".join(
+            f"{valor} (≈{conteo:,})" for valor, conteo in self.frecuencias.mas_frecuentes(TOP_VALORES)
+        )
+        return {
+            'Tipo inferido': self.tipo,
+            'Valores nulos': self.nulos,
+            'Mínimo': self.minimo if con_extremos else None,
+            'Máximo': self.maximo if con_extremos else None,
+            'Q1 (aprox.)': q1,
+            'Mediana (aprox.)': mediana,
+            'Q3 (aprox.)': q3,
+            'Error de rango cuartiles': f"±{self.cuantiles.error_rango():.1%}" if con_cuartiles else None,
+            'Valores distintos (aprox.)': round(self.distintos.estimar()),
+            'Error valores distintos': f"±{self.distintos.error_relativo():.1%}",
+            'Más frecuentes (aprox.)': frecuentes,
+            'Error frecuencias': f"+{self.frecuencias.error_absoluto():,.0f}",
+        }
+
+
+class PerfilDataset:
+    """
+    Perfil incremental de un dataset: número de filas y un PerfilColumna por columna.
+    """
+
+    def __init__(self):
+        self.filas = 0
+        self.columnas = {}
+        self.muestra = None
+
+    def actualizar(self, bloque, filas_muestra=5):
+        """
+        Incorpora un bloque de filas al perfil.
+
+        Args:
+            bloque (pd.DataFrame): Bloque leído del archivo.
+            filas_muestra (int): Número de filas iniciales que se conservan como muestra.
+        """
+        if self.muestra is None:
+            self.muestra = bloque.head(filas_muestra).copy()
+        self.filas += len(bloque)
+        for columna in bloque.columns:
+            self.columnas.setdefault(columna, PerfilColumna()).actualizar(bloque[columna])
+
+    def combinar(self, otro):
+        """
+        Une en este perfil un perfil parcial calculado sobre otras filas del mismo dataset.
+
+        Args:
+            otro (PerfilDataset): Perfil parcial a combinar.
+
+        Returns:
+            PerfilDataset: Este mismo perfil, actualizado.
+        """
+        if self.muestra is None:
+            self.muestra = otro.muestra
+        self.filas += otro.filas
+        for columna, perfil in otro.columnas.items():
+            if columna in self.columnas:
+                self.columnas[columna].combinar(perfil)
+            else:
+                self.columnas[columna] = perfil
+        return self
+
+    def resumen(self):
+        """
+        Devuelve el perfil por columna como tabla.
+
+        Returns:
+            pd.DataFrame: Una fila por columna del dataset.
+        """
+        return pd.DataFrame.from_dict(
+            {columna: perfil.resumen() for columna, perfil in self.columnas.items()},
+            orient='index'
+        )
+
+
+def perfilar_csv(fuente, tamano_bloque=TAMANO_BLOQUE, al_avanzar=None):
+    """
+    Recorre un CSV por bloques y construye su perfil sin cargarlo completo en memoria.
+
+    Args:
+        fuente (str or file-like): Ruta, URL u objeto de archivo con el CSV.
+        tamano_bloque (int): Filas por bloque.
+        al_avanzar (callable, optional): Función llamada tras cada bloque con el perfil parcial.
+
+    Returns:
+        PerfilDataset: Perfil del archivo completo.
+    """
+    perfil = PerfilDataset()
+    with pd.read_csv(fuente, chunksize=tamano_bloque) as lector:
+        for bloque in lector:
+            perfil.actualizar(bloque)
+            if al_avanzar is not None:
+                al_avanzar(perfil)
+    return perfil
+
+
+def combinar_perfiles(perfiles):
+    """
+    Une en una sola pasada los perfiles parciales de distintos bloques o procesos.
+
+    Args:
+        perfiles (iterable): Perfiles parciales (PerfilDataset) del mismo dataset.
+
+    Returns:
+        PerfilDataset: Perfil combinado.
+    """
+    combinado = PerfilDataset()
+    for perfil in perfiles:
+        combinado.combinar(perfil)
+    return combinado
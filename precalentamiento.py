@@ -0,0 +1,236 @@
+"""
+Precalentamiento de las vistas de App_madera.
+
+Al arrancar el servidor o tras una actualización de los datos, prepara en
+segundo plano lo que cada vista necesita en su primera visita, para que el
+primer usuario no pague el costo completo:
+
+- en el propio proceso (un hilo de fondo), los cachés en memoria livianos:
+  cubo, facetas, enrollados, outliers e índice de municipios (ver
+  `precalentar` en cada módulo de vistas_madera), sin cargar geopandas ni
+  matplotlib en el servidor;
+- en un grupo de procesos, las figuras de las selecciones más comunes (mapas
+  estáticos y barras de cada departamento), que quedan en el nivel en disco
+  del caché de figuras y el servidor sirve sin volver a dibujarlas. El grupo
+  tiene a lo sumo MAX_PROCESOS procesos (uno por CPU hasta ese tope), salvo
+  que APPS_STREAMLIT_PROCESOS indique otro número, y nunca más que tareas.
+
+Variables de entorno:
+    APPS_STREAMLIT_PRECALENTAR=0  desactiva el precalentamiento automático.
+    APPS_STREAMLIT_PROCESOS=N     procesos del grupo de renderizado.
+
+Los procesos leen los datos del almacén Parquet local (ver datos_madera) y
+ejecutan las vistas con StreamlitSimulado, sin servidor.
+
+Uso como script (p. ej. al desplegar, antes de arrancar Streamlit):
+    python precalentamiento.py --procesos 4
+"""
+import argparse
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+import time
+
+import datos_madera
+import vistas_madera
+
+# '0' desactiva el precalentamiento automático al cargar los datos en App_madera
+ACTIVO = os.environ.get("APPS_STREAMLIT_PRECALENTAR", "1") != "0"
+
+# Procesos del grupo de renderizado: uno por CPU hasta MAX_PROCESOS, porque corren junto al
+# servidor y cada uno importa pandas, plotly y matplotlib (APPS_STREAMLIT_PROCESOS lo cambia)
+MAX_PROCESOS = 4
+PROCESOS = int(os.environ.get("APPS_STREAMLIT_PROCESOS", "0")) or min(os.cpu_count() or 1, MAX_PROCESOS)
+
+# Versiones del dataset ya precalentadas (o en curso) en este proceso
+_versiones = set()
+_candado = threading.Lock()
+
+# DataFrame leído del almacén en cada proceso del grupo: fuente -> DataFrame
+_datos_trabajador = {}
+
+
+class StreamlitSimulado:
+    """
+    Sustituto de `streamlit` para ejecutar las vistas sin servidor.
+
+    Los widgets devuelven su valor por defecto (o el indicado en `respuestas`,
+    por etiqueta) y los elementos de salida no hacen nada; los bytes enviados
+    los mide instrumentacion.StreamlitMedido.
+
+    Args:
+        respuestas (dict, optional): Etiqueta del widget -> valor elegido.
+    """
+
+    def __init__(self, respuestas=None):
+        self.respuestas = respuestas or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+    def __getattr__(self, nombre):
+        # title, subheader, write, plotly_chart, image, dataframe, ...: sin efecto
+        return lambda *args, **kwargs: None
+
+    @property
+    def sidebar(self):
+        return self
+
+    def columns(self, especificacion, **kwargs):
+        n = especificacion if isinstance(especificacion, int) else len(especificacion)
+        return [self] * n
+
+    def expander(self, *args, **kwargs):
+        return self
+
+    def _elegir(self, etiqueta, opciones, index=0):
+        opciones = list(opciones)
+        if etiqueta in self.respuestas:
+            return self.respuestas[etiqueta]
+        return opciones[index] if opciones else None
+
+    def selectbox(self, etiqueta, opciones, index=0, **kwargs):
+        return self._elegir(etiqueta, opciones, index)
+
+    def radio(self, etiqueta, opciones, index=0, **kwargs):
+        return self._elegir(etiqueta, opciones, index)
+
+    def slider(self, etiqueta, min_value=None, max_value=None, value=None, **kwargs):
+        return self.respuestas.get(etiqueta, value)
+
+    def number_input(self, etiqueta, min_value=None, max_value=None, value=None, **kwargs):
+        return self.respuestas.get(etiqueta, value)
+
+    def text_input(self, etiqueta, value="", **kwargs):
+        return self.respuestas.get(etiqueta, value)
+
+    def checkbox(self, etiqueta, value=False, **kwargs):
+        return self.respuestas.get(etiqueta, value)
+
+
+def _renderizar_vista(fuente, version, modulo, funcion, respuestas):
+    # Se ejecuta en un proceso del grupo: las figuras quedan en el caché en disco
+    df = _datos_trabajador.get(fuente)
+    if df is None:
+        df = datos_madera.cargar_almacen(fuente)
+        _datos_trabajador[fuente] = df
+    if df is None or df.attrs.get("version") != version:
+        # El almacén cambió (o no existe): las figuras no corresponderían a los datos del servidor
+        return modulo, funcion, None
+    vistas = vistas_madera.cargar_modulo(modulo)
+    vistas.st = StreamlitSimulado(respuestas)
+    inicio = time.perf_counter()
+    getattr(vistas, funcion)(df)
+    return modulo, funcion, time.perf_counter() - inicio
+
+
+def renderizar(df, fuente, procesos=PROCESOS):
+    """
+    Renderiza en un grupo de procesos las figuras de las selecciones más comunes
+    de todas las vistas y las deja en el caché de figuras en disco.
+
+    Args:
+        df (pd.DataFrame): Datos cargados con datos_madera (se usa su versión y sus selecciones).
+        fuente (str): Fuente de los datos, cuyo almacén local leen los procesos.
+        procesos (int): Número máximo de procesos (nunca se lanzan más que tareas).
+
+    Returns:
+        list: Tuplas (módulo, función, segundos, error); segundos es None si la tarea no se
+        ejecutó y error describe la excepción si falló.
+    """
+    tareas = vistas_madera.tareas_precalentamiento(df)
+    if not tareas:
+        return []
+    procesos = max(1, min(procesos, len(tareas)))
+    version = df.attrs.get("version")
+    # 'spawn': el servidor tiene hilos en marcha y un fork podría heredar candados tomados
+    contexto = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as grupo:
+        futuros = [
+            (modulo, funcion, grupo.submit(_renderizar_vista, fuente, version, modulo, funcion, respuestas))
+            for modulo, funcion, respuestas in tareas
+        ]
+        resultados = []
+        for modulo, funcion, futuro in futuros:
+            try:
+                resultados.append((*futuro.result(), None))
+            except Exception as error:
+                # El precalentamiento es opcional: la vista fallará (o no) cuando se abra
+                resultados.append((modulo, funcion, None, f"{type(error).__name__}: {error}"))
+        return resultados
+
+
+def precalentar(df, fuente, procesos=PROCESOS):
+    """
+    Precalienta todas las vistas: figuras en el grupo de procesos y, mientras
+    tanto, los cachés en memoria de este proceso.
+
+    Args:
+        df (pd.DataFrame): Datos cargados con datos_madera.
+        fuente (str): Fuente de los datos.
+        procesos (int): Número de procesos del grupo de renderizado.
+
+    Returns:
+        list: Resultado de renderizar.
+    """
+    resultado = []
+    figuras = threading.Thread(target=lambda: resultado.extend(renderizar(df, fuente, procesos)),
+                               name="precalentamiento-figuras")
+    figuras.start()
+    vistas_madera.precalentar(df)
+    figuras.join()
+    return resultado
+
+
+def iniciar(df, fuente, procesos=PROCESOS):
+    """
+    Lanza en un hilo de fondo el precalentamiento de la versión del dataset, una
+    sola vez por versión y proceso. No hace nada si ACTIVO es False.
+
+    Args:
+        df (pd.DataFrame): Datos cargados con datos_madera.
+        fuente (str): Fuente de los datos.
+        procesos (int): Número de procesos del grupo de renderizado.
+
+    Returns:
+        threading.Thread or None: Hilo lanzado, o None si no hacía falta.
+    """
+    version = df.attrs.get("version")
+    if not ACTIVO or version is None:
+        return None
+    with _candado:
+        if version in _versiones:
+            return None
+        _versiones.add(version)
+    hilo = threading.Thread(target=precalentar, args=(df, fuente, procesos), name="precalentamiento", daemon=True)
+    hilo.start()
+    return hilo
+
+
+def main():
+    """
+    Carga los datos (creando o actualizando el almacén local) y renderiza las
+    figuras de todas las vistas en el caché en disco.
+    """
+    parser = argparse.ArgumentParser(description="Precalienta el caché de figuras de App_madera.")
+    parser.add_argument("--fuente", default=datos_madera.URL_MADERA, help="URL o ruta del CSV de madera.")
+    parser.add_argument("--procesos", type=int, default=PROCESOS, help="Procesos del grupo de renderizado.")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    df = datos_madera.cargar_madera(args.fuente)
+    for modulo, funcion, segundos, error in renderizar(df, args.fuente, args.procesos):
+        if error:
+            estado = f"error ({error})"
+        else:
+            estado = "omitida (el almacén cambió)" if segundos is None else f"{segundos:.2f} s"
+        print(f"{modulo}.{funcion}: {estado}")
+    print(f"Total: {time.perf_counter() - inicio:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
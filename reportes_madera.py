@@ -0,0 +1,466 @@
+"""
+Exportación por lotes de los análisis de madera, sin servidor de Streamlit.
+
+Genera de una vez todos los reportes de App_madera (especies del país y de
+cada departamento, top 10 de especies, mapa de calor por departamento, top 10
+de municipios, especies con menor volumen, volumen por municipio, outliers y
+evolución temporal de cada especie) con las mismas funciones de cálculo y
+dibujo que las vistas, y los escribe en un directorio:
+
+- tablas/*.parquet: los resultados de cada análisis;
+- figuras/*.png: los mapas estáticos (matplotlib);
+- figuras/*.html: los gráficos y mapas interactivos de Plotly, que comparten
+  figuras/plotly.min.js y se abren sin conexión;
+- reportes.json: versión del dataset, fecha y archivos generados.
+
+Las filas se recorren una sola vez, al construir el cubo (ver cubo_madera)
+en este proceso; el cubo se guarda como archivo Arrow y los procesos del
+grupo lo abren mapeado en memoria (ver datos_compartidos), de modo que cada
+reporte sale de enrollados del cubo. Solo los outliers necesitan las filas,
+que los procesos leen del almacén local (ver datos_madera).
+
+Uso:
+    python reportes_madera.py --salida reportes --procesos 4
+    python reportes_madera.py --fuente base_datos_madera.csv --geojson colombia.geo.json
+"""
+import argparse
+import concurrent.futures
+import datetime
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+
+import cubo_madera
+import datos_compartidos
+import datos_madera
+import facetas
+import figuras
+import geometria
+import mapas_interactivos
+import motor_outliers
+import tablas
+import vistas_madera
+from precalentamiento import PROCESOS
+
+# Barras del gráfico de volumen por municipio (el resto se agrupa en "Otros")
+MUNICIPIOS_GRAFICO = 20
+
+# Agrupaciones de los límites de outliers que se exportan
+GRUPOS_OUTLIERS = [None, 'ESPECIE', 'DPTO']
+
+# Archivo de Plotly que comparten los HTML (se escribe una vez en figuras/)
+PLOTLY_JS = 'plotly.min.js'
+
+# Estado de cada proceso del grupo (ver _iniciar_trabajador)
+_trabajador = {}
+
+
+def nombre_archivo(*partes):
+    """
+    Construye un nombre de archivo a partir de los parámetros de un reporte.
+
+    Args:
+        *partes: Nombre del reporte y parámetros (None se omite).
+
+    Returns:
+        str: Partes unidas con '_', sin separadores de ruta ni espacios.
+    """
+    return '_'.join(re.sub(r'[^\w.-]+', '_', str(parte)).strip('_.') for parte in partes if parte is not None)
+
+
+def _con_nombres_unicos(valores):
+    # Valores que solo difieren en espacios o signos (p. ej. especies mal escritas) darían el
+    # mismo nombre de archivo: a partir del segundo se numeran
+    usados = set()
+    pares = []
+    for valor in map(str, valores):
+        nombre = base = nombre_archivo(valor)
+        copia = 1
+        while nombre.casefold() in usados:
+            copia += 1
+            nombre = f"{base}_{copia}"
+        usados.add(nombre.casefold())
+        pares.append((valor, nombre))
+    return pares
+
+
+def _etiqueta(nombre, argumentos):
+    # Identificador del reporte: su nombre y el último argumento (el grupo, o el nombre de archivo
+    # del departamento o la especie)
+    return nombre_archivo(nombre.removeprefix('reporte_'), *argumentos[-1:])
+
+
+def _tabla(salida, df, *partes, indice=False):
+    ruta = os.path.join(salida, 'tablas', nombre_archivo(*partes) + '.parquet')
+    df.to_parquet(ruta, index=indice)
+    return ruta
+
+
+def _html(salida, fig, *partes):
+    ruta = os.path.join(salida, 'figuras', nombre_archivo(*partes) + '.html')
+    fig.write_html(ruta, include_plotlyjs=PLOTLY_JS)
+    return ruta
+
+
+def _png(salida, fig, *partes):
+    ruta = os.path.join(salida, 'figuras', nombre_archivo(*partes) + '.png')
+    with open(ruta, 'wb') as archivo:
+        archivo.write(figuras.figura_a_bytes(fig))
+    return ruta
+
+
+def _filas():
+    # Filas del almacén local (solo las piden los outliers), leídas una vez por proceso
+    df = _trabajador.get('filas')
+    if df is None:
+        df = datos_madera.cargar_almacen(_trabajador['fuente'])
+        if df is None or df.attrs.get('version') != _trabajador['version']:
+            raise RuntimeError("El almacén local cambió o no existe; vuelva a generar los reportes.")
+        _trabajador['filas'] = df
+    return df
+
+
+def reporte_especies_pais(cubo, salida):
+    """
+    Volumen por especie en el país y en cada departamento, y gráfico del país.
+
+    Args:
+        cubo (cubo_madera.CuboMadera): Cubo del dataset.
+        salida (str): Directorio de salida.
+
+    Returns:
+        list: Archivos escritos.
+    """
+    especies = vistas_madera.cargar_modulo('especies')
+    pais = cubo.enrollar('ESPECIE').sort_values(by='VOLUMEN M3', ascending=False)
+    departamento = cubo.enrollar(['DPTO', 'ESPECIE']).sort_values(by=['DPTO', 'VOLUMEN M3'], ascending=[True, False])
+    return [
+        _tabla(salida, pais, 'especies_pais'),
+        _tabla(salida, departamento, 'especies_departamento'),
+        _html(salida, especies.figura_barras_especies(pais, 'Volumen por especie (País)'), 'especies_pais'),
+    ]
+
+
+def reporte_especies_departamento(cubo, salida, dpto, nombre):
+    """
+    Gráfico de volumen por especie de un departamento.
+
+    Args:
+        cubo (cubo_madera.CuboMadera): Cubo del dataset.
+        salida (str): Directorio de salida.
+        dpto (str): Departamento.
+        nombre (str): Nombre del departamento en los archivos (ver tareas_reportes).
+
+    Returns:
+        list: Archivos escritos.
+    """
+    especies = vistas_madera.cargar_modulo('especies')
+    df = cubo.enrollar(['DPTO', 'ESPECIE'])
+    df = df[df['DPTO'] == dpto]
+    fig = especies.figura_barras_especies(df, f'Volumen por especie en {dpto}')
+    return [_html(salida, fig, 'especies_departamento', nombre)]
+
+
+def reporte_top_especies(cubo, salida):
+    """
+    Las diez especies con mayor volumen movilizado.
+
+    Args:
+        cubo (cubo_madera.CuboMadera): Cubo del dataset.
+        salida (str): Directorio de salida.
+
+    Returns:
+        list: Archivos escritos.
+    """
+    import plotly.express as px
+
+    top = vistas_madera.cargar_modulo('especies').top_especies(cubo)
+    fig = px.bar(top, x='ESPECIE', y='VOLUMEN M3', title='Top 10 especies con mayor volumen movilizado')
+    return [_tabla(salida, top, 'top_10_especies'), _html(salida, fig, 'top_10_especies')]
+
+
+def reporte_mapa_calor(cubo, salida):
+    """
+    Volumen por departamento con su mapa de calor estático e interactivo.
+
+    Args:
+        cubo (cubo_madera.CuboMadera): Cubo del dataset.
+        salida (str): Directorio de salida.
+
+    Returns:
+        list: Archivos escritos.
+    """
+    mapas = vistas_madera.cargar_modulo('mapas')
+    vol_por_dpto = mapas.volumen_por_departamento(cubo)
+    return [
+        _tabla(salida, vol_por_dpto, 'volumen_departamento'),
+        _png(salida, mapas.dibujar_mapa_calor(vol_por_dpto), 'mapa_calor'),
+        _html(salida, mapas_interactivos.figura_mapa_calor(vol_por_dpto), 'mapa_calor'),
+    ]
+
+
+def reporte_top_municipios(cubo, salida):
+    """
+    Los diez municipios con mayor movilización, con sus mapas.
+
+    Args:
+        cubo (cubo_madera.CuboMadera): Cubo del dataset.
+        salida (str): Directorio de salida.
+
+    Returns:
+        list: Archivos escritos.
+    """
+    mapas = vistas_madera.cargar_modulo('mapas')
+    top = mapas.top_municipios(cubo)
+    titulo = "Top 10 municipios con mayor movilización de madera"
+    return [
+        _tabla(salida, top, 'top_10_municipios'),
+        _png(salida, mapas.dibujar_mapa_top_municipios(top), 'mapa_top_10_municipios'),
+        _html(salida, mapas_interactivos.figura_mapa_puntos(top, titulo), 'mapa_top_10_municipios'),
+    ]
+
+
+def reporte_menor_volumen(cubo, salida):
+    """
+    Las diez especies con menor volumen y su distribución por municipio, con sus mapas.
+
+    Args:
+        cubo (cubo_madera.CuboMadera): Cubo del dataset.
+        salida (str): Directorio de salida.
+
+    Returns:
+        list: Archivos escritos.
+    """
+    mapas = vistas_madera.cargar_modulo('mapas')
+    menor = mapas.especies_menor_volumen(cubo)
+    especies = list(menor['ESPECIE'])
+    distribucion = mapas.distribucion_especies(cubo, especies)
+    titulo = "Distribución geográfica de especies con menor volumen movilizado"
+    fig = mapas_interactivos.figura_mapa_puntos(distribucion.astype({'ESPECIE': str}), titulo, color='ESPECIE')
+    return [
+        _tabla(salida, menor, 'especies_menor_volumen'),
+        _tabla(salida, distribucion, 'distribucion_especies_menor_volumen'),
+        _png(salida, mapas.dibujar_mapa_especies(distribucion, especies), 'mapa_especies_menor_volumen'),
+        _html(salida, fig, 'mapa_especies_menor_volumen'),
+    ]
+
+
+def reporte_municipios(cubo, salida):
+    """
+    Volumen total por municipio y gráfico de los principales (el resto en "Otros").
+
+    Args:
+        cubo (cubo_madera.CuboMadera): Cubo del dataset.
+        salida (str): Directorio de salida.
+
+    Returns:
+        list: Archivos escritos.
+    """
+    import plotly.express as px
+
+    df = vistas_madera.cargar_modulo('municipios').volumen_por_municipio(cubo)
+    barras = tablas.top_n_con_otros(df, 'MUNICIPIO', 'VOLUMEN M3', n=MUNICIPIOS_GRAFICO)
+    fig = px.bar(barras, x='MUNICIPIO', y='VOLUMEN M3', title='Volumen total de madera por municipio')
+    return [_tabla(salida, df, 'municipios'), _html(salida, fig, 'municipios')]
+
+
+def reporte_outliers(cubo, salida, grupo):
+    """
+    Filas atípicas con cada método (con sus índices originales) y gráfico de caja.
+
+    Args:
+        cubo (cubo_madera.CuboMadera): Cubo del dataset (no se usa: los outliers salen de las filas).
+        salida (str): Directorio de salida.
+        grupo (str or None): Columna por la que se calculan los límites, o None para todo el dataset.
+
+    Returns:
+        list: Archivos escritos.
+    """
+    df = _filas()
+    archivos = [
+        _tabla(salida, df[motor_outliers.detectar_outliers(df, metodo, grupo)], 'outliers', metodo, grupo, indice=True)
+        for metodo in motor_outliers.METODOS
+    ]
+    fig = motor_outliers.figura_caja(
+        motor_outliers.estadisticas_caja_por_grupo(df, grupo=grupo),
+        'Distribución de volúmenes de madera con outliers'
+    )
+    return archivos + [_html(salida, fig, 'caja_outliers', grupo)]
+
+
+def reporte_evolucion(cubo, salida):
+    """
+    Volumen por especie, tipo de producto y período (año, semestre y trimestre).
+
+    Args:
+        cubo (cubo_madera.CuboMadera): Cubo del dataset.
+        salida (str): Directorio de salida.
+
+    Returns:
+        list: Archivos escritos.
+    """
+    return [
+        _tabla(salida, cubo.enrollar(['ESPECIE', 'TIPO PRODUCTO'] + columnas), 'evolucion', periodo)
+        for periodo, columnas in facetas.PERIODOS.items()
+    ]
+
+
+def reporte_evolucion_especie(cubo, salida, especie, nombre):
+    """
+    Gráfico de la evolución anual de una especie, una línea por tipo de producto.
+
+    Args:
+        cubo (cubo_madera.CuboMadera): Cubo del dataset.
+        salida (str): Directorio de salida.
+        especie (str): Especie.
+        nombre (str): Nombre de la especie en los archivos (ver tareas_reportes).
+
+    Returns:
+        list: Archivos escritos.
+    """
+    import plotly.express as px
+
+    serie = cubo.enrollar(['ESPECIE', 'TIPO PRODUCTO', 'AÑO'])
+    serie = serie[serie['ESPECIE'] == especie].astype({'TIPO PRODUCTO': str}).sort_values('AÑO')
+    fig = px.line(serie, x='AÑO', y='VOLUMEN M3', color='TIPO PRODUCTO', markers=True,
+                  title=f'Evolución temporal de {especie}')
+    return [_html(salida, fig, 'evolucion', nombre)]
+
+
+def tareas_reportes(cubo):
+    """
+    Devuelve los reportes que se generan: los generales y uno por departamento,
+    por agrupación de outliers y por especie.
+
+    Args:
+        cubo (cubo_madera.CuboMadera): Cubo del dataset.
+
+    Returns:
+        list: Pares (nombre de la función de reporte, argumentos adicionales); los reportes
+        por departamento y por especie reciben el valor y su nombre de archivo, único.
+    """
+    tareas = [(nombre, ()) for nombre in (
+        'reporte_especies_pais', 'reporte_top_especies', 'reporte_mapa_calor', 'reporte_top_municipios',
+        'reporte_menor_volumen', 'reporte_municipios', 'reporte_evolucion',
+    )]
+    tareas += [('reporte_outliers', (grupo,)) for grupo in GRUPOS_OUTLIERS]
+    tareas += [('reporte_especies_departamento', par) for par in _con_nombres_unicos(cubo.enrollar('DPTO')['DPTO'])]
+    tareas += [('reporte_evolucion_especie', par) for par in _con_nombres_unicos(cubo.enrollar('ESPECIE')['ESPECIE'])]
+    return tareas
+
+
+def _iniciar_trabajador(fuente, version, ruta_cubo, geojson):
+    # Se ejecuta al arrancar cada proceso del grupo: abre el cubo compartido
+    if geojson:
+        geometria.URL_COLOMBIA = geojson
+    _trabajador.update(
+        fuente=fuente,
+        version=version,
+        cubo=cubo_madera.CuboMadera(datos_compartidos.abrir(ruta_cubo), version),
+    )
+
+
+def _ejecutar(salida, nombre, argumentos):
+    inicio = time.perf_counter()
+    archivos = globals()[nombre](_trabajador['cubo'], salida, *argumentos)
+    return archivos, time.perf_counter() - inicio
+
+
+def generar(df, fuente, salida, procesos=PROCESOS, geojson=None):
+    """
+    Genera todos los reportes en un grupo de procesos y escribe reportes.json.
+
+    Args:
+        df (pd.DataFrame): Datos cargados con datos_madera (su almacén local lo leen los procesos).
+        fuente (str): Fuente de los datos.
+        salida (str): Directorio de salida (se crea si no existe).
+        procesos (int): Número de procesos.
+        geojson (str, optional): GeoJSON local de los departamentos (en lugar de descargarlo).
+
+    Returns:
+        list: Tuplas (nombre, argumentos, archivos, segundos, error); error describe la
+        excepción si el reporte falló.
+    """
+    import plotly.offline
+
+    version = df.attrs.get('version')
+    cubo = cubo_madera.obtener_cubo(df)
+    for subdirectorio in ('tablas', 'figuras'):
+        os.makedirs(os.path.join(salida, subdirectorio), exist_ok=True)
+    with open(os.path.join(salida, 'figuras', PLOTLY_JS), 'w', encoding='utf-8') as archivo:
+        archivo.write(plotly.offline.get_plotlyjs())
+
+    ruta_cubo = os.path.join(salida, f'.cubo-{os.getpid()}', 'cubo.arrow')
+    datos_compartidos.escribir(cubo.datos, ruta_cubo)
+    resultados = []
+    try:
+        contexto = multiprocessing.get_context('spawn')
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=procesos, mp_context=contexto,
+            initializer=_iniciar_trabajador, initargs=(fuente, version, ruta_cubo, geojson)
+        ) as grupo:
+            futuros = [
+                (nombre, argumentos, grupo.submit(_ejecutar, salida, nombre, argumentos))
+                for nombre, argumentos in tareas_reportes(cubo)
+            ]
+            for nombre, argumentos, futuro in futuros:
+                try:
+                    resultados.append((nombre, argumentos, *futuro.result(), None))
+                except Exception as error:
+                    resultados.append((nombre, argumentos, [], None, f"{type(error).__name__}: {error}"))
+    finally:
+        shutil.rmtree(os.path.dirname(ruta_cubo), ignore_errors=True)
+
+    indice = {
+        'version': version,
+        'fuente': fuente,
+        'generado': datetime.datetime.now().isoformat(timespec='seconds'),
+        'reportes': [
+            {
+                'reporte': _etiqueta(nombre, argumentos),
+                'archivos': [os.path.relpath(ruta, salida) for ruta in archivos],
+                'error': error,
+            }
+            for nombre, argumentos, archivos, _, error in resultados
+        ],
+    }
+    with open(os.path.join(salida, 'reportes.json'), 'w', encoding='utf-8') as archivo:
+        json.dump(indice, archivo, ensure_ascii=False, indent=2)
+    return resultados
+
+
+def main():
+    """
+    Carga los datos (creando o actualizando el almacén local) y genera todos los reportes.
+    """
+    parser = argparse.ArgumentParser(description="Exporta los análisis de madera a Parquet, PNG y HTML.")
+    parser.add_argument("--fuente", default=datos_madera.URL_MADERA, help="URL o ruta del CSV de madera.")
+    parser.add_argument("--salida", default="reportes", help="Directorio donde se escriben los reportes.")
+    parser.add_argument("--procesos", type=int, default=PROCESOS, help="Procesos del grupo de reportes.")
+    parser.add_argument("--geojson", help="GeoJSON local de los departamentos (en lugar de descargarlo).")
+    args = parser.parse_args()
+
+    if args.geojson:
+        geometria.URL_COLOMBIA = args.geojson
+    inicio = time.perf_counter()
+    df = datos_madera.cargar_madera(args.fuente)
+    resultados = generar(df, args.fuente, args.salida, args.procesos, args.geojson)
+    errores = 0
+    for nombre, argumentos, archivos, segundos, error in resultados:
+        etiqueta = _etiqueta(nombre, argumentos)
+        if error:
+            errores += 1
+            print(f"{etiqueta}: error ({error})")
+        else:
+            print(f"{etiqueta}: {len(archivos)} archivos, {segundos:.2f} s")
+    print(f"Total: {len(resultados)} reportes, {errores} con error, {time.perf_counter() - inicio:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Componentes de tabla para resultados grandes.
+
+La tabla paginada ordena, filtra y corta el DataFrame en el servidor y solo
+envía al navegador la página visible, de modo que el costo de cada
+interacción no depende del número de filas. `top_n_con_otros` reduce las
+series categóricas largas a las N categorías principales más una categoría
+"Otros" para los gráficos de barras.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit
+from pandas.api import types as tipos_pandas
+
+import instrumentacion
+
+# Mide los bytes de las páginas enviadas cuando hay una traza activa
+st = instrumentacion.StreamlitMedido(streamlit)
+
+FILAS_POR_PAGINA = 50
+OPCIONES_FILAS_POR_PAGINA = [25, 50, 100, 250]
+
+# Órdenes de filas memorizados (tabla, versión de los datos, filtro, columna de orden)
+MAX_ORDENES = 16
+
+_ordenes = {}
+_candado = threading.Lock()
+
+
+def filtrar_texto(df, texto):
+    """
+    Devuelve la máscara de filas en las que alguna columna de texto contiene el texto buscado.
+
+    En las columnas categóricas la búsqueda se hace sobre las categorías y no sobre cada fila.
+
+    Args:
+        df (pd.DataFrame): Datos.
+        texto (str): Texto a buscar (sin distinguir mayúsculas).
+
+    Returns:
+        np.ndarray: Máscara booleana de filas coincidentes.
+    """
+    mascara = np.zeros(len(df), dtype=bool)
+    for columna in df.columns:
+        serie = df[columna]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            categorias = serie.cat.categories.astype(str).str.contains(texto, case=False, regex=False)
+            mascara |= np.isin(serie.cat.codes.to_numpy(), np.flatnonzero(categorias))
+        elif tipos_pandas.is_string_dtype(serie) or tipos_pandas.is_object_dtype(serie):
+            mascara |= serie.astype(str).str.contains(texto, case=False, regex=False).to_numpy()
+    return mascara
+
+
+def _orden_filas(df, clave, version, texto, columna, ascendente):
+    memo = (clave, version, len(df), tuple(df.columns), texto, columna, ascendente)
+    with _candado:
+        posiciones = _ordenes.get(memo) if version is not None else None
+    instrumentacion.marcar_cache('orden_tabla', posiciones is not None)
+    if posiciones is not None:
+        return posiciones
+
+    posiciones = np.flatnonzero(filtrar_texto(df, texto)) if texto else np.arange(len(df))
+    if columna is not None:
+        valores = df[columna].iloc[posiciones]
+        orden = np.argsort(valores.to_numpy() if tipos_pandas.is_numeric_dtype(valores) else valores.astype(str).to_numpy(),
+                           kind='stable')
+        posiciones = posiciones[orden if ascendente else orden[::-1]]
+
+    if version is None:
+        return posiciones
+    with _candado:
+        _ordenes[memo] = posiciones
+        while len(_ordenes) > MAX_ORDENES:
+            _ordenes.pop(next(iter(_ordenes)))
+    return posiciones
+
+
+def mostrar_tabla_paginada(df, clave, filas_por_pagina=FILAS_POR_PAGINA, version=None):
+    """
+    Muestra un DataFrame por páginas, con orden y filtro de texto calculados en el servidor.
+
+    Solo la página visible se serializa y se envía al navegador. El orden de las
+    filas se memoriza por clave y versión, de modo que las re-ejecuciones no vuelven
+    a recorrer los datos.
+
+    Args:
+        df (pd.DataFrame): Datos a mostrar (no se modifica).
+        clave (str): Prefijo único para las claves de los widgets de esta tabla.
+        filas_por_pagina (int): Filas por página iniciales.
+        version (hashable, optional): Identifica el contenido de df (la versión del dataset y,
+            si df se deriva de él, los parámetros de la derivación); sin versión no se memoriza.
+    """
+    col_filtro, col_orden, col_sentido, col_filas = st.columns([3, 2, 1, 1])
+    texto = col_filtro.text_input("Filtrar", key=f"{clave}_filtro", placeholder="Texto a buscar")
+    columna = col_orden.selectbox("Ordenar por", [None] + list(df.columns), key=f"{clave}_orden",
+                                  format_func=lambda c: "(sin ordenar)" if c is None else str(c))
+    ascendente = col_sentido.radio("Sentido", ["↑", "↓"], key=f"{clave}_sentido") == "↑"
+    opciones = sorted(set(OPCIONES_FILAS_POR_PAGINA) | {filas_por_pagina})
+    filas_por_pagina = col_filas.selectbox("Filas", opciones, index=opciones.index(filas_por_pagina),
+                                           key=f"{clave}_filas")
+
+    posiciones = _orden_filas(df, clave, version, texto, columna, ascendente)
+    total = len(posiciones)
+    paginas = max(1, -(-total // filas_por_pagina))
+    pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, value=1, step=1,
+                             key=f"{clave}_pagina_{paginas}")
+
+    inicio = (pagina - 1) * filas_por_pagina
+    fin = min(inicio + filas_por_pagina, total)
+    st.dataframe(df.iloc[posiciones[inicio:fin]])
+    st.caption(f"Filas {inicio + 1 if total else 0}–{fin} de {total:,}" + (f" (filtradas de {len(df):,})" if texto else ""))
+
+
+def top_n_con_otros(df, columna, valor, n=20, etiqueta="Otros"):
+    """
+    Conserva las N categorías con mayor valor y suma el resto en una categoría "Otros".
+
+    Args:
+        df (pd.DataFrame): Datos agregados, una fila por categoría.
+        columna (str): Columna con la categoría.
+        valor (str): Columna numérica por la que se ordena y que se suma.
+        n (int): Número de categorías que se conservan.
+        etiqueta (str): Nombre de la categoría que agrupa al resto.
+
+    Returns:
+        pd.DataFrame: A lo sumo n + 1 filas, ordenadas de mayor a menor (con "Otros" al final).
+    """
+    ordenado = df[[columna, valor]].sort_values(valor, ascending=False)
+    if len(ordenado) <= n + 1:
+        return ordenado
+    principales = ordenado.head(n).astype({columna: str})
+    resto = pd.DataFrame({columna: [f"{etiqueta} ({len(ordenado) - n})"], valor: [ordenado[valor].iloc[n:].sum()]})
+    return pd.concat([principales, resto], ignore_index=True)
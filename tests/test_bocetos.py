@@ -0,0 +1,61 @@
+"""
+Pruebas de los bocetos combinables con bloques cuyo tipo de columna cambia.
+"""
+import collections
+
+import pandas as pd
+
+import bocetos
+
+# La misma columna leída por bloques: entera, de texto (un valor no numérico) y decimal (con nulos)
+BLOQUES = [
+    pd.Series([5, 5, 7, 12]),
+    pd.Series(['5', 'x', '5.0', '7', None], dtype=object),
+    pd.Series([5.0, 7.0, None, 2.5]),
+]
+
+# Conteos exactos esperados, en forma canónica (números como float, el resto como texto)
+EXACTOS = {5.0: 5, 7.0: 3, 12.0: 1, 'x': 1, 2.5: 1}
+
+
+def _combinado(crear):
+    parciales = []
+    for bloque in BLOQUES:
+        boceto = crear()
+        boceto.actualizar(bloque)
+        parciales.append(boceto)
+    combinado = parciales[0]
+    for parcial in parciales[1:]:
+        combinado.combinar(parcial)
+    return combinado
+
+
+def test_normalizar_da_la_misma_forma_en_todos_los_tipos():
+    formas = collections.Counter()
+    for bloque in BLOQUES:
+        formas.update(bocetos._normalizar(bloque))
+    assert dict(formas) == EXACTOS
+
+
+def test_frecuencias_combinadas_coinciden_con_los_conteos_exactos():
+    combinado = _combinado(bocetos.BocetoFrecuencias)
+    assert combinado.total == sum(EXACTOS.values())
+    assert dict(combinado.mas_frecuentes(len(EXACTOS))) == EXACTOS
+
+
+def test_frecuencias_con_poda_de_candidatos():
+    # Con pocos candidatos la poda vuelve a calcular los hashes de los candidatos guardados
+    combinado = _combinado(lambda: bocetos.BocetoFrecuencias(candidatos=2))
+    assert combinado.mas_frecuentes(2) == [(5.0, 5), (7.0, 3)]
+
+
+def test_frecuencias_por_bloques_en_un_solo_boceto():
+    boceto = bocetos.BocetoFrecuencias()
+    for bloque in BLOQUES:
+        boceto.actualizar(bloque)
+    assert dict(boceto.mas_frecuentes(len(EXACTOS))) == EXACTOS
+
+
+def test_distintos_no_separa_tipos():
+    combinado = _combinado(bocetos.BocetoDistintos)
+    assert round(combinado.estimar()) == len(EXACTOS)
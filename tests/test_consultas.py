@@ -0,0 +1,106 @@
+"""
+Pruebas del motor de consultas: cada motor instalado devuelve lo mismo que pandas,
+sobre un DataFrame en memoria y sobre archivos Parquet.
+"""
+import os
+
+import pandas as pd
+import pytest
+
+import consultas
+import datos_madera
+
+BASE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "base_datos_madera.csv")
+
+MEDIDAS = {
+    'VOLUMEN M3': ('VOLUMEN M3', 'sum'),
+    'REGISTROS': ('VOLUMEN M3', 'size'),
+    'MINIMO': ('VOLUMEN M3', 'min'),
+    'MAXIMO': ('VOLUMEN M3', 'max'),
+    'PROMEDIO': ('VOLUMEN M3', 'mean'),
+    'TRIMESTRES': ('TRIMESTRE', 'count'),
+    'SUMA_ANIOS': ('AÑO', 'sum'),
+}
+
+CONSULTAS = [
+    ('ESPECIE', None),
+    (['AÑO', 'SEMESTRE'], None),
+    (['DPTO', 'TIPO PRODUCTO'], {'AÑO': [2018, 2019, 2020]}),
+    ('MUNICIPIO', {'ESPECIE': 'Pinus patula', 'SEMESTRE': 'I'}),
+]
+
+
+@pytest.fixture(scope="module")
+def madera():
+    return datos_madera.leer_csv_madera(BASE)
+
+
+@pytest.fixture(scope="module")
+def parquet(madera, tmp_path_factory):
+    directorio = tmp_path_factory.mktemp("parquet")
+    rutas = []
+    for i, (_, parte) in enumerate(madera.groupby('AÑO', observed=True)):
+        rutas.append(str(directorio / f"parte-{i:04d}.parquet"))
+        parte.to_parquet(rutas[-1], index=False)
+    return rutas
+
+
+@pytest.fixture(params=consultas.MOTORES)
+def motor(request, monkeypatch):
+    if request.param not in consultas.motores_disponibles():
+        pytest.skip(f"{request.param} no está instalado")
+    # Sin mínimo de filas, para que el motor resuelva también tablas pequeñas
+    monkeypatch.setattr(consultas, "FILAS_MINIMAS_MOTOR", 0)
+    return request.param
+
+
+def _esperado(df, por, filtros):
+    por = [por] if isinstance(por, str) else por
+    for columna, valor in (filtros or {}).items():
+        df = df[df[columna].isin(valor if isinstance(valor, list) else [valor])]
+    return df.groupby(por, observed=True).agg(**MEDIDAS).reset_index()
+
+
+@pytest.mark.parametrize("por, filtros", CONSULTAS)
+def test_agregar_igual_a_pandas(madera, motor, por, filtros):
+    resultado = consultas.agregar(madera, por, MEDIDAS, filtros, motor=motor)
+    pd.testing.assert_frame_equal(resultado, _esperado(madera, por, filtros), check_exact=False, rtol=1e-9)
+
+
+@pytest.mark.parametrize("por, filtros", CONSULTAS)
+def test_agregar_parquet_igual_a_pandas(madera, parquet, motor, por, filtros):
+    resultado = consultas.agregar(parquet, por, MEDIDAS, filtros, motor=motor)
+    # Desde Parquet las categorías (y el orden de las filas) salen de los archivos leídos
+    pd.testing.assert_frame_equal(resultado, consultas.agregar(parquet, por, MEDIDAS, filtros, motor='pandas'),
+                                  check_exact=False, rtol=1e-9)
+    # Los valores coinciden con los del DataFrame en memoria
+    columnas = [por] if isinstance(por, str) else por
+    esperado = _esperado(madera, por, filtros).astype({columna: str for columna in columnas})
+    pd.testing.assert_frame_equal(
+        resultado.astype({columna: str for columna in columnas}).sort_values(columnas, ignore_index=True),
+        esperado.sort_values(columnas, ignore_index=True),
+        check_exact=False, rtol=1e-9
+    )
+
+
+def test_filtrar_igual_a_pandas(madera, motor):
+    filtros = {'ESPECIE': ['Pinus patula', 'Acacia mangium'], 'SEMESTRE': 'II'}
+    columnas = ['AÑO', 'DPTO', 'ESPECIE', 'VOLUMEN M3']
+    resultado = consultas.filtrar(madera, filtros, columnas, motor=motor)
+    esperado = madera[madera['ESPECIE'].isin(filtros['ESPECIE']) & (madera['SEMESTRE'] == 'II')][columnas]
+    pd.testing.assert_frame_equal(resultado.reset_index(drop=True), esperado.reset_index(drop=True))
+
+
+def test_funcion_desconocida(madera):
+    with pytest.raises(ValueError):
+        consultas.agregar(madera, 'ESPECIE', {'X': ('VOLUMEN M3', 'median')})
+
+
+def test_filtrar_parquet_igual_a_pandas(parquet, motor):
+    filtros = {'ESPECIE': ['Pinus patula', 'Acacia mangium'], 'SEMESTRE': 'II'}
+    columnas = ['AÑO', 'DPTO', 'ESPECIE', 'VOLUMEN M3']
+    orden = ['AÑO', 'DPTO', 'ESPECIE', 'VOLUMEN M3']
+    resultado = consultas.filtrar(parquet, filtros, columnas, motor=motor).sort_values(orden, ignore_index=True)
+    esperado = consultas.filtrar(parquet, filtros, columnas, motor='pandas').sort_values(orden, ignore_index=True)
+    pd.testing.assert_frame_equal(resultado, esperado)
+    assert list(resultado['ESPECIE'].cat.categories) == ['Acacia mangium', 'Pinus patula']
@@ -0,0 +1,96 @@
+"""
+Pruebas del cubo de agregados: enrollados frente a las filas originales y
+actualización por diferencia al anexar filas.
+"""
+import os
+
+import pandas as pd
+import pytest
+
+import cubo_madera
+import datos_madera
+import indice_municipios
+
+BASE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "base_datos_madera.csv")
+
+ENROLLADOS = [
+    ('ESPECIE', None),
+    (['AÑO', 'SEMESTRE'], None),
+    (['DPTO', 'TIPO PRODUCTO'], None),
+    ('TIPO PRODUCTO', {'ESPECIE': 'Pinus patula'}),
+    (['COD_MPIO', 'ESPECIE'], {'ESPECIE': ['Pinus patula', 'Acacia mangium']}),
+]
+
+
+@pytest.fixture(scope="module")
+def madera():
+    return indice_municipios.asignar_codigos(datos_madera.leer_csv_madera(BASE))
+
+
+def _por_filas(df, por, filtros):
+    # Mismo enrollado calculado con groupby sobre las filas originales
+    for dimension, valor in (filtros or {}).items():
+        df = df[df[dimension].isin(valor if isinstance(valor, list) else [valor])]
+    return df.groupby(por, observed=True).agg(
+        **{'VOLUMEN M3': ('VOLUMEN M3', 'sum'), 'REGISTROS': ('VOLUMEN M3', 'size')}
+    ).reset_index()
+
+
+def _ordenado(df, por):
+    return df.sort_values(por, ignore_index=True)
+
+
+@pytest.mark.parametrize("por, filtros", ENROLLADOS)
+def test_enrollar_igual_a_groupby(madera, por, filtros):
+    cubo = cubo_madera.CuboMadera(cubo_madera.construir_cubo(madera), "v1")
+    columnas = [por] if isinstance(por, str) else por
+    esperado = _por_filas(madera, columnas, filtros)
+    pd.testing.assert_frame_equal(_ordenado(cubo.enrollar(por, filtros), columnas), _ordenado(esperado, columnas),
+                                  check_exact=False, rtol=1e-9)
+    # Los totales del cubo cuadran con las filas
+    assert cubo.enrollar(por, filtros)['REGISTROS'].sum() == esperado['REGISTROS'].sum()
+
+
+def test_anexar_igual_a_reconstruir(madera):
+    # Base: hasta 2019; anexo: el resto más filas de una partición ya existente y una especie nueva
+    base = madera[madera['AÑO'] < 2019].reset_index(drop=True)
+    delta = pd.concat([
+        madera[madera['AÑO'] >= 2019],
+        madera[(madera['AÑO'] == 2018) & (madera['SEMESTRE'] == 'I')].head(50),
+    ], ignore_index=True)
+    delta['ESPECIE'] = delta['ESPECIE'].cat.add_categories(['Especie nueva'])
+    delta.loc[:9, 'ESPECIE'] = 'Especie nueva'
+
+    cubo = cubo_madera.CuboMadera(cubo_madera.construir_cubo(base), "v1")
+    for por, filtros in ENROLLADOS:
+        cubo.enrollar(por, filtros)
+    anexado = cubo.anexar(delta, "v2")
+    completo = cubo_madera.CuboMadera(cubo_madera.construir_cubo(cubo_madera.concatenar([base, delta])), "v2")
+
+    pd.testing.assert_frame_equal(_ordenado(anexado.datos, cubo_madera.DIMENSIONES),
+                                  _ordenado(completo.datos, cubo_madera.DIMENSIONES),
+                                  check_exact=False, rtol=1e-9)
+    assert 'Especie nueva' in anexado.datos['ESPECIE'].cat.categories
+    # Los enrollados memorizados se actualizan con el aporte de las filas nuevas
+    for por, filtros in ENROLLADOS:
+        columnas = [por] if isinstance(por, str) else por
+        assert (tuple(columnas), cubo_madera._clave_filtros(filtros)) in anexado._memo
+        pd.testing.assert_frame_equal(_ordenado(anexado.enrollar(por, filtros), columnas),
+                                      _ordenado(completo.enrollar(por, filtros), columnas),
+                                      check_exact=False, rtol=1e-9)
+    # El cubo anterior no cambia
+    assert cubo.datos['REGISTROS'].sum() == len(base)
+
+
+def test_actualizar_cubo_parte_del_cubo_en_memoria(madera, monkeypatch):
+    monkeypatch.setattr(cubo_madera, "_cubos", {})
+    base, delta = madera.iloc[:40000], madera.iloc[40000:]
+    assert cubo_madera.actualizar_cubo("v1", delta, "v2") is None
+
+    base = base.copy()
+    base.attrs['version'] = "v1"
+    cubo_madera.obtener_cubo(base)
+    nuevo = cubo_madera.actualizar_cubo("v1", delta, "v2")
+    assert cubo_madera._cubos["v2"] is nuevo
+    assert nuevo.datos['REGISTROS'].sum() == len(madera)
+    assert nuevo.datos['VOLUMEN M3'].sum() == pytest.approx(madera['VOLUMEN M3'].sum())
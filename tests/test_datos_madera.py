@@ -0,0 +1,51 @@
+"""
+Pruebas de la carga de la base de madera cuando no se conoce la versión de la fuente.
+"""
+import os
+import shutil
+
+import pytest
+
+import cubo_madera
+import datos_madera
+import motor_outliers
+
+BASE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "base_datos_madera.csv")
+
+
+@pytest.fixture
+def fuente(tmp_path, monkeypatch):
+    monkeypatch.setattr(datos_madera, "DIRECTORIO_CACHE", str(tmp_path / "cache"))
+    monkeypatch.setattr(datos_madera, "INTERVALO_REVALIDACION", 0)
+    monkeypatch.setattr(datos_madera, "_cache", {})
+    monkeypatch.setattr(cubo_madera, "_cubos", {})
+    monkeypatch.setattr(motor_outliers, "_resultados", {})
+    ruta = tmp_path / "madera.csv"
+    shutil.copyfile(BASE, ruta)
+    return str(ruta)
+
+
+def test_version_desconocida_no_se_memoriza(fuente, monkeypatch):
+    monkeypatch.setattr(datos_madera, "version_fuente", lambda fuente, timeout=5: None)
+    df = datos_madera.cargar_madera(fuente)
+    assert df.attrs["version"] is None
+    # Sin versión no se escribe el almacén: no se podría validar en la próxima carga
+    assert not datos_madera.tiene_almacen(fuente)
+
+    cubo_madera.obtener_cubo(df)
+    motor_outliers.detectar_outliers(df)
+    assert cubo_madera._cubos == {}
+    assert motor_outliers._resultados == {}
+
+
+def test_version_conocida_tras_una_desconocida_recarga_completo(fuente, monkeypatch):
+    version_fuente = datos_madera.version_fuente
+    monkeypatch.setattr(datos_madera, "version_fuente", lambda fuente, timeout=5: None)
+    datos_madera.cargar_madera(fuente)
+
+    monkeypatch.setattr(datos_madera, "version_fuente", version_fuente)
+    df = datos_madera.cargar_madera(fuente)
+    assert df.attrs["version"] == version_fuente(fuente)
+    assert "actualizacion" not in df.attrs
+    assert datos_madera.tiene_almacen(fuente)
+    assert len(datos_madera.cargar_almacen(fuente)) == len(df)
@@ -0,0 +1,134 @@
+"""
+Pruebas de descargas contra un servidor HTTP local (http.server en un hilo).
+"""
+import hashlib
+import http.server
+import threading
+
+import pytest
+import requests
+
+import descargas
+import perfilado
+
+CONTENIDO = b"ANIO,VOLUMEN\n" + b"".join(f"{2000 + i},{i}\n".encode() for i in range(500))
+ETAG = '"%s"' % hashlib.md5(CONTENIDO).hexdigest()
+
+
+class _Manejador(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        servidor = self.server
+        servidor.peticiones.append(dict(self.headers))
+        if servidor.fallos > 0:
+            servidor.fallos -= 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+            return
+        datos = CONTENIDO
+        rango = self.headers.get("Range")
+        if rango:
+            datos = datos[int(rango.removeprefix("bytes=").rstrip("-")):]
+            self.send_response(206)
+        else:
+            self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+
+@pytest.fixture
+def servidor(tmp_path, monkeypatch):
+    monkeypatch.setattr(descargas, "DIRECTORIO_DESCARGAS", str(tmp_path))
+    monkeypatch.setattr(descargas, "ESPERA_REINTENTO", 0.01)
+    servidor = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Manejador)
+    servidor.peticiones = []
+    servidor.fallos = 0
+    servidor.url = f"http://127.0.0.1:{servidor.server_address[1]}/datos.csv"
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def test_revalidacion_con_etag(servidor):
+    assert descargas.descargar(servidor.url) == CONTENIDO
+    # Sin vigencia, la segunda descarga es condicional y el 304 sirve la copia local
+    assert descargas.descargar(servidor.url) == CONTENIDO
+    assert servidor.peticiones[1].get("If-None-Match") == ETAG
+    assert descargas.version(servidor.url) == ETAG
+
+
+def test_copia_vigente_no_consulta_la_fuente(servidor):
+    descargas.descargar(servidor.url)
+    descargas.descargar(servidor.url, vigencia=60)
+    assert len(servidor.peticiones) == 1
+
+
+def test_reintento_tras_503(servidor):
+    servidor.fallos = 2
+    avances = []
+    contenido = descargas.descargar(servidor.url, al_avanzar=lambda leidos, total: avances.append((leidos, total)))
+    assert contenido == CONTENIDO
+    assert len(servidor.peticiones) == 3
+    assert avances[-1] == (len(CONTENIDO), len(CONTENIDO))
+
+
+def test_reintentos_agotados(servidor):
+    servidor.fallos = 10
+    with pytest.raises(requests.HTTPError):
+        descargas.descargar(servidor.url, reintentos=2)
+    assert len(servidor.peticiones) == 3
+
+
+def test_descargar_rango(servidor):
+    assert descargas.descargar_rango(servidor.url, 100) == CONTENIDO[100:]
+    assert servidor.peticiones[0].get("Range") == "bytes=100-"
+
+
+def test_sin_conexion_usa_la_copia_local(servidor):
+    descargas.descargar(servidor.url)
+    servidor.shutdown()
+    servidor.server_close()
+    assert descargas.descargar(servidor.url, reintentos=0) == CONTENIDO
+    assert descargas.version(servidor.url, vigencia=0) is None
+
+
+def test_sin_conexion_ni_copia_local_falla(servidor):
+    servidor.shutdown()
+    servidor.server_close()
+    with pytest.raises(requests.ConnectionError):
+        descargas.descargar(servidor.url, reintentos=0)
+
+
+def test_abrir_en_streaming_con_reintentos(servidor):
+    servidor.fallos = 1
+    archivo, total = descargas.abrir(servidor.url)
+    with archivo:
+        primeros = archivo.read(100)
+        assert archivo.tell() >= 100
+        resto = archivo.read()
+    assert primeros + resto == CONTENIDO
+    assert total == len(CONTENIDO)
+    assert len(servidor.peticiones) == 2
+    # No pasa por el caché en disco
+    assert not descargas.en_cache(servidor.url)
+
+
+def test_abrir_se_lee_por_bloques(servidor):
+    archivo, _ = descargas.abrir(servidor.url)
+    with archivo:
+        perfil = perfilado.perfilar_csv(archivo, tamano_bloque=100)
+    assert perfil.filas == 500
@@ -0,0 +1,59 @@
+"""
+Pruebas del detector incremental de outliers frente al refresco por la cola del almacén.
+"""
+import os
+
+import numpy as np
+import pytest
+
+import datos_madera
+import motor_outliers
+
+BASE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "base_datos_madera.csv")
+
+
+@pytest.fixture
+def fuente(tmp_path, monkeypatch):
+    monkeypatch.setattr(datos_madera, "DIRECTORIO_CACHE", str(tmp_path / "cache"))
+    monkeypatch.setattr(datos_madera, "INTERVALO_REVALIDACION", 0)
+    monkeypatch.setattr(datos_madera, "_cache", {})
+    monkeypatch.setattr(motor_outliers, "_detectores", {})
+    with open(BASE, "rb") as archivo:
+        lineas = archivo.read().split(b"\n")
+    corte = len(lineas) // 2
+    ruta = tmp_path / "madera.csv"
+    ruta.write_bytes(b"\n".join(lineas[:corte]) + b"\n")
+    return str(ruta), b"\n".join(lineas[corte:])
+
+
+def test_refresco_actualiza_el_detector(fuente):
+    ruta, resto = fuente
+    df = datos_madera.cargar_madera(ruta)
+    detector = motor_outliers.detector_incremental(df)
+    limites_antes = detector.limites()
+
+    with open(ruta, "ab") as archivo:
+        archivo.write(resto)
+    nuevo = datos_madera.cargar_madera(ruta)
+    assert nuevo.attrs["actualizacion"]["modo"] == "incremental"
+
+    # El detector de la versión nueva viene del refresco, no de recorrer todo el dataset
+    actualizado = motor_outliers._detectores[(nuevo.attrs["version"], "VOLUMEN M3")]
+    assert motor_outliers.detector_incremental(nuevo) is actualizado
+    assert actualizado.boceto.total == len(nuevo)
+    assert detector.boceto.total == len(df)
+    assert detector.limites() == limites_antes
+
+    q1, q3 = np.quantile(nuevo["VOLUMEN M3"], [0.25, 0.75])
+    inferior, superior = actualizado.limites()
+    assert superior == pytest.approx(q3 + motor_outliers.FACTOR_IQR * (q3 - q1), rel=0.1)
+    assert inferior == pytest.approx(q1 - motor_outliers.FACTOR_IQR * (q3 - q1), rel=0.1, abs=1.0)
+
+
+def test_sin_detector_previo_no_se_registra(fuente):
+    ruta, resto = fuente
+    datos_madera.cargar_madera(ruta)
+    with open(ruta, "ab") as archivo:
+        archivo.write(resto)
+    datos_madera.cargar_madera(ruta)
+    assert motor_outliers._detectores == {}
@@ -0,0 +1,129 @@
+"""
+Registro de las vistas de App_madera.
+
+Cada vista vive en un módulo de este paquete que se importa la primera vez que
+se elige, de modo que el arranque de la aplicación no carga matplotlib ni
+geopandas (solo las vistas de mapas los usan) y cada re-ejecución solo
+calcula lo que necesita la vista activa.
+"""
+import importlib
+
+# Título en la barra lateral -> (módulo del paquete, función que recibe el DataFrame)
+VISTAS = {
+    "Especies más comunes": ("especies", "mostrar_especies_comunes"),
+    "Top 10 especies con mayor volumen": ("especies", "mostrar_top_10_maderas"),
+    "Mapa de calor por departamento": ("mapas", "generar_mapa_calor"),
+    "Top 10 municipios con mayor movilización": ("mapas", "generar_mapa_top_10_municipios"),
+    "Evolución temporal por especie y tipo de producto": ("evolucion", "analizar_evolucion_temporal"),
+    "Identificar outliers en los volúmenes de madera": ("outliers", "identificar_outliers"),
+    "Volumen total de madera por municipio": ("municipios", "agrupar_por_municipio"),
+    "Especies con menor volumen y distribución geográfica": ("mapas", "especies_menor_volumen_distribucion"),
+}
+
+MODULOS = list(dict.fromkeys(modulo for modulo, _ in VISTAS.values()))
+
+# Módulos cuyas vistas descargan la geometría de Colombia (ver recursos)
+MODULOS_GEOMETRIA = {"mapas"}
+
+# Nombre público -> módulo que lo define (los nombres que App_madera sigue ofreciendo)
+NOMBRES = {
+    **{funcion: modulo for modulo, funcion in VISTAS.values()},
+    "calcular_maderas_comunes": "especies",
+    "mostrar_visualizaciones": "especies",
+    "MOTORES_MAPA": "mapas",
+    "seleccionar_motor_mapa": "mapas",
+    "mostrar_filas_sin_municipio": "mapas",
+}
+
+
+def cargar_modulo(nombre):
+    """
+    Importa (solo la primera vez) un módulo de vistas.
+
+    Args:
+        nombre (str): Nombre del módulo dentro del paquete (ver MODULOS).
+
+    Returns:
+        module: Módulo de vistas.
+    """
+    return importlib.import_module(f"{__name__}.{nombre}")
+
+
+def cargar_vista(titulo):
+    """
+    Devuelve la función de la vista, importando su módulo si hace falta.
+
+    Args:
+        titulo (str): Título de la vista (clave de VISTAS).
+
+    Returns:
+        callable: Función que recibe el DataFrame de madera y dibuja la vista.
+    """
+    modulo, funcion = VISTAS[titulo]
+    return getattr(cargar_modulo(modulo), funcion)
+
+
+def recursos(titulo):
+    """
+    Devuelve las URLs remotas que la vista descarga además de los datos, para
+    pedirlas a la vez que estos (ver App_madera.cargar_datos).
+
+    Args:
+        titulo (str): Título de la vista (clave de VISTAS).
+
+    Returns:
+        list: La geometría de Colombia en las vistas de mapas; vacía en las demás.
+    """
+    if VISTAS[titulo][0] not in MODULOS_GEOMETRIA:
+        return []
+    import geometria
+
+    return [geometria.URL_COLOMBIA]
+
+
+def buscar(nombre):
+    """
+    Devuelve un objeto público de las vistas por su nombre (ver NOMBRES).
+
+    Args:
+        nombre (str): Nombre de la función o constante.
+
+    Returns:
+        object: Función o constante del módulo que la define.
+    """
+    return getattr(cargar_modulo(NOMBRES[nombre]), nombre)
+
+
+def precalentar(df):
+    """
+    Calcula en memoria lo que cada vista necesita en su primera visita, llamando
+    a la función `precalentar` de cada módulo de vistas. Importa todos los módulos,
+    pero solo hace enrollados e índices: la geometría y las figuras (geopandas,
+    matplotlib) se preparan en el grupo de procesos de precalentamiento.
+
+    Args:
+        df (pd.DataFrame): DataFrame con los datos de madera.
+    """
+    for nombre in MODULOS:
+        funcion = getattr(cargar_modulo(nombre), "precalentar", None)
+        if funcion is not None:
+            funcion(df)
+
+
+def tareas_precalentamiento(df):
+    """
+    Reúne las ejecuciones de vistas que dejan en el caché de figuras las
+    selecciones más comunes (ver `tareas_precalentamiento` en cada módulo).
+
+    Args:
+        df (pd.DataFrame): DataFrame con los datos de madera.
+
+    Returns:
+        list: Tuplas (módulo, función de vista, respuestas de los widgets).
+    """
+    tareas = []
+    for nombre in MODULOS:
+        funcion = getattr(cargar_modulo(nombre), "tareas_precalentamiento", None)
+        if funcion is not None:
+            tareas += [(nombre, vista, respuestas) for vista, respuestas in funcion(df)]
+    return tareas
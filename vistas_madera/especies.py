@@ -0,0 +1,169 @@
+"""
+Vistas de especies: especies más comunes (país y departamento) y top 10 por volumen.
+
+Los gráficos de especies muestran las principales y agrupan el resto en
+"Otros" (ver tablas.top_n_con_otros). Las figuras se memorizan como JSON en el caché
+de figuras, por versión del dataset y departamento, para que precalentamiento
+las pueda preparar en otros procesos.
+"""
+import plotly.express as px
+import streamlit
+
+import cubo_madera
+import graficos
+import instrumentacion
+import tablas
+
+# Mide los bytes de los gráficos, imágenes y tablas cuando hay una traza activa
+st = instrumentacion.StreamlitMedido(streamlit)
+
+
+def figura_barras_especies(df, titulo, limite=graficos.MAX_CATEGORIAS):
+    """
+    Construye el gráfico de barras de volumen por especie: las `limite` especies
+    con más volumen y el resto agrupado en "Otros".
+    
+    Args:
+        df (pd.DataFrame): Volumen por especie (columnas ESPECIE y VOLUMEN M3).
+        titulo (str): Título del gráfico.
+        limite (int): Especies que se muestran por separado.
+    
+    Returns:
+        plotly.graph_objects.Figure: Gráfico de barras.
+    """
+    return px.bar(tablas.top_n_con_otros(df, 'ESPECIE', 'VOLUMEN M3', limite), x='ESPECIE', y='VOLUMEN M3', title=titulo)
+
+
+def _barras_especies(df, titulo):
+    # Constructor para graficos.figura: recibe el límite de especies
+    return lambda limite: figura_barras_especies(df, titulo, limite)
+
+
+def top_especies(cubo, n=10):
+    """
+    Devuelve las especies con mayor volumen movilizado.
+    
+    Args:
+        cubo (cubo_madera.CuboMadera): Cubo de la base de madera.
+        n (int): Número de especies.
+    
+    Returns:
+        pd.DataFrame: Enrollado por ESPECIE de las n especies, de mayor a menor volumen.
+    """
+    return cubo.enrollar('ESPECIE').sort_values(by='VOLUMEN M3', ascending=False).head(n)
+
+
+@instrumentacion.instrumentar("agregacion")
+def calcular_maderas_comunes(df):
+    """
+    Calcula las especies de madera más comunes y sus volúmenes totales a nivel país y por departamento.
+    
+    Args:
+        df (pd.DataFrame): DataFrame con los datos de madera.
+    
+    Returns:
+        dict: Diccionario con los datos agregados a nivel país y por departamento,
+        y la versión del dataset.
+    """
+    cubo = cubo_madera.obtener_cubo(df)
+    
+    df_agrupado_pais = cubo.enrollar('ESPECIE')[['ESPECIE', 'VOLUMEN M3']]
+    df_agrupado_pais = df_agrupado_pais.sort_values(by='VOLUMEN M3', ascending=False)
+    
+    df_agrupado_departamento = cubo.enrollar(['DPTO', 'ESPECIE'])[['DPTO', 'ESPECIE', 'VOLUMEN M3']]
+    df_agrupado_departamento = df_agrupado_departamento.sort_values(by=['DPTO', 'VOLUMEN M3'], ascending=[True, False])
+    
+    return {
+        'pais': df_agrupado_pais,
+        'departamento': df_agrupado_departamento,
+        'version': df.attrs.get('version')
+    }
+
+
+def mostrar_visualizaciones(datos):
+    """
+    Muestra gráficos en Streamlit con la información de las especies de madera más comunes
+    (las graficos.MAX_CATEGORIAS principales y el resto agrupado en "Otros").
+    
+    Args:
+        datos (dict): Diccionario con los DataFrames de maderas más comunes a nivel país y por departamento.
+    """
+    st.subheader("Especies de madera más comunes a nivel país")
+    with instrumentacion.etapa("render", filas=len(datos['pais'])):
+        fig_pais = graficos.figura(
+            datos.get('version'),
+            _barras_especies(datos['pais'], 'Volumen por especie (País)'),
+            'especies_pais',
+            limite=graficos.MAX_CATEGORIAS
+        )
+        st.plotly_chart(fig_pais)
+    
+    st.subheader("Especies de madera más comunes por departamento")
+    departamentos = datos['departamento']['DPTO'].unique()
+    departamento_seleccionado = st.selectbox("Selecciona un departamento", departamentos)
+    
+    df_filtrado = datos['departamento'][datos['departamento']['DPTO'] == departamento_seleccionado]
+    with instrumentacion.etapa("render", filas=len(df_filtrado)):
+        fig_departamento = graficos.figura(
+            datos.get('version'),
+            _barras_especies(df_filtrado, f'Volumen por especie en {departamento_seleccionado}'),
+            'especies_departamento', str(departamento_seleccionado),
+            limite=graficos.MAX_CATEGORIAS
+        )
+        st.plotly_chart(fig_departamento)
+
+
+def mostrar_especies_comunes(df):
+    """
+    Vista "Especies más comunes": calcula las agregaciones solo cuando es la vista activa.
+    
+    Args:
+        df (pd.DataFrame): DataFrame con los datos de madera.
+    """
+    mostrar_visualizaciones(calcular_maderas_comunes(df))
+
+
+def mostrar_top_10_maderas(df):
+    """
+    Muestra un gráfico de barras con las diez especies de madera con mayor volumen movilizado.
+    
+    Args:
+        df (pd.DataFrame): DataFrame con los datos de madera.
+    """
+    with instrumentacion.etapa("agregacion"):
+        df_top_10 = top_especies(cubo_madera.obtener_cubo(df))
+    
+    st.subheader("Top 10 especies de madera con mayor volumen movilizado")
+    with instrumentacion.etapa("render", filas=len(df_top_10)):
+        fig_top_10 = graficos.figura(
+            df.attrs.get('version'),
+            lambda limite: px.bar(df_top_10, x='ESPECIE', y='VOLUMEN M3', title='Top 10 especies con mayor volumen movilizado'),
+            'top_10_especies'
+        )
+        st.plotly_chart(fig_top_10)
+
+
+def precalentar(df):
+    """
+    Calcula en memoria las agregaciones de las vistas de especies.
+    
+    Args:
+        df (pd.DataFrame): DataFrame con los datos de madera.
+    """
+    calcular_maderas_comunes(df)
+
+
+def tareas_precalentamiento(df):
+    """
+    Devuelve las ejecuciones que dejan en el caché de figuras las selecciones más
+    comunes: el gráfico de cada departamento y el top 10.
+    
+    Args:
+        df (pd.DataFrame): DataFrame con los datos de madera.
+    
+    Returns:
+        list: Pares (nombre de la función de vista, respuestas de los widgets).
+    """
+    departamentos = calcular_maderas_comunes(df)['departamento']['DPTO'].unique()
+    tareas = [("mostrar_especies_comunes", {"Selecciona un departamento": str(dpto)}) for dpto in departamentos]
+    return tareas + [("mostrar_top_10_maderas", {})]
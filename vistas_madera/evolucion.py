@@ -0,0 +1,98 @@
+"""
+Vista de evolución temporal del volumen por especie y tipo de producto.
+"""
+import plotly.express as px
+import streamlit
+
+import facetas
+import graficos
+import instrumentacion
+
+# Mide los bytes de los gráficos, imágenes y tablas cuando hay una traza activa
+st = instrumentacion.StreamlitMedido(streamlit)
+
+
+def figura_evolucion(df_agrupado, periodo, especie, tipo_producto, limite=graficos.MAX_PUNTOS_SERIE):
+    """
+    Construye el gráfico de línea de una serie de facetas (reducida con LTTB si es larga).
+    
+    Args:
+        df_agrupado (pd.DataFrame): Serie de facetas.FacetasMadera.serie.
+        periodo (str): 'AÑO', 'SEMESTRE' o 'TRIMESTRE'.
+        especie (str): Especie de la serie.
+        tipo_producto (str): Tipo de producto de la serie.
+        limite (int): Puntos que se dibujan como máximo.
+    
+    Returns:
+        plotly.graph_objects.Figure: Gráfico de línea.
+    """
+    return px.line(
+        graficos.reducir_serie(df_agrupado, 'VOLUMEN M3', limite), 
+        x=facetas.EJES[periodo], 
+        y='VOLUMEN M3', 
+        title=f'Evolución temporal de {especie} - {tipo_producto}'
+    )
+
+
+def analizar_evolucion_temporal(df):
+    """
+    Analiza la evolución temporal del volumen de madera movilizada por especie y tipo de producto.
+    Filtra las opciones de tipo de producto para mostrar solo aquellos con datos disponibles para la especie seleccionada.
+    
+    Args:
+        df (pd.DataFrame): DataFrame con los datos de madera.
+    """
+    st.subheader("Evolución temporal del volumen de madera movilizada")
+    
+    with instrumentacion.etapa("agregacion"):
+        indice = facetas.obtener_facetas(df)
+    
+    # Seleccionar la especie
+    especie_seleccionada = st.selectbox("Selecciona una especie", indice.especies)
+    
+    # Tipos de producto válidos para la especie seleccionada
+    tipos_producto_filtrados = indice.tipos_producto(especie_seleccionada)
+    
+    # Mostrar mensaje si no hay tipos de producto válidos
+    if len(tipos_producto_filtrados) == 0:
+        st.warning(f"No hay datos disponibles para la especie '{especie_seleccionada}'.")
+        return
+    
+    anio_inicial, anio_final = indice.rango_anios(especie_seleccionada)
+    st.caption(f"Años con datos para {especie_seleccionada}: {anio_inicial}–{anio_final}")
+    
+    # Seleccionar el tipo de producto (solo opciones válidas)
+    tipo_producto_seleccionado = st.selectbox(
+        "Selecciona un tipo de producto",
+        tipos_producto_filtrados
+    )
+    
+    # Serie precalculada por año, semestre o trimestre según la selección del usuario
+    periodo = st.radio("Selecciona el período de tiempo", ['AÑO', 'SEMESTRE', 'TRIMESTRE'])
+    df_agrupado = indice.serie(especie_seleccionada, tipo_producto_seleccionado, periodo)
+    
+    # Mostrar el gráfico de línea si hay datos
+    if df_agrupado is not None and len(df_agrupado) > 0:
+        with instrumentacion.etapa("render", filas=len(df_agrupado)):
+            # Las series largas se reducen con LTTB antes de dibujarlas
+            fig = graficos.figura(
+                df.attrs.get('version'),
+                lambda limite: figura_evolucion(
+                    df_agrupado, periodo, especie_seleccionada, tipo_producto_seleccionado, limite
+                ),
+                'evolucion', especie_seleccionada, tipo_producto_seleccionado, periodo,
+                limite=graficos.MAX_PUNTOS_SERIE
+            )
+            st.plotly_chart(fig)
+    else:
+        st.warning(f"No hay datos disponibles para la combinación seleccionada: {especie_seleccionada} - {tipo_producto_seleccionado}.")
+
+
+def precalentar(df):
+    """
+    Construye el índice de facetas de la vista de evolución temporal.
+    
+    Args:
+        df (pd.DataFrame): DataFrame con los datos de madera.
+    """
+    facetas.obtener_facetas(df)
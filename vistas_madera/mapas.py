@@ -0,0 +1,359 @@
+"""
+Vistas de mapas: mapa de calor por departamento, top 10 municipios y especies
+con menor volumen. Es el único módulo de vistas que usa matplotlib y la
+geometría (geopandas); ambos se importan solo al dibujar un mapa, de modo que
+los enrollados del módulo se pueden precalentar sin cargarlos.
+"""
+import streamlit
+
+import cubo_madera
+import figuras
+import geometria
+import indice_municipios
+import instrumentacion
+import mapas_interactivos
+
+# Mide los bytes de los gráficos, imágenes y tablas cuando hay una traza activa
+st = instrumentacion.StreamlitMedido(streamlit)
+
+MOTORES_MAPA = ["Estático (matplotlib)", "Interactivo (Plotly)"]
+
+
+def seleccionar_motor_mapa():
+    """
+    Muestra en la barra lateral el selector del motor de renderizado de los mapas.
+    
+    Returns:
+        bool: True si se eligió el mapa interactivo (Plotly), False para matplotlib.
+    """
+    motor = st.sidebar.radio("Motor de mapas", MOTORES_MAPA, key="motor_mapa")
+    return motor == MOTORES_MAPA[1]
+
+
+def _clave_mapa(nombre, df):
+    # Sin versión de los datos el mapa se dibuja cada vez (ver figuras.figura_memorizada)
+    version = df.attrs.get('version')
+    return None if version is None else figuras.clave_figura(nombre, version, geometria.NIVEL_POR_DEFECTO)
+
+
+def volumen_por_departamento(cubo):
+    """
+    Calcula el volumen total por departamento con su nombre normalizado (para unirlo a la geometría).
+    
+    Args:
+        cubo (cubo_madera.CuboMadera): Cubo de la base de madera.
+    
+    Returns:
+        pd.DataFrame: Enrollado por DPTO con la columna DPTO_NORM.
+    """
+    vol_por_dpto = cubo.enrollar('DPTO')
+    vol_por_dpto['DPTO_NORM'] = vol_por_dpto['DPTO'].astype(str).map(indice_municipios.normalizar_departamento)
+    return vol_por_dpto
+
+
+def dibujar_mapa_calor(vol_por_dpto):
+    """
+    Dibuja con matplotlib el mapa de calor de volúmenes por departamento.
+    
+    Args:
+        vol_por_dpto (pd.DataFrame): Resultado de volumen_por_departamento.
+    
+    Returns:
+        matplotlib.figure.Figure: Figura del mapa.
+    """
+    import matplotlib.pyplot as plt
+
+    # Cargar la geometría de Colombia
+    with instrumentacion.etapa("carga"):
+        colombia = geometria.cargar_departamentos()
+    
+    # Unir los datos de volumen con el GeoDataFrame por nombre normalizado (sin tildes)
+    with instrumentacion.etapa("union") as medicion:
+        nombres_geo = colombia['NOMBRE_DPT'].map(indice_municipios.normalizar_departamento)
+        df_geo = colombia.assign(DPTO_NORM=nombres_geo).merge(vol_por_dpto, on='DPTO_NORM')
+        medicion.filas = len(df_geo)
+    
+    # Graficar el mapa de calor con el nuevo colormap
+    fig, ax = plt.subplots()
+    df_geo.plot(column='VOLUMEN M3', cmap='YlGnBu', linewidth=0.8, edgecolor='k', legend=True, ax=ax)
+    ax.set_title("Distribución de volúmenes de madera por departamento")
+    return fig
+
+
+def generar_mapa_calor(df):
+    """Genera un mapa de calor de volúmenes de madera por departamento."""
+    # Agrupar los volúmenes de madera por departamento
+    with instrumentacion.etapa("agregacion") as medicion:
+        vol_por_dpto = volumen_por_departamento(cubo_madera.obtener_cubo(df))
+        medicion.filas = len(vol_por_dpto)
+    
+    if seleccionar_motor_mapa():
+        with instrumentacion.etapa("render"):
+            st.plotly_chart(mapas_interactivos.figura_mapa_calor(vol_por_dpto), key="mapa_calor")
+        return
+    
+    # Mostrar la imagen en Streamlit (se renderiza solo la primera vez para cada versión de datos)
+    clave = _clave_mapa('mapa_calor', df)
+    with instrumentacion.etapa("render"):
+        st.image(figuras.figura_memorizada(clave, lambda: dibujar_mapa_calor(vol_por_dpto)))
+
+
+def mostrar_filas_sin_municipio(cubo):
+    """
+    Muestra cuántas filas de madera no se pudieron ubicar en un municipio de DIVIPOLA.
+    
+    Args:
+        cubo (cubo_madera.CuboMadera): Cubo de la base de madera.
+    """
+    resumen = indice_municipios.resumen_coincidencias(cubo)
+    st.metric("Filas sin municipio DIVIPOLA", resumen['filas_sin_coincidencia'])
+    if resumen['filas_sin_coincidencia'] > 0:
+        with st.expander("Municipios sin coincidencia"):
+            st.dataframe(resumen['municipios_sin_coincidencia'])
+
+
+def top_municipios(cubo, n=10):
+    """
+    Devuelve los municipios con mayor volumen movilizado, con su nombre y coordenadas.
+    
+    Args:
+        cubo (cubo_madera.CuboMadera): Cubo de la base de madera.
+        n (int): Número de municipios.
+    
+    Returns:
+        pd.DataFrame: Enrollado por COD_MPIO de los n municipios, de mayor a menor volumen,
+        con MUNICIPIO, NOM_DPTO, LATITUD y LONGITUD.
+    """
+    # Agrupar los volúmenes de madera por código DIVIPOLA del municipio
+    vol_por_municipio = cubo.enrollar('COD_MPIO')
+    vol_por_municipio = vol_por_municipio[vol_por_municipio['COD_MPIO'] != indice_municipios.SIN_CODIGO]
+    
+    # Ordenar, seleccionar los n municipios con mayor volumen y añadir nombre y coordenadas
+    top = vol_por_municipio.sort_values(by='VOLUMEN M3', ascending=False).head(n)
+    with instrumentacion.etapa("union", filas=len(top)):
+        return indice_municipios.con_coordenadas(top)
+
+
+def dibujar_mapa_top_municipios(top_10_municipios):
+    """
+    Dibuja con matplotlib los municipios principales sobre el mapa de Colombia.
+    
+    Args:
+        top_10_municipios (pd.DataFrame): Resultado de top_municipios.
+    
+    Returns:
+        matplotlib.figure.Figure: Figura del mapa.
+    """
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots()
+    
+    # Graficar el mapa base de Colombia
+    geometria.cargar_departamentos().plot(ax=ax, color='lightgray', linewidth=0.8, edgecolor='k')
+    
+    # Graficar los 10 municipios con mayor volumen en una sola llamada
+    ax.scatter(top_10_municipios['LONGITUD'], top_10_municipios['LATITUD'], s=50, color='red', edgecolors='k', zorder=2)
+    
+    # Añadir etiquetas con el nombre del municipio (sin el volumen), evitando solapes
+    figuras.dibujar_etiquetas(
+        ax,
+        top_10_municipios['LONGITUD'],
+        top_10_municipios['LATITUD'],
+        top_10_municipios['MUNICIPIO'],
+        prioridad=top_10_municipios['VOLUMEN M3'],
+        max_etiquetas=10
+    )
+    
+    ax.set_title("Top 10 municipios con mayor movilización de madera")
+    return fig
+
+
+def generar_mapa_top_10_municipios(df):
+    """
+    Genera un mapa de Colombia con los diez municipios con mayor movilización de madera.
+    
+    Args:
+        df (pd.DataFrame): DataFrame con los datos de madera.
+    """
+    with instrumentacion.etapa("agregacion"):
+        cubo = cubo_madera.obtener_cubo(df)
+        top_10_municipios = top_municipios(cubo)
+    
+    if seleccionar_motor_mapa():
+        with instrumentacion.etapa("render"):
+            fig = mapas_interactivos.figura_mapa_puntos(
+                top_10_municipios, "Top 10 municipios con mayor movilización de madera"
+            )
+            st.plotly_chart(fig, key="mapa_top_10_municipios")
+        mostrar_filas_sin_municipio(cubo)
+        return
+    
+    # Mostrar la imagen en Streamlit (se renderiza solo la primera vez para cada versión de datos)
+    clave = _clave_mapa('mapa_top_10_municipios', df)
+    with instrumentacion.etapa("render"):
+        st.image(figuras.figura_memorizada(clave, lambda: dibujar_mapa_top_municipios(top_10_municipios)))
+    mostrar_filas_sin_municipio(cubo)
+
+
+def especies_menor_volumen(cubo, n=10):
+    """
+    Devuelve las especies con menor volumen total movilizado.
+    
+    Args:
+        cubo (cubo_madera.CuboMadera): Cubo de la base de madera.
+        n (int): Número de especies.
+    
+    Returns:
+        pd.DataFrame: Columnas 'ESPECIE' y 'VOLUMEN M3', de menor a mayor volumen.
+    """
+    df_agrupado_especies = cubo.enrollar('ESPECIE')[['ESPECIE', 'VOLUMEN M3']]
+    return df_agrupado_especies.sort_values(by='VOLUMEN M3', ascending=True).head(n)
+
+
+def distribucion_especies(cubo, especies):
+    """
+    Calcula el volumen por municipio de las especies indicadas, con nombre y coordenadas.
+    
+    Args:
+        cubo (cubo_madera.CuboMadera): Cubo de la base de madera.
+        especies (list): Especies incluidas.
+    
+    Returns:
+        pd.DataFrame: Una fila por (municipio, especie) con MUNICIPIO, LATITUD y LONGITUD.
+    """
+    df_filtrado = cubo.enrollar(['COD_MPIO', 'ESPECIE'], filtros={'ESPECIE': list(especies)})
+    with instrumentacion.etapa("union", filas=len(df_filtrado)):
+        return indice_municipios.con_coordenadas(df_filtrado)
+
+
+def dibujar_mapa_especies(df_municipios_coordenadas, especies):
+    """
+    Dibuja con matplotlib la distribución geográfica de las especies (un color por especie).
+    
+    Args:
+        df_municipios_coordenadas (pd.DataFrame): Resultado de distribucion_especies.
+        especies (list): Especies, en el orden de la leyenda.
+    
+    Returns:
+        matplotlib.figure.Figure: Figura del mapa.
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.lines import Line2D
+
+    fig, ax = plt.subplots()
+    
+    # Graficar el mapa base de Colombia
+    geometria.cargar_departamentos().plot(ax=ax, color='lightgray', linewidth=0.8, edgecolor='k')
+    
+    # Asignar un color único a cada especie
+    colores = plt.cm.tab20.colors  # Usar una paleta de colores (tab20 tiene 20 colores distintos)
+    color_por_especie = {especie: colores[i % len(colores)] for i, especie in enumerate(especies)}
+    
+    # Graficar todos los puntos (municipio, especie) en una sola llamada
+    ax.scatter(
+        df_municipios_coordenadas['LONGITUD'],
+        df_municipios_coordenadas['LATITUD'],
+        s=50,
+        c=[color_por_especie[especie] for especie in df_municipios_coordenadas['ESPECIE']],
+        zorder=2
+    )
+    
+    # Añadir etiquetas con el nombre del municipio (una por municipio, limitadas y sin solapes)
+    por_municipio = df_municipios_coordenadas.groupby(
+        ['MUNICIPIO', 'LATITUD', 'LONGITUD'], as_index=False
+    )['VOLUMEN M3'].sum()
+    figuras.dibujar_etiquetas(
+        ax,
+        por_municipio['LONGITUD'],
+        por_municipio['LATITUD'],
+        por_municipio['MUNICIPIO'],
+        prioridad=por_municipio['VOLUMEN M3'],
+        bbox=dict(facecolor='white', alpha=0.5, edgecolor='none')  # Fondo blanco para mejor legibilidad
+    )
+    
+    ax.set_title("Distribución geográfica de especies con menor volumen movilizado")
+    
+    # Mostrar la leyenda (un marcador por especie presente en el mapa)
+    presentes = set(df_municipios_coordenadas['ESPECIE'])
+    marcadores = [
+        Line2D([], [], marker='o', linestyle='', color=color, label=especie)
+        for especie, color in color_por_especie.items() if especie in presentes
+    ]
+    ax.legend(handles=marcadores, title="Especies", bbox_to_anchor=(1.05, 1), loc='upper left')
+    return fig
+
+
+def especies_menor_volumen_distribucion(df):
+    """
+    Identifica las especies de madera con menor volumen movilizado y analiza su distribución geográfica
+    utilizando puntos de colores en el mapa de Colombia, donde cada color representa una especie.
+    
+    Args:
+        df (pd.DataFrame): DataFrame con los datos de madera.
+    """
+    st.subheader("Especies con menor volumen movilizado y su distribución geográfica")
+    
+    # Agrupar por especie y seleccionar las 10 especies con menor volumen total movilizado
+    with instrumentacion.etapa("agregacion"):
+        cubo = cubo_madera.obtener_cubo(df)
+        df_menor_volumen = especies_menor_volumen(cubo)
+    
+    # Mostrar las especies con menor volumen
+    st.write("### Especies con menor volumen movilizado:")
+    st.dataframe(df_menor_volumen)
+    
+    # Volumen por municipio de las especies con menor volumen (una fila por municipio y especie)
+    especies = list(df_menor_volumen['ESPECIE'])
+    with instrumentacion.etapa("agregacion"):
+        df_municipios_coordenadas = distribucion_especies(cubo, especies)
+    
+    if seleccionar_motor_mapa():
+        with instrumentacion.etapa("render"):
+            fig = mapas_interactivos.figura_mapa_puntos(
+                df_municipios_coordenadas.astype({'ESPECIE': str}),
+                "Distribución geográfica de especies con menor volumen movilizado",
+                color='ESPECIE'
+            )
+            st.plotly_chart(fig, key="mapa_especies_menor_volumen")
+        mostrar_filas_sin_municipio(cubo)
+        return
+    
+    # Mostrar la imagen en Streamlit (se renderiza solo la primera vez para cada versión de datos)
+    clave = _clave_mapa('mapa_especies_menor_volumen', df)
+    with instrumentacion.etapa("render"):
+        st.image(figuras.figura_memorizada(clave, lambda: dibujar_mapa_especies(df_municipios_coordenadas, especies)))
+    mostrar_filas_sin_municipio(cubo)
+
+
+def precalentar(df):
+    """
+    Calcula en memoria los enrollados y el índice de municipios que usan las vistas
+    de mapas. La geometría y los mapas se preparan solo en el grupo de procesos
+    (ver tareas_precalentamiento), para no cargar geopandas ni matplotlib en el servidor.
+    
+    Args:
+        df (pd.DataFrame): DataFrame con los datos de madera.
+    """
+    cubo = cubo_madera.obtener_cubo(df)
+    volumen_por_departamento(cubo)
+    top_municipios(cubo)
+    distribucion_especies(cubo, especies_menor_volumen(cubo)['ESPECIE'])
+    indice_municipios.resumen_coincidencias(cubo)
+
+
+def tareas_precalentamiento(df):
+    """
+    Devuelve las ejecuciones que dejan en el caché de figuras los mapas estáticos.
+    
+    Args:
+        df (pd.DataFrame): DataFrame con los datos de madera.
+    
+    Returns:
+        list: Pares (nombre de la función de vista, respuestas de los widgets).
+    """
+    estatico = {"Motor de mapas": MOTORES_MAPA[0]}
+    return [
+        ("generar_mapa_calor", estatico),
+        ("generar_mapa_top_10_municipios", estatico),
+        ("especies_menor_volumen_distribucion", estatico),
+    ]
@@ -0,0 +1,72 @@
+"""
+Vista de volumen total por municipio (tabla paginada y barras con "Otros").
+"""
+import plotly.express as px
+import streamlit
+
+import cubo_madera
+import graficos
+import instrumentacion
+import tablas
+
+# Mide los bytes de los gráficos, imágenes y tablas cuando hay una traza activa
+st = instrumentacion.StreamlitMedido(streamlit)
+
+
+def volumen_por_municipio(cubo):
+    """
+    Calcula el volumen total de madera movilizada en cada municipio.
+    
+    Args:
+        cubo (cubo_madera.CuboMadera): Cubo de la base de madera.
+    
+    Returns:
+        pd.DataFrame: Columnas MUNICIPIO y VOLUMEN M3, de mayor a menor volumen.
+    """
+    df_agrupado = cubo.enrollar('MUNICIPIO')[['MUNICIPIO', 'VOLUMEN M3']]
+    return df_agrupado.sort_values(by='VOLUMEN M3', ascending=False)  # Ordenar de mayor a menor
+
+
+def agrupar_por_municipio(df):
+    """
+    Agrupa los datos por municipio y calcula el volumen total de madera movilizada en cada uno.
+    
+    Args:
+        df (pd.DataFrame): DataFrame con los datos de madera.
+    """
+    st.subheader("Volumen total de madera movilizada por municipio")
+    
+    # Agrupar por municipio y calcular el volumen total
+    with instrumentacion.etapa("agregacion") as medicion:
+        df_agrupado = volumen_por_municipio(cubo_madera.obtener_cubo(df))
+        medicion.filas = len(df_agrupado)
+    
+    # Mostrar la tabla con los resultados
+    st.write("### Volumen total de madera por municipio:")
+    with instrumentacion.etapa("render", filas=len(df_agrupado)):
+        tablas.mostrar_tabla_paginada(df_agrupado, "municipios", version=df.attrs.get('version'))
+    
+    # Mostrar un gráfico de barras con los municipios principales y el resto agrupado
+    st.write("### Gráfico de barras: Volumen total por municipio")
+    n_barras = st.slider("Municipios en el gráfico", min_value=5, max_value=50, value=20, step=5)
+    with instrumentacion.etapa("render", filas=n_barras + 1):
+        fig = graficos.figura(
+            df.attrs.get('version'),
+            lambda limite: px.bar(
+                tablas.top_n_con_otros(df_agrupado, 'MUNICIPIO', 'VOLUMEN M3', n=limite),
+                x='MUNICIPIO', y='VOLUMEN M3', title='Volumen total de madera por municipio'
+            ),
+            'municipios',
+            limite=n_barras
+        )
+        st.plotly_chart(fig)
+
+
+def precalentar(df):
+    """
+    Calcula el enrollado por municipio de la vista.
+    
+    Args:
+        df (pd.DataFrame): DataFrame con los datos de madera.
+    """
+    cubo_madera.obtener_cubo(df).enrollar('MUNICIPIO')
@@ -0,0 +1,90 @@
+"""
+Vista de outliers en los volúmenes de madera.
+"""
+import streamlit
+
+import graficos
+import instrumentacion
+import motor_outliers
+import tablas
+
+# Mide los bytes de los gráficos, imágenes y tablas cuando hay una traza activa
+st = instrumentacion.StreamlitMedido(streamlit)
+
+
+def identificar_outliers(df):
+    """
+    Identifica outliers en los volúmenes de madera utilizando el rango intercuartílico (IQR)
+    o el puntaje z robusto (MAD), de forma global o por especie o departamento,
+    y muestra solo los datos de los outliers en una tabla, manteniendo los índices originales.
+    
+    Args:
+        df (pd.DataFrame): DataFrame con los datos de madera.
+    """
+    st.subheader("Análisis de outliers en los volúmenes de madera")
+    
+    # Elegir el criterio y si los límites se calculan por grupo
+    metodo = st.radio(
+        "Método de detección",
+        motor_outliers.METODOS,
+        format_func=lambda m: {'IQR': 'Rango intercuartílico (IQR)', 'MAD': 'Puntaje z robusto (MAD)'}[m],
+        horizontal=True
+    )
+    grupo = st.selectbox("Calcular límites por", [None, 'ESPECIE', 'DPTO'], format_func=lambda g: g or 'Todo el dataset')
+    
+    # Identificar outliers
+    with instrumentacion.etapa("agregacion", filas=len(df)):
+        outliers = df[motor_outliers.detectar_outliers(df, metodo, grupo)]
+    
+    # Mostrar el número de outliers encontrados
+    st.write(f"Se encontraron **{len(outliers)} outliers** en los volúmenes de madera.")
+    
+    # Mostrar solo los datos de los outliers en una tabla, manteniendo los índices originales
+    if len(outliers) > 0:
+        st.write("### Datos de los outliers:")
+        with instrumentacion.etapa("render", filas=len(outliers)):
+            version = df.attrs.get('version')
+            tablas.mostrar_tabla_paginada(outliers, "outliers",  # Índices originales, una página a la vez
+                                          version=(version, metodo, grupo) if version else None)
+    else:
+        st.write("No se encontraron outliers en los datos.")
+
+    # Límites incrementales: se actualizan con las filas anexadas sin recorrer todo el dataset
+    detector = motor_outliers.detector_incremental(df)
+    inferior, superior = detector.limites()
+    actualizacion = df.attrs.get('actualizacion')
+    if inferior is not None and actualizacion:
+        nuevas = df['VOLUMEN M3'].iloc[len(df) - actualizacion['filas']:]
+        st.caption(f"Límites IQR incrementales (aproximados): [{inferior:,.2f}, {superior:,.2f}] m³. "
+                   f"De las {actualizacion['filas']} filas de la última actualización, "
+                   f"{int(detector.clasificar(nuevas).sum())} quedan fuera de esos límites.")
+    elif inferior is not None:
+        st.caption(f"Límites IQR incrementales (aproximados): [{inferior:,.2f}, {superior:,.2f}] m³.")
+
+    # Mostrar un gráfico de caja (boxplot) construido con estadísticas precalculadas
+    # (memorizado por versión y grupo; la muestra de outliers se reduce si la figura es muy grande)
+    st.write("### Gráfico de caja (Boxplot) para visualizar los outliers:")
+    with instrumentacion.etapa("render", filas=len(df)):
+        fig = graficos.figura(
+            df.attrs.get('version'),
+            lambda limite: motor_outliers.figura_caja(
+                motor_outliers.estadisticas_caja_por_grupo(df, grupo=grupo, max_puntos=limite),
+                'Distribución de volúmenes de madera con outliers'
+            ),
+            'caja_outliers', grupo,
+            limite=motor_outliers.MAX_PUNTOS_CAJA
+        )
+        st.plotly_chart(fig)
+    if grupo is not None:
+        st.caption(f"Se muestran los {len(fig.data[0].x)} grupos con más registros; "
+                   f"cada caja incluye a lo sumo {motor_outliers.MAX_PUNTOS_CAJA} outliers (los más extremos).")
+
+
+def precalentar(df):
+    """
+    Calcula la máscara de outliers de la selección por defecto (IQR sobre todo el dataset).
+    
+    Args:
+        df (pd.DataFrame): DataFrame con los datos de madera.
+    """
+    motor_outliers.detectar_outliers(df, motor_outliers.METODOS[0], None)